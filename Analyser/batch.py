@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:05:31 2026
+
+@author: wmorland
+
+Analyse every logging session in a directory of NMEA 2000 log files.
+
+Sessions are found with sessions.find_sessions and each one is handed to an
+analysis function in a separate process.  Results are cached by the content of
+the log files so a re-run after a regatta day only processes the new sessions.
+
+An analysis function takes the list of segment paths for one session and
+returns something that can be written as JSON.
+
+    python3 batch.py ~/nmea-logs --output week.json
+    python3 batch.py ~/nmea-logs --analysis mymodule:my_function
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+import n2klog
+import sessions
+import decode_cache
+
+
+def analysis_name(analysis):
+    """Return a name for an analysis function that can be used in a key."""
+    return f'{analysis.__module__}:{analysis.__qualname__}'
+
+
+def session_key(paths, analysis):
+    """
+    Cache key for the result of an analysis of one session.
+
+    The key changes if any segment changes, if segments are added or if the
+    analysis or decoder changes.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f'{analysis_name(analysis)}:'
+                  f'{n2klog.DECODER_VERSION}'.encode())
+    for path in paths:
+        digest.update(decode_cache.file_digest(path).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Analysis results stored as JSON files named by their key."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        """Return the cached result for key or None."""
+        try:
+            with open(self._path(key), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, result):
+        """Store a result, replacing the file atomically."""
+        temp = f'{self._path(key)}.tmp'
+        with open(temp, 'w') as file:
+            json.dump(result, file)
+        os.replace(temp, self._path(key))
+
+
+def pgn_summary(paths):
+    """
+    Per PGN summary statistics for one session.
+
+    Parameters
+    ----------
+    paths : list of str
+        The segments of the session in order.
+
+    Returns
+    -------
+    dict
+        PGN (as a string so it survives JSON) to a dict of frames, sources,
+        first and last timestamp, mean interval and longest gap in seconds.
+
+    """
+    summary = {}
+    for pgn, frames in decode_cache.decode_log(paths).items():
+        timestamps = frames.timestamp
+        max_gap = 0.0
+        for i in range(1, len(timestamps)):
+            gap = timestamps[i] - timestamps[i - 1]
+            if gap > max_gap:
+                max_gap = gap
+        count = len(frames)
+        first = timestamps[0]
+        last = timestamps[-1]
+        summary[str(pgn)] = {
+            'frames': count,
+            'sources': sorted(set(frames.source)),
+            'first': first,
+            'last': last,
+            'mean_interval': (last - first) / (count - 1) if count > 1
+            else None,
+            'max_gap': max_gap
+            }
+    return summary
+
+
+def merge_summaries(results):
+    """
+    Merge pgn_summary results from several sessions.
+
+    Frames are summed and sources combined.  Mean interval is weighted by the
+    number of intervals in each session.
+    """
+    merged = {}
+    for result in results:
+        for pgn, stats in result.items():
+            total = merged.get(pgn)
+            if total is None:
+                merged[pgn] = dict(stats, sources=list(stats['sources']))
+                continue
+            intervals = total['frames'] - 1, stats['frames'] - 1
+            if total['mean_interval'] is None:
+                total['mean_interval'] = stats['mean_interval']
+            elif stats['mean_interval'] is not None:
+                total['mean_interval'] = (
+                    (total['mean_interval'] * intervals[0]
+                     + stats['mean_interval'] * intervals[1])
+                    / (intervals[0] + intervals[1]))
+            total['frames'] += stats['frames']
+            total['sources'] = sorted(set(total['sources'])
+                                      | set(stats['sources']))
+            total['first'] = min(total['first'], stats['first'])
+            total['last'] = max(total['last'], stats['last'])
+            total['max_gap'] = max(total['max_gap'], stats['max_gap'])
+    return merged
+
+
+def load_function(spec):
+    """Load a function given as module:function."""
+    module_name, _, function_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def run_batch(directory, analysis=pgn_summary, merge=merge_summaries,
+              cache_directory=None, workers=None):
+    """
+    Analyse every session in a directory.
+
+    Parameters
+    ----------
+    directory : str
+        Directory holding .n2k and .n2k.zip log files.
+    analysis : callable, optional
+        Per session analysis function.  It must be defined at module level so
+        that it can be sent to a worker process.  The default is pgn_summary.
+    merge : callable, optional
+        Combines the list of per session results.  None to skip merging.
+        The default is merge_summaries.
+    cache_directory : str, optional
+        Where to cache results.  The default is .analysis-cache in directory.
+    workers : int, optional
+        Number of worker processes.  The default is the number of CPUs.
+
+    Returns
+    -------
+    dict
+        'sessions' maps session name to its result and 'merged' holds the
+        output of merge.
+
+    """
+    logger = logging.getLogger('batch')
+
+    if cache_directory is None:
+        cache_directory = os.path.join(directory, '.analysis-cache')
+    cache = ResultCache(cache_directory)
+
+    found = sessions.find_sessions(directory)
+    logger.info(f'Found {len(found)} sessions in {directory}')
+
+    results = {}
+    pending = {}
+    for session in found:
+        key = session_key(session.segments, analysis)
+        result = cache.get(key)
+        if result is None:
+            pending[session.name] = (key, session.segments)
+        else:
+            results[session.name] = result
+    logger.info(f'{len(results)} sessions cached, {len(pending)} to analyse')
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(analysis, segments)
+                       for name, (key, segments) in pending.items()}
+            for name, future in futures.items():
+                try:
+                    result = future.result()
+                except Exception:
+                    logger.exception(f'Analysing {name}: FAIL')
+                    continue
+                cache.put(pending[name][0], result)
+                results[name] = result
+                logger.info(f'Analysing {name}: SUCCESS')
+
+    ordered = {session.name: results[session.name] for session in found
+               if session.name in results}
+    merged = merge(list(ordered.values())) if merge is not None else None
+    return {'sessions': ordered, 'merged': merged}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Analyse all NMEA 2000 logging sessions in a directory.')
+    parser.add_argument('directory', nargs='?',
+                        default=os.getenv('NMEALOGS', '.'))
+    parser.add_argument('--analysis', default=None,
+                        help='per session analysis as module:function')
+    parser.add_argument('--merge', default=None,
+                        help='merge function as module:function')
+    parser.add_argument('--cache', default=None, help='cache directory')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None,
+                        help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    analysis = pgn_summary
+    merge = merge_summaries
+    if args.analysis is not None:
+        analysis = load_function(args.analysis)
+        merge = None
+    if args.merge is not None:
+        merge = load_function(args.merge)
+
+    results = run_batch(args.directory, analysis, merge, args.cache,
+                        args.workers)
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
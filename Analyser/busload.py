@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 14:07:52 2026
+
+@author: wmorland
+
+Bus load and timing gaps in recorded NMEA 2000 logs.
+
+For every PGN and source the report gives the mean update rate, the jitter,
+the standard deviation of the interval between frames, the longest gap and
+where it was, and for fast packet PGNs the number of frames missing from
+incomplete packets.  That shows whether a sensor really delivers the 0.1s
+updates in the Logger README.  Silences, where no frame at all was logged for
+longer than a threshold, point at the logger itself dropping frames.  Bus
+utilisation over time is estimated from the frame sizes, allowing for bit
+stuffing with n2klog.frame_bits.
+
+Logs are read a batch of frames at a time with framebatch.read_batches, into
+columns that are reused for each batch, so memory use does not depend on the
+size of the log.  Where numpy is installed each batch is reduced a column at
+a time: frames are grouped by PGN and source with a stable argsort, and the
+intervals, gaps, fast packet counters and bus load bins of each group are
+worked out with array operations.  Without numpy the frames are added one
+at a time, with the same results.
+
+    python3 busload.py session_#000.n2k session_#001.n2k.zip
+    python3 batch.py ~/nmea-logs --analysis busload:analyse
+"""
+
+import sys
+import json
+import math
+import argparse
+from datetime import datetime
+import n2klog
+import framebatch
+
+try:
+    import numpy
+except ModuleNotFoundError:
+    numpy = None
+
+CHUNK_FRAMES = 8192
+
+# Fast packet PGNs that turn up on Rainbow Kite Rider's bus, from canboat.
+FAST_PACKET_PGNS = frozenset((
+    126208, 126464, 126720, 126996, 126998, 127233, 127237, 127489, 127496,
+    127497, 127498, 127503, 127504, 127506, 127507, 127509, 127510, 127511,
+    127512, 127513, 127514, 128275, 128520, 129029, 129038, 129039, 129040,
+    129041, 129044, 129045, 129284, 129285, 129301, 129302, 129538, 129540,
+    129541, 129542, 129545, 129547, 129549, 129551, 129556, 129792, 129793,
+    129794, 129795, 129796, 129797, 129798, 129799, 129800, 129801, 129802,
+    129803, 129804, 129805, 129806, 129807, 129808, 129809, 129810, 130060,
+    130061, 130064, 130065, 130066, 130067, 130068, 130069, 130070, 130071,
+    130072, 130073, 130074, 130320, 130321, 130322, 130323, 130324, 130567,
+    130577, 130578, 130816
+    ))
+
+
+def read_batches(paths, capacity=CHUNK_FRAMES):
+    """
+    Iterate over the frames of one or more logs a batch at a time.
+
+    One framebatch.FrameBatch is filled again for each yield.
+
+    Yields
+    ------
+    framebatch.FrameBatch
+
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    batch = framebatch.FrameBatch(capacity)
+    for path in paths:
+        yield from framebatch.read_batches(path, batch=batch)
+
+
+class StreamStats:
+    """
+    Interval statistics for one PGN from one source.
+
+    The mean and variance of the interval are kept with Welford's method so
+    nothing is stored per frame.
+    """
+
+    __slots__ = ('frames', 'first', 'last', 'intervals', 'mean', 'm2',
+                 'max_gap', 'max_gap_at', 'packet', 'packets',
+                 'missing_frames')
+
+    def __init__(self):
+        self.frames = 0
+        self.first = None
+        self.last = None
+        self.intervals = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.max_gap = 0.0
+        self.max_gap_at = None
+        # Fast packet in progress, [sequence, frames needed, frames seen]
+        self.packet = None
+        self.packets = 0
+        self.missing_frames = 0
+
+    def add(self, timestamp):
+        """Add the time of a frame, or of the first frame of a packet."""
+        self.frames += 1
+        if self.last is None:
+            self.first = timestamp
+        else:
+            interval = timestamp - self.last
+            self.intervals += 1
+            delta = interval - self.mean
+            self.mean += delta / self.intervals
+            self.m2 += delta * (interval - self.mean)
+            if interval > self.max_gap:
+                self.max_gap = interval
+                self.max_gap_at = self.last
+        self.last = timestamp
+
+    def add_times(self, times):
+        """
+        Add the times of a run of frames, a numpy array in time order.
+
+        The mean and variance of the new intervals are merged into the
+        running ones with Chan's parallel form of Welford's method.
+        """
+        self.frames += len(times)
+        if self.last is None:
+            self.first = float(times[0])
+        else:
+            times = numpy.concatenate(((self.last,), times))
+        self.last = float(times[-1])
+        intervals = numpy.diff(times)
+        count = len(intervals)
+        if not count:
+            return
+        mean = float(intervals.mean())
+        m2 = float(numpy.square(intervals - mean).sum())
+        total = self.intervals + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.intervals * count / total
+        self.intervals = total
+        at = int(intervals.argmax())
+        if intervals[at] > self.max_gap:
+            self.max_gap = float(intervals[at])
+            self.max_gap_at = float(times[at])
+
+    def _end_packet(self):
+        if self.packet is not None:
+            self.missing_frames += max(self.packet[1] - self.packet[2], 0)
+            self.packet = None
+
+    def add_fast_packet(self, timestamp, byte0, byte1):
+        """
+        Add a fast packet frame.
+
+        Byte 0 holds the sequence counter in the top three bits and the frame
+        counter in the rest.  Frame 0 also holds the length of the packet in
+        byte 1, which gives the number of frames to expect.
+        """
+        sequence = byte0 >> 5
+        counter = byte0 & 0x1f
+        if counter == 0:
+            self._end_packet()
+            self.packet = [sequence, 1 + (max(byte1 - 6, 0) + 6) // 7, 1]
+            self.packets += 1
+            self.add(timestamp)
+        elif self.packet is not None and self.packet[0] == sequence:
+            self.packet[2] += 1
+        else:
+            # Frame 0 of this packet was lost, so its length is unknown.
+            self._end_packet()
+            self.packet = [sequence, 0, 0]
+            self.packets += 1
+            self.missing_frames += 1
+
+    def add_fast_packets(self, times, byte0, byte1):
+        """
+        Add a run of fast packet frames, numpy arrays in time order.
+
+        The same as add_fast_packet for each frame.  Every frame either
+        starts a packet or follows the frame before it, so the packet of each
+        frame is a cumulative sum of the starts, with packet 0 the one left
+        in progress by the last run.
+        """
+        sequence = byte0 >> 5
+        counter = byte0 & 0x1f
+        previous = numpy.concatenate(
+            ((-1 if self.packet is None else self.packet[0],),
+             sequence[:-1]))
+        first = counter == 0
+        follows = ~first & (sequence == previous)
+        lost = ~first & ~follows
+        packet = numpy.cumsum(first | lost)
+        packets = int(packet[-1])
+        seen = numpy.bincount(packet[first | follows], minlength=packets + 1)
+        needed = numpy.zeros(packets + 1, dtype=numpy.int64)
+        needed[packet[first]] = (
+            1 + (numpy.maximum(byte1[first].astype(numpy.int64) - 6, 0) + 6)
+            // 7)
+        if self.packet is not None:
+            needed[0] = self.packet[1]
+            seen[0] += self.packet[2]
+        self.missing_frames += int(
+            numpy.maximum(needed[:-1] - seen[:-1], 0).sum() + lost.sum())
+        self.packets += packets
+        self.packet = [int(sequence[-1]), int(needed[-1]), int(seen[-1])]
+        if first.any():
+            self.add_times(times[first])
+
+    def result(self):
+        """Statistics as a dict that can be written as JSON."""
+        self._end_packet()
+        span = (self.last - self.first) if self.frames else 0.0
+        summary = {
+            'frames': self.frames,
+            'first': self.first,
+            'last': self.last,
+            'rate': self.intervals / span if span > 0 else None,
+            'mean_interval': self.mean if self.intervals else None,
+            'jitter': (math.sqrt(self.m2 / self.intervals)
+                       if self.intervals else None),
+            'max_gap': self.max_gap,
+            'max_gap_at': self.max_gap_at
+            }
+        if self.packets:
+            summary['packets'] = self.packets
+            summary['missing_frames'] = self.missing_frames
+        return summary
+
+
+class BusLoad:
+    """
+    Accumulate bus load and timing statistics from batches of frames.
+
+    Parameters
+    ----------
+    bin_seconds : float, optional
+        Width of each bus utilisation bin.  The default is 1.0.
+    silence : float, optional
+        Report gaps with no frames at all longer than this.  The default is
+        1.0 seconds.
+    bitrate : int, optional
+        The default is 250000.
+    stuffing : float, optional
+        Fraction of the worst case bit stuffing to assume, see
+        n2klog.frame_bits.  The default is 0.5.
+    """
+
+    def __init__(self, bin_seconds=1.0, silence=1.0, bitrate=n2klog.BITRATE,
+                 stuffing=0.5):
+        self.bin_seconds = bin_seconds
+        self.silence = silence
+        self.bitrate = bitrate
+        self.bits = [n2klog.frame_bits(dlc, stuffing) for dlc in range(9)]
+        self.streams = {}
+        self.bins = {}
+        self.silences = []
+        self.frames = 0
+        self.last = None
+
+    def add(self, batch):
+        """Add the frames of a framebatch.FrameBatch."""
+        if numpy is None:
+            self.add_frames(batch)
+        elif batch.size:
+            self.add_columns(batch.columns())
+        self.frames += batch.size
+
+    def add_columns(self, columns):
+        """Add the frames of a batch from its numpy columns."""
+        times = columns['timestamp']
+        previous = (times if self.last is None
+                    else numpy.concatenate(((self.last,), times)))
+        gaps = numpy.diff(previous)
+        at = numpy.flatnonzero(gaps > self.silence)
+        self.silences.extend(zip(previous[at].tolist(), gaps[at].tolist()))
+        self.last = float(times[-1])
+
+        slots = numpy.floor_divide(times, self.bin_seconds).astype(
+            numpy.int64)
+        bits = numpy.array(self.bits)[numpy.minimum(columns['dlc'], 8)]
+        slots, inverse = numpy.unique(slots, return_inverse=True)
+        bins = self.bins
+        for slot, total in zip(slots.tolist(),
+                               numpy.bincount(inverse, bits).tolist()):
+            bins[slot] = bins.get(slot, 0.0) + total
+
+        # Group the frames by PGN and source, each group in time order
+        keys = columns['pgn'].astype(numpy.int64) << 8 | columns['source']
+        order = numpy.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = numpy.flatnonzero(numpy.diff(keys)) + 1
+        data = columns['data']
+        for start, end in zip([0] + starts.tolist(),
+                              starts.tolist() + [len(keys)]):
+            key = int(keys[start])
+            pgn = key >> 8
+            stats = self.streams.get((pgn, key & 0xff))
+            if stats is None:
+                stats = self.streams[(pgn, key & 0xff)] = StreamStats()
+            rows = order[start:end]
+            if pgn in FAST_PACKET_PGNS:
+                stats.add_fast_packets(times[rows], data[rows, 0],
+                                       data[rows, 1])
+            else:
+                stats.add_times(times[rows])
+
+    def add_frames(self, batch):
+        """Add the frames of a batch one at a time, without numpy."""
+        streams = self.streams
+        bins = self.bins
+        bits = self.bits
+        width = self.bin_seconds
+        silence = self.silence
+        last = self.last
+        size = batch.size
+        data = batch.data
+        for timestamp, pgn, source, dlc, byte0, byte1 in zip(
+                batch.timestamp[:size], batch.pgn[:size],
+                batch.source[:size], batch.dlc[:size],
+                data[0:size * framebatch.FRAME_SIZE:framebatch.FRAME_SIZE],
+                data[1:size * framebatch.FRAME_SIZE:framebatch.FRAME_SIZE]):
+            if last is not None and timestamp - last > silence:
+                self.silences.append((last, timestamp - last))
+            last = timestamp
+            key = (pgn, source)
+            stats = streams.get(key)
+            if stats is None:
+                stats = streams[key] = StreamStats()
+            if pgn in FAST_PACKET_PGNS:
+                stats.add_fast_packet(timestamp, byte0, byte1)
+            else:
+                stats.add(timestamp)
+            slot = int(timestamp // width)
+            bins[slot] = bins.get(slot, 0.0) + bits[dlc if dlc < 9 else 8]
+        self.last = last
+
+    def utilisation(self):
+        """List of (bin start time, fraction of the bitrate used)."""
+        capacity = self.bitrate * self.bin_seconds
+        return [(slot * self.bin_seconds, bits / capacity)
+                for slot, bits in sorted(self.bins.items())]
+
+    def result(self):
+        """
+        The report as a dict that can be written as JSON.
+
+        'streams' is keyed by 'pgn/source'.  'utilisation' has the mean and
+        peak load and the load in each bin.  'silences' is a list of
+        (start time, seconds) with no frames logged.
+        """
+        load = self.utilisation()
+        loads = [fraction for _, fraction in load]
+        return {
+            'frames': self.frames,
+            'streams': {f'{pgn}/{source}': stats.result()
+                        for (pgn, source), stats in
+                        sorted(self.streams.items())},
+            'utilisation': {
+                'bin_seconds': self.bin_seconds,
+                'mean': sum(loads) / len(loads) if loads else 0.0,
+                'peak': max(loads, default=0.0),
+                'bins': load
+                },
+            'silences': self.silences
+            }
+
+
+def analyse(paths, **kwargs):
+    """
+    Bus load and timing report for the log files of one session.
+
+    Can be given to batch.py as --analysis busload:analyse.  Keyword
+    arguments go to BusLoad.
+    """
+    bus = BusLoad(**kwargs)
+    for batch in read_batches(paths):
+        bus.add(batch)
+    return bus.result()
+
+
+def print_report(report, file=sys.stdout):
+    """Print a per PGN and source table and the bus load summary."""
+    print(f'{"pgn/src":>12s} {"frames":>8s} {"rate/s":>8s} {"jitter":>8s} '
+          f'{"max gap":>8s} {"missing":>8s}', file=file)
+    for name, stats in report['streams'].items():
+        rate = stats['rate'] or 0.0
+        jitter = stats['jitter'] or 0.0
+        missing = stats.get('missing_frames', '')
+        print(f'{name:>12s} {stats["frames"]:8d} {rate:8.2f} '
+              f'{jitter:8.3f} {stats["max_gap"]:8.2f} {missing:>8}',
+              file=file)
+    load = report['utilisation']
+    print(f'bus load mean {load["mean"]:1.1%} peak {load["peak"]:1.1%}',
+          file=file)
+    for start, seconds in report['silences']:
+        print(f'silence {seconds:1.2f}s at '
+              f'{datetime.fromtimestamp(start).isoformat()}', file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Bus load and timing gaps in NMEA 2000 logs.')
+    parser.add_argument('logs', nargs='+',
+                        help='log files of one session, in order')
+    parser.add_argument('--bin', type=float, default=1.0,
+                        help='seconds per bus load bin')
+    parser.add_argument('--silence', type=float, default=1.0,
+                        help='report gaps in the whole log longer than this')
+    parser.add_argument('--json', help='write the full report to this file')
+    args = parser.parse_args(argv)
+
+    report = analyse(args.logs, bin_seconds=args.bin, silence=args.silence)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
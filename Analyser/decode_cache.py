@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:14:09 2026
+
+@author: wmorland
+
+Cache of decoded NMEA 2000 log files.
+
+Parsing the plain text log format is by far the slowest part of any analysis.
+Each log file is read a batch at a time with framebatch.read_batches, which
+parses each second's timestamp prefix once, decoded into the same per PGN
+arrays as n2klog.decode_log and stored in a compact binary file named by a
+hash of the raw log file and the decoder version.  The next time the same
+log is requested the arrays are read straight back from the cache.
+
+The cache directory is given by the environment variable N2KDECODECACHE and
+defaults to ~/.cache/rkr-logger/decoded.  When the total size of the cache
+goes over max_bytes the least recently used entries are removed.
+
+Cache file layout, all integers little endian:
+
+    header  b'N2KD', u16 decoder version, u32 number of PGNs
+    per PGN u32 pgn, u32 number of frames n
+            n x f64 timestamp, n x u8 priority, n x u8 source,
+            n x u8 destination, n x u8 dlc, 8n x u8 data
+"""
+
+import os
+import sys
+import struct
+import hashlib
+import logging
+from array import array
+import n2klog
+import framebatch
+
+MAGIC = b'N2KD'
+HEADER = struct.Struct('<4sHI')
+PGN_HEADER = struct.Struct('<II')
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return a hex digest of the contents of a file."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _little_endian(column):
+    if sys.byteorder == 'big' and column.itemsize > 1:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+def pack(pgns):
+    """Pack a dict of PGNFrames into the cache file format."""
+    parts = [HEADER.pack(MAGIC, n2klog.DECODER_VERSION, len(pgns))]
+    for pgn, frames in sorted(pgns.items()):
+        parts.append(PGN_HEADER.pack(pgn, len(frames)))
+        parts.append(_little_endian(frames.timestamp).tobytes())
+        parts.append(frames.priority.tobytes())
+        parts.append(frames.source.tobytes())
+        parts.append(frames.destination.tobytes())
+        parts.append(frames.dlc.tobytes())
+        parts.append(bytes(frames.data))
+    return b''.join(parts)
+
+
+def unpack(buffer):
+    """
+    Unpack the cache file format into a dict of PGNFrames.
+
+    Raises
+    ------
+    ValueError
+        The buffer is not a cache file from this decoder version.
+
+    """
+    view = memoryview(buffer)
+    magic, version, count = HEADER.unpack_from(view, 0)
+    if magic != MAGIC or version != n2klog.DECODER_VERSION:
+        raise ValueError('Not a decode cache file for this decoder version')
+    offset = HEADER.size
+    pgns = {}
+    for _ in range(count):
+        pgn, n = PGN_HEADER.unpack_from(view, offset)
+        offset += PGN_HEADER.size
+        frames = n2klog.PGNFrames(pgn)
+        frames.timestamp.frombytes(view[offset:offset + 8 * n])
+        if sys.byteorder == 'big':
+            frames.timestamp.byteswap()
+        offset += 8 * n
+        for column in (frames.priority, frames.source, frames.destination,
+                       frames.dlc):
+            column.frombytes(view[offset:offset + n])
+            offset += n
+        frames.data[:] = view[offset:offset + 8 * n]
+        offset += 8 * n
+        pgns[pgn] = frames
+    if offset != len(view):
+        raise ValueError('Decode cache file is truncated or corrupt')
+    return pgns
+
+
+class DecodeCache:
+    """
+    Content addressed store of decoded log files.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Where the cache files are kept.  Defaults to N2KDECODECACHE or
+        ~/.cache/rkr-logger/decoded.
+    max_bytes : int, optional
+        Total size of the cache before the least recently used entries are
+        removed.  The default is 2GB.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        if directory is None:
+            directory = os.getenv('N2KDECODECACHE',
+                                  os.path.expanduser(
+                                      '~/.cache/rkr-logger/decoded'))
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, path):
+        """Cache key for a raw log file."""
+        return f'{file_digest(path)}-v{n2klog.DECODER_VERSION}'
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.n2kd')
+
+    def get(self, key):
+        """Return the decoded PGNs for key or None if not cached."""
+        cache_path = self._path(key)
+        try:
+            with open(cache_path, 'rb') as file:
+                pgns = unpack(file.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error):
+            logging.getLogger('decode_cache').warning(
+                f'Discarding bad cache file {cache_path}')
+            self._remove(cache_path)
+            return None
+        # The modification time records when an entry was last used.
+        os.utime(cache_path)
+        return pgns
+
+    def put(self, key, pgns):
+        """Store decoded PGNs and evict old entries if the cache is full."""
+        cache_path = self._path(key)
+        temp = f'{cache_path}.tmp'
+        with open(temp, 'wb') as file:
+            file.write(pack(pgns))
+        os.replace(temp, cache_path)
+        self.evict()
+
+    def _remove(self, cache_path):
+        try:
+            os.remove(cache_path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Remove least recently used entries until under max_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith('.n2kd'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, cache_path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(cache_path)
+            total -= size
+
+    def decode(self, path):
+        """Return the decoded PGNs for one log file, from the cache if we can."""
+        key = self.key(path)
+        pgns = self.get(key)
+        if pgns is None:
+            pgns = framebatch.decode_batches(framebatch.read_batches(path))
+            self.put(key, pgns)
+        return pgns
+
+
+def decode_log(paths, cache=None):
+    """
+    Decode one or more log files, checking the cache first.
+
+    This is a drop in replacement for n2klog.decode_log for use by the
+    Analyser.  Each file is cached separately so a session that gains a new
+    segment only has to decode the new file.
+
+    Parameters
+    ----------
+    paths : str or list of str
+    cache : DecodeCache, optional
+        The default is a DecodeCache in the default directory.
+
+    Returns
+    -------
+    dict
+        PGN number to n2klog.PGNFrames.
+
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    if cache is None:
+        cache = DecodeCache()
+    pgns = {}
+    for path in paths:
+        for pgn, frames in cache.decode(path).items():
+            if pgn in pgns:
+                pgns[pgn].extend(frames)
+            else:
+                pgns[pgn] = frames
+    return pgns
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:40:02 2026
+
+@author: wmorland
+
+Find logging sessions in a directory of NMEA 2000 log files.
+
+The logger writes to a base file, e.g. foo.n2k, and SizedRotatingLogger renames
+it each time it fills up using the _default_name scheme
+
+    foo_2021-03-02T201619_#000.n2k
+
+zip_logs may then have turned any of these into foo_2021-03-02T201619_#000.n2k.zip
+
+The rollover count starts again at #000 each time the logger is started, so a
+reset in the count marks the start of a new session.
+"""
+
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+
+SEGMENT_PATTERN = re.compile(r'^(?P<stem>.+)_(?P<time>\d{4}-\d{2}-\d{2}T\d{6})'
+                             r'_#(?P<count>\d{3,})(?P<suffix>\.n2k)(\.zip)?$')
+BASE_PATTERN = re.compile(r'^(?P<stem>.+?)(?P<suffix>\.n2k)(\.zip)?$')
+
+Segment = namedtuple('Segment', ['path', 'stem', 'time', 'count'])
+Session = namedtuple('Session', ['name', 'segments'])
+
+
+def parse_segment(directory, file_name):
+    """
+    Work out where a log file belongs from its name.
+
+    Parameters
+    ----------
+    directory : str
+    file_name : str
+
+    Returns
+    -------
+    Segment or None
+        None if the file is not an NMEA 2000 log file.  The active base file
+        has no rollover information so it is given a count of None and the
+        time it was last modified.
+
+    """
+    path = os.path.join(directory, file_name)
+    match = SEGMENT_PATTERN.match(file_name)
+    if match:
+        time = datetime.strptime(match['time'], '%Y-%m-%dT%H%M%S')
+        return Segment(path, match['stem'], time, int(match['count']))
+    match = BASE_PATTERN.match(file_name)
+    if match:
+        time = datetime.fromtimestamp(os.path.getmtime(path))
+        return Segment(path, match['stem'], time, None)
+    return None
+
+
+def find_sessions(directory='.'):
+    """
+    Group the log files in a directory into sessions.
+
+    Rotated segments with the same stem are sorted by rollover time and split
+    into a new session wherever the rollover count resets.  A base file that
+    has not yet been rotated is the tail of the most recent session with the
+    same stem.
+
+    Parameters
+    ----------
+    directory : str
+        The directory to search for log files.  Defaults to the current
+        working directory.
+
+    Returns
+    -------
+    list of Session
+        Sorted by the time of the first segment.
+
+    """
+    rotated = {}
+    base = {}
+    for file_name in os.listdir(directory):
+        segment = parse_segment(directory, file_name)
+        if segment is None:
+            continue
+        if segment.count is None:
+            base[segment.stem] = segment
+        else:
+            rotated.setdefault(segment.stem, []).append(segment)
+
+    sessions = []
+    for stem in set(rotated) | set(base):
+        segments = sorted(rotated.get(stem, []),
+                          key=lambda s: (s.time, s.count))
+        current = []
+        for segment in segments:
+            if current and segment.count <= current[-1].count:
+                sessions.append(current)
+                current = []
+            current.append(segment)
+        if stem in base:
+            current.append(base[stem])
+        if current:
+            sessions.append(current)
+
+    sessions.sort(key=lambda s: s[0].time)
+    return [Session(f'{s[0].stem}_{s[0].time:%Y-%m-%dT%H%M%S}',
+                    [segment.path for segment in s])
+            for s in sessions]
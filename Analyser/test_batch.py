@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:20:45 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+import tempfile
+from unittest.mock import patch
+import batch
+import sessions
+
+LINE = '2021-03-02 20:16:{:02d}.000000,2,127245,{},255,8,ff,ff,ff,7f,e1,fe,ff,ff\n'
+
+
+def write_log(path, seconds, source=15):
+    with open(path, 'w') as file:
+        file.write('timestamp,priority,pgn,source,destination,dlc,data\n')
+        for second in seconds:
+            file.write(LINE.format(second, source))
+
+
+class TestFindSessions(unittest.TestCase):
+    """Test cases for sessions.find_sessions."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_count_reset(self):
+        """A new session starts when the rollover count resets."""
+        names = ['foo_2021-03-02T101619_#000.n2k.zip',
+                 'foo_2021-03-02T111619_#001.n2k',
+                 'foo_2021-03-03T091619_#000.n2k',
+                 'foo.n2k',
+                 'notes.txt']
+        for name in names:
+            write_log(os.path.join(self.directory.name, name), [1])
+        found = sessions.find_sessions(self.directory.name)
+        self.assertEqual([s.name for s in found],
+                         ['foo_2021-03-02T101619', 'foo_2021-03-03T091619'],
+                         msg='Expect two sessions.')
+        self.assertEqual([os.path.basename(p) for p in found[1].segments],
+                         ['foo_2021-03-03T091619_#000.n2k', 'foo.n2k'],
+                         msg='Base file is the tail of the latest session.')
+
+    def test_sidecars(self):
+        """Sidecars of a log are not taken for logs."""
+        names = ['foo_2021-03-02T101619_#000.n2k',
+                 'foo_2021-03-02T101619_#000.tp.csv',
+                 'foo_2021-03-02T101619_#000.n2k.idx',
+                 'foo.tp.csv']
+        for name in names:
+            write_log(os.path.join(self.directory.name, name), [1])
+        found = sessions.find_sessions(self.directory.name)
+        self.assertEqual([os.path.basename(p) for s in found
+                          for p in s.segments],
+                         ['foo_2021-03-02T101619_#000.n2k'],
+                         msg='Expect only the log.')
+
+
+class TestRunBatch(unittest.TestCase):
+    """Test cases for run_batch."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        environ = {'N2KDECODECACHE': os.path.join(self.directory.name,
+                                                  'decoded')}
+        self.environ = patch.dict(os.environ, environ)
+        self.environ.start()
+        write_log(os.path.join(self.directory.name,
+                               'foo_2021-03-02T201619_#000.n2k'), [1, 2, 5])
+        write_log(os.path.join(self.directory.name,
+                               'foo_2021-03-02T201629_#001.n2k'), [10], 1)
+        write_log(os.path.join(self.directory.name,
+                               'foo_2021-03-03T201619_#000.n2k'), [1, 3])
+
+    def tearDown(self):
+        self.environ.stop()
+        self.directory.cleanup()
+
+    def test_summary(self):
+        """Per PGN statistics are merged across sessions."""
+        results = batch.run_batch(self.directory.name, workers=1)
+        self.assertEqual(len(results['sessions']), 2,
+                         msg='Expect two sessions.')
+        first = results['sessions']['foo_2021-03-02T201619']['127245']
+        self.assertEqual(first['frames'], 4, msg='Expect four frames.')
+        self.assertEqual(first['sources'], [1, 15], msg='Expect two sources.')
+        self.assertEqual(first['max_gap'], 5.0, msg='Expect 5s longest gap.')
+        merged = results['merged']['127245']
+        self.assertEqual(merged['frames'], 6,
+                         msg='Merged frames should be the total.')
+
+    def test_cached(self):
+        """Second run uses the cache."""
+        batch.run_batch(self.directory.name, workers=1)
+        with patch('batch.ProcessPoolExecutor') as pool:
+            results = batch.run_batch(self.directory.name, workers=1)
+        pool.assert_not_called()
+        self.assertEqual(len(results['sessions']), 2,
+                         msg='Cached results should be returned.')
+
+
+if __name__ == '__main__':
+    unittest.main()
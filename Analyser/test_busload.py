@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 15:31:09 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+import n2klog
+import busload
+
+RUDDER = '{},2,127245,15,255,8,ff,ff,ff,7f,e1,fe,ff,ff\n'
+GNSS = '{},3,129029,9,255,8,{}\n'
+
+
+def stamp(seconds):
+    return datetime.fromtimestamp(1614716160 + seconds).isoformat(' ')
+
+
+def gnss_frames(sequence, frames):
+    """Lines for a 43 byte GNSS packet, only the frame counters in frames."""
+    lines = []
+    for counter in frames:
+        data = [sequence << 5 | counter, 43 if counter == 0 else 0xff]
+        data += [0xff] * 6
+        lines.append(','.join(f'{b:02x}' for b in data))
+    return lines
+
+
+class TestBusLoad(unittest.TestCase):
+    """Test cases for busload.analyse."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'log.n2k')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertSameReport(self, first, second, msg):
+        """Reports equal, floats to 9 places."""
+        if isinstance(first, dict):
+            self.assertEqual(sorted(first), sorted(second), msg=msg)
+            for key in first:
+                self.assertSameReport(first[key], second[key], f'{msg} {key}')
+        elif isinstance(first, (list, tuple)):
+            self.assertEqual(len(first), len(second), msg=msg)
+            for a, b in zip(first, second):
+                self.assertSameReport(a, b, msg)
+        elif isinstance(first, float):
+            self.assertAlmostEqual(first, second, places=9, msg=msg)
+        else:
+            self.assertEqual(first, second, msg=msg)
+
+    def write(self, lines):
+        with open(self.path, 'w') as file:
+            file.write('timestamp,priority,pgn,source,destination,dlc,data\n')
+            file.writelines(lines)
+
+    def test_intervals(self):
+        """Rate, jitter and the longest gap for a regular stream."""
+        times = [0.1 * i for i in range(20)] + [4.0, 4.1]
+        self.write(RUDDER.format(stamp(t)) for t in times)
+        report = busload.analyse(self.path)
+        stats = report['streams']['127245/15']
+        self.assertEqual(stats['frames'], 22, msg='Expect every frame.')
+        self.assertAlmostEqual(stats['max_gap'], 2.1, places=5,
+                               msg='Expect the gap after 1.9s.')
+        self.assertAlmostEqual(stats['max_gap_at'] - stats['first'], 1.9,
+                               places=5, msg='Gap starts at 1.9s.')
+        self.assertAlmostEqual(stats['rate'], 21 / 4.1, places=5,
+                               msg='Rate is intervals over the span.')
+        self.assertEqual(len(report['silences']), 1,
+                         msg='The gap is also a silence.')
+
+    def test_utilisation(self):
+        """Bus load is the bits in each bin over the bitrate."""
+        self.write(RUDDER.format(stamp(0.01 * i)) for i in range(50))
+        load = busload.analyse(self.path)['utilisation']
+        self.assertAlmostEqual(load['peak'],
+                               50 * n2klog.frame_bits(8) / n2klog.BITRATE,
+                               msg='Expect 50 eight byte frames.')
+
+    def test_missing_fast_packet(self):
+        """Frames missing from fast packets are counted."""
+        data = (gnss_frames(0, range(7)) + gnss_frames(1, [0, 1, 2, 4, 5])
+                + gnss_frames(2, [1, 2, 3, 4, 5, 6]))
+        self.write(GNSS.format(stamp(0.001 * i), d)
+                   for i, d in enumerate(data))
+        stats = busload.analyse(self.path)['streams']['129029/9']
+        self.assertEqual(stats['packets'], 3, msg='Expect three packets.')
+        self.assertEqual(stats['missing_frames'], 3,
+                         msg='Two from the second packet, frame 0 of the '
+                         'third.')
+
+    def test_chunks(self):
+        """Statistics do not depend on the batch size."""
+        self.write(RUDDER.format(stamp(0.1 * i)) for i in range(100))
+        bus = busload.BusLoad()
+        for batch in busload.read_batches(self.path, capacity=7):
+            bus.add(batch)
+        self.assertSameReport(bus.result(), busload.analyse(self.path),
+                              msg='Expect the same report.')
+
+    def test_without_numpy(self):
+        """Frame by frame gives the same report as the numpy columns."""
+        if busload.numpy is None:
+            self.skipTest('needs numpy')
+        data = (gnss_frames(0, range(7)) + gnss_frames(1, [0, 1, 2, 4, 5])
+                + gnss_frames(2, [1, 2, 3, 4, 5, 6]) + gnss_frames(3, [0]))
+        lines = [GNSS.format(stamp(0.01 * i), d) for i, d in enumerate(data)]
+        lines += [RUDDER.format(stamp(0.3 + 0.1 * i)) for i in range(30)]
+        lines.sort()
+        lines.append(RUDDER.format(stamp(6.0)))
+        self.write(lines)
+        bus = busload.BusLoad()
+        for batch in busload.read_batches(self.path, capacity=5):
+            bus.add(batch)
+        with patch('busload.numpy', None):
+            expected = busload.analyse(self.path)
+        self.assertSameReport(bus.result(), expected,
+                              msg='Expect the same report.')
+
+
+if __name__ == '__main__':
+    unittest.main()
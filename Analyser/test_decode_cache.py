@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:52:30 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+import tempfile
+from unittest.mock import patch
+import n2klog
+import decode_cache
+
+LOG = ('timestamp,priority,pgn,source,destination,dlc,data\n'
+       '2020-10-04 21:48:20.582346,3,129029,9,255,8,80,2b,b3,6d,48,a0,e2,a8\n'
+       '2020-10-04 21:48:20.600000,2,127245,15,255,8,ff,ff,ff,7f,e1,fe,ff,ff\n'
+       '2020-10-04 21:48:20.700000,6,59904,1,255,3,00,ee,00\n')
+
+
+class TestDecodeCache(unittest.TestCase):
+    """Test cases for DecodeCache."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.directory.name, 'foo.n2k')
+        with open(self.log, 'w') as file:
+            file.write(LOG)
+        self.cache = decode_cache.DecodeCache(
+            os.path.join(self.directory.name, 'cache'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """Cached arrays are the same as freshly decoded ones."""
+        first = self.cache.decode(self.log)
+        with patch('framebatch.read_batches') as decode:
+            second = self.cache.decode(self.log)
+        decode.assert_not_called()
+        self.assertEqual(sorted(first), sorted(second),
+                         msg='Expect the same PGNs from the cache.')
+        for pgn in first:
+            self.assertEqual(first[pgn].timestamp, second[pgn].timestamp,
+                             msg='Timestamps should survive the cache.')
+            self.assertEqual(first[pgn].data, second[pgn].data,
+                             msg='Data should survive the cache.')
+        self.assertEqual(second[59904].frame_data(0), b'\x00\xee\x00',
+                         msg='dlc should survive the cache.')
+
+    def test_same_as_decode_log(self):
+        """Reading in batches gives the columns n2klog.decode_log does."""
+        expected = n2klog.decode_log(self.log)
+        pgns = self.cache.decode(self.log)
+        self.assertEqual(sorted(pgns), sorted(expected),
+                         msg='Expect the same PGNs.')
+        for pgn, frames in expected.items():
+            for name in ('timestamp', 'priority', 'source', 'destination',
+                         'dlc', 'data'):
+                self.assertEqual(getattr(pgns[pgn], name),
+                                 getattr(frames, name),
+                                 msg=f'Expect the same {pgn} {name}.')
+
+    def test_changed_file(self):
+        """A changed log file is decoded again."""
+        self.cache.decode(self.log)
+        with open(self.log, 'a') as file:
+            file.write(LOG.splitlines()[2] + '\n')
+        pgns = self.cache.decode(self.log)
+        self.assertEqual(len(pgns[127245]), 2,
+                         msg='Expect the new frame to be decoded.')
+
+    def test_corrupt_file(self):
+        """A corrupt cache file is discarded."""
+        key = self.cache.key(self.log)
+        self.cache.decode(self.log)
+        with open(self.cache._path(key), 'r+b') as file:
+            file.truncate(20)
+        with self.assertLogs(level='WARNING'):
+            self.assertIsNone(self.cache.get(key),
+                              msg='Corrupt entry should be a cache miss.')
+
+    def test_evict(self):
+        """Least recently used entries are removed first."""
+        self.cache.put('old', {})
+        os.utime(self.cache._path('old'), (0, 0))
+        self.cache.put('new', {})
+        self.cache.max_bytes = decode_cache.HEADER.size
+        self.cache.evict()
+        self.assertFalse(os.path.exists(self.cache._path('old')),
+                         msg='Oldest entry should be evicted.')
+        self.assertTrue(os.path.exists(self.cache._path('new')),
+                        msg='Newest entry should be kept.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 09:21:50 2026
+
+@author: wmorland
+
+ISO 11783 / J1939 address claim, see NMEA2000/J1939-Address-Claim.md.
+
+Before transmitting, a node claims a source address with an Address Claimed
+message, PGN 60928, holding its 64 bit NAME.  If no other node contests the
+address within 250ms it is ours.  When two nodes claim the same address the
+one with the lower NAME keeps it and the other claims another address, or
+sends Cannot Claim from the NULL address 254 if it cannot.  Requests for
+Address Claimed, PGN 59904, are answered with our claim.
+
+The last address we claimed successfully is saved, and claimed again straight
+away at the next boot, so a transmitter is usually on the bus 250ms after
+starting instead of working through the address range.
+
+The claimer does no I/O itself.  Frames go out with a send(timestamp,
+arbitration_id, data) callable, the same as replay.replay, and received
+messages are fed to it as a listener.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import n2klog
+
+ADDRESS_CLAIM = 60928
+REQUEST = 59904
+GLOBAL = 255
+NULL = 254
+MAX_ADDRESS = 251
+CLAIM_PRIORITY = 6
+CLAIM_TIMEOUT = 0.25
+MARINE = 4
+
+IDLE = 'idle'
+CLAIMING = 'claiming'
+CLAIMED = 'claimed'
+CANNOT_CLAIM = 'cannot claim'
+
+
+def make_name(identity, manufacturer=2046, function=130, device_class=25,
+              device_instance=0, system_instance=0, industry_group=MARINE,
+              arbitrary=True):
+    """
+    Build a 64 bit NAME.
+
+    The defaults are an arbitrary address capable marine device, function
+    130 PC gateway, class 25 inter/intranetwork device, with manufacturer
+    code 2046 which is not assigned to anyone.  identity should be unique to
+    this device, e.g. from the Pi serial number.
+    """
+    return ((identity & 0x1fffff)
+            | (manufacturer & 0x7ff) << 21
+            | (device_instance & 0xff) << 32
+            | (function & 0xff) << 40
+            | (device_class & 0x7f) << 49
+            | (system_instance & 0xf) << 56
+            | (industry_group & 0x7) << 60
+            | (1 if arbitrary else 0) << 63)
+
+
+def parse_name(name):
+    """Split a 64 bit NAME into its fields, the inverse of make_name."""
+    return {'identity': name & 0x1fffff,
+            'manufacturer': (name >> 21) & 0x7ff,
+            'device_instance': (name >> 32) & 0xff,
+            'function': (name >> 40) & 0xff,
+            'device_class': (name >> 49) & 0x7f,
+            'system_instance': (name >> 56) & 0xf,
+            'industry_group': (name >> 60) & 0x7,
+            'arbitrary': bool(name >> 63)}
+
+
+def address_file():
+    """Where claimed addresses are saved."""
+    return os.getenv('N2KADDRESSFILE', os.path.join(
+        os.path.expanduser('~'), '.cache', 'rkr-logger', 'address.json'))
+
+
+def load_address(name, path=None):
+    """The address last claimed with name, or None."""
+    try:
+        with open(address_file() if path is None else path, 'r') as file:
+            return json.load(file).get(f'{name:016x}')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def save_address(name, address, path=None):
+    """Save the address claimed with name."""
+    path = address_file() if path is None else path
+    try:
+        with open(path, 'r') as file:
+            addresses = json.load(file)
+    except (OSError, ValueError):
+        addresses = {}
+    addresses[f'{name:016x}'] = address
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(addresses, file)
+        os.replace(f'{path}.tmp', path)
+    except OSError as error:
+        logging.getLogger('addressclaim').warning(
+            f'Save address: FAIL {error}')
+
+
+class AddressClaimer:
+    """
+    Address claim state machine for one NAME.
+
+    Parameters
+    ----------
+    name : int
+        64 bit NAME, see make_name.
+    send : callable
+        Called as send(timestamp, arbitration_id, data).
+    preferred : int, optional
+        Address to try first when none has been saved.  The default is 128.
+    path : str, optional
+        Saved address file.  The default is address_file().
+    clock : callable, optional
+        The default is time.monotonic.
+    """
+
+    def __init__(self, name, send, preferred=128, path=None,
+                 clock=time.monotonic):
+        self.name = name
+        self.name_bytes = name.to_bytes(8, 'little')
+        self.arbitrary = bool(name >> 63)
+        self.send = send
+        self.preferred = preferred
+        self.path = path
+        self.clock = clock
+        self.state = IDLE
+        self.address = NULL
+        self.deadline = None
+        self.delayed = None
+        self.others = {}        # address to NAME of other claimants
+
+    @property
+    def ready(self):
+        """True once the address is ours to transmit from."""
+        return self.state == CLAIMED
+
+    def _send_claim(self, source):
+        self.send(time.time(),
+                  n2klog.arbitration_id(CLAIM_PRIORITY, ADDRESS_CLAIM,
+                                        source, GLOBAL),
+                  self.name_bytes)
+
+    def _claim(self, address):
+        self.address = address
+        self.state = CLAIMING
+        self.deadline = self.clock() + CLAIM_TIMEOUT
+        self._send_claim(address)
+
+    def _cannot_claim(self, delay=0.0):
+        self.address = NULL
+        self.state = CANNOT_CLAIM
+        if delay:
+            self.delayed = self.clock() + delay
+        else:
+            self._send_claim(NULL)
+        logging.getLogger('addressclaim').warning('Cannot claim an address.')
+
+    def start(self):
+        """Claim the saved address, or the preferred one."""
+        saved = load_address(self.name, self.path)
+        self._claim(self.preferred if saved is None else saved)
+
+    def _next_address(self):
+        """Next address after ours not held by a higher priority NAME."""
+        for step in range(1, MAX_ADDRESS + 2):
+            address = (self.address + step) % (MAX_ADDRESS + 1)
+            other = self.others.get(address)
+            if other is None or other > self.name:
+                return address
+        return None
+
+    def on_message(self, arbitration_id, data):
+        """Handle a received frame."""
+        pf = (arbitration_id >> 16) & 0xff
+        if pf == 238:                       # 60928 Address Claimed
+            self._on_claim(arbitration_id & 0xff, data)
+        elif pf == 234:                     # 59904 Request
+            destination = (arbitration_id >> 8) & 0xff
+            if (destination in (GLOBAL, self.address) and len(data) >= 3
+                    and int.from_bytes(data[:3], 'little') == ADDRESS_CLAIM):
+                self._on_request()
+
+    def __call__(self, msg):
+        self.on_message(msg.arbitration_id, msg.data)
+
+    def _on_claim(self, source, data):
+        if len(data) < 8:
+            return
+        other = int.from_bytes(data[:8], 'little')
+        if other == self.name:
+            return                          # our own claim echoed back
+        if source != NULL:
+            self.others[source] = other
+        if source != self.address or self.state in (IDLE, CANNOT_CLAIM):
+            return
+        if self.name < other:
+            # We win, repeat our claim
+            self._send_claim(self.address)
+            return
+        logging.getLogger('addressclaim').info(
+            f'Lost address {self.address} to NAME {other:016x}')
+        address = self._next_address() if self.arbitrary else None
+        if address is None:
+            self._cannot_claim()
+        else:
+            self._claim(address)
+
+    def _on_request(self):
+        if self.state in (CLAIMING, CLAIMED):
+            self._send_claim(self.address)
+        elif self.state == CANNOT_CLAIM:
+            # Pseudo random delay so two nodes do not collide
+            self.delayed = self.clock() + random.uniform(0, 0.153)
+
+    def poll(self):
+        """
+        Advance timers, call regularly while claiming.
+
+        Returns
+        -------
+        int or None
+            Our address once claimed, otherwise None.
+
+        """
+        now = self.clock()
+        if self.delayed is not None and now >= self.delayed:
+            self.delayed = None
+            self._send_claim(NULL)
+        if self.state == CLAIMING and now >= self.deadline:
+            self.state = CLAIMED
+            save_address(self.name, self.address, self.path)
+            logging.getLogger('addressclaim').info(
+                f'Claimed address {self.address}')
+        return self.address if self.state == CLAIMED else None
+
+
+def claim_address(bus, name, timeout=2.0, **kwargs):
+    """
+    Claim an address on a bus, blocking until done.
+
+    Parameters
+    ----------
+    bus : can.BusABC
+    name : int
+    timeout : float, optional
+        Give up after this many seconds.  The default is 2.
+
+    Returns
+    -------
+    AddressClaimer
+        Keep feeding it received messages so it can defend the address.
+
+    """
+    import replay
+    claimer = AddressClaimer(name, replay.bus_sender(bus), **kwargs)
+    claimer.start()
+    end = time.monotonic() + timeout
+    while claimer.poll() is None and claimer.state != CANNOT_CLAIM:
+        if time.monotonic() >= end:
+            break
+        msg = bus.recv(0.02)
+        if msg is not None and not msg.is_error_frame:
+            claimer(msg)
+    return claimer
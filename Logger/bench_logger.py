@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 14:02:56 2026
+
+@author: wmorland
+
+Benchmark the logger hot path.
+
+Each stage is timed over the same set of synthetic frames from
+traffic.TrafficGenerator:
+
+* decode        nmea.NMEA2000_Frame from a can.Message
+* n2k_format    str(NMEA2000_Frame), the line N2KWriter writes
+* writer .xxx   every writer in BaseRotatingLogger.supported_writers
+* rotating      SizedRotatingLogger with a small max_bytes so it rolls over
+* batch_fill    framebatch.FrameBatch filled from can.Message
+* batch_rotating  the same SizedRotatingLogger written a FrameBatch at a time
+* capture       nmea.capture_can_messages reading from a fake bus
+
+For each stage the result has frames/s, microseconds per frame, the most
+memory the stage had allocated at once above what it started with, the
+tracemalloc peak, and the memory blocks it left allocated per frame, caches
+and leaks rather than what each frame allocates and frees again.  Memory is
+measured in a second pass so tracing does not distort the timings.  The
+process peak RSS is reported once.
+
+    python3 bench_logger.py --frames 20000 --output bench.json
+    python3 bench_logger.py --baseline bench_baseline.json
+    python3 bench_logger.py --save-baseline bench_baseline.json
+
+With --baseline the exit status is 1 if any stage is slower than the baseline
+by more than --tolerance, 10% by default.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+from unittest.mock import patch
+import can
+import nmea
+import cannew
+import traffic
+import framebatch
+
+
+class FakeBus:
+    """Bus that returns prepared messages then interrupts the capture loop."""
+
+    def __init__(self, messages):
+        self.messages = iter(messages)
+
+    def recv(self, timeout=None):
+        try:
+            return next(self.messages)
+        except StopIteration:
+            raise KeyboardInterrupt from None
+
+    def shutdown(self):
+        pass
+
+
+def make_messages(count):
+    """Synthetic can.Message objects from the README traffic mix."""
+    messages = []
+    start = time.time()
+    for timestamp, arbitration_id, data in \
+            traffic.TrafficGenerator().frames(3600.0, start):
+        messages.append(can.Message(timestamp=timestamp,
+                                    arbitration_id=arbitration_id,
+                                    is_extended_id=True, data=data))
+        if len(messages) == count:
+            break
+    return messages
+
+
+def _decode(messages):
+    frame = nmea.NMEA2000_Frame
+    for msg in messages:
+        frame(msg)
+
+
+def _format(frames):
+    for frame in frames:
+        str(frame)
+
+
+def _writer(writer_class, path):
+    def run(messages):
+        writer = writer_class(path)
+        try:
+            for msg in messages:
+                writer.on_message_received(msg)
+        finally:
+            writer.stop()
+    return run
+
+
+def _rotating(path, max_bytes):
+    def run(messages):
+        can_logger = cannew.SizedRotatingLogger(base_filename=path,
+                                                max_bytes=max_bytes)
+        try:
+            for msg in messages:
+                can_logger.on_message_received(msg)
+        finally:
+            can_logger.stop()
+    return run
+
+
+def _batch_fill(messages):
+    batch = framebatch.FrameBatch()
+    for msg in messages:
+        batch.append_message(msg)
+        if batch.full:
+            batch.clear()
+
+
+def _batch_rotating(path, max_bytes):
+    def run(messages):
+        can_logger = cannew.SizedRotatingLogger(base_filename=path,
+                                                max_bytes=max_bytes)
+        batch = framebatch.FrameBatch()
+        try:
+            for msg in messages:
+                batch.append_message(msg)
+                if batch.full:
+                    can_logger.write_batch(batch)
+                    batch.clear()
+            can_logger.write_batch(batch)
+        finally:
+            can_logger.stop()
+    return run
+
+
+def _capture(messages):
+    with patch('nmea.stop_can_bus'):
+        nmea.capture_can_messages(FakeBus(messages))
+
+
+def measure(name, run, items):
+    """
+    Time one stage, then run it again under tracemalloc.
+
+    Returns
+    -------
+    dict
+
+    """
+    count = len(items)
+    start = time.perf_counter()
+    run(items)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    # Measure the peak from here, not including the snapshot itself
+    tracemalloc.reset_peak()
+    current = tracemalloc.get_traced_memory()[0]
+    run(items)
+    peak = tracemalloc.get_traced_memory()[1] - current
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in
+                 after.compare_to(before, 'filename'))
+
+    return {
+        'stage': name,
+        'frames': count,
+        'frames_per_second': count / seconds,
+        'us_per_frame': seconds * 1e6 / count,
+        'tracemalloc_peak_bytes': peak,
+        'retained_blocks_per_frame': blocks / count
+        }
+
+
+def run_benchmarks(count=20000, directory=None):
+    """
+    Run every stage.
+
+    Parameters
+    ----------
+    count : int, optional
+        Frames per stage.  The default is 20000.
+    directory : str, optional
+        Where to write log files.  The default is a temporary directory.
+
+    Returns
+    -------
+    dict
+        'environment' and 'stages', a list of per stage results.
+
+    """
+    logger = logging.getLogger('bench_logger')
+    messages = make_messages(count)
+    frames = [nmea.NMEA2000_Frame(msg) for msg in messages]
+
+    with tempfile.TemporaryDirectory(dir=directory) as work:
+        stages = [('decode', _decode, messages),
+                  ('n2k_format', _format, frames)]
+        for suffix, writer_class in \
+                cannew.BaseRotatingLogger.supported_writers.items():
+            stages.append((f'writer {suffix}',
+                           _writer(writer_class,
+                                   os.path.join(work, f'bench{suffix}')),
+                           messages))
+        stages.append(('rotating', _rotating(os.path.join(work, 'rot.n2k'),
+                                             256 * 1024), messages))
+        stages.append(('batch_fill', _batch_fill, messages))
+        stages.append(('batch_rotating',
+                       _batch_rotating(os.path.join(work, 'batch.n2k'),
+                                       256 * 1024), messages))
+        stages.append(('capture', _capture, messages))
+
+        results = []
+        cwd = os.getcwd()
+        os.chdir(work)   # capture_can_messages writes to the current dir
+        try:
+            for name, run, items in stages:
+                result = measure(name, run, items)
+                logger.info(f'{name}: {result["us_per_frame"]:1.1f}us/frame')
+                results.append(result)
+        finally:
+            os.chdir(cwd)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'can': can.__version__,
+            # ru_maxrss is kilobytes on Linux
+            'peak_rss_bytes': resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss * 1024
+            },
+        'stages': results
+        }
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Compare results with a baseline.
+
+    Returns
+    -------
+    list of str
+        A message for every stage slower than the baseline by more than
+        tolerance.  Empty if there are no regressions.
+
+    """
+    previous = {stage['stage']: stage for stage in baseline['stages']}
+    regressions = []
+    for stage in results['stages']:
+        old = previous.get(stage['stage'])
+        if old is None:
+            continue
+        ratio = stage['us_per_frame'] / old['us_per_frame']
+        if ratio > 1 + tolerance:
+            regressions.append(f'{stage["stage"]}: '
+                               f'{old["us_per_frame"]:1.1f} -> '
+                               f'{stage["us_per_frame"]:1.1f}us/frame '
+                               f'({ratio - 1:+1.0%})')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the logger.')
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare with this JSON file')
+    parser.add_argument('--save-baseline', help='save results as baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.frames)
+    for stage in results['stages']:
+        print(f'{stage["stage"]:12s} {stage["frames_per_second"]:10.0f}/s '
+              f'{stage["us_per_frame"]:8.1f}us '
+              f'{stage["tracemalloc_peak_bytes"] / 1e3:8.1f}kB peak '
+              f'{stage["retained_blocks_per_frame"]:6.2f} retained '
+              f'blocks/frame')
+    print(f'peak RSS {results["environment"]["peak_rss_bytes"] / 1e6:1.1f}MB')
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as file:
+                json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 15:20:37 2026
+
+@author: wmorland
+
+Benchmark the cold start of the Logger and UPS entry points.
+
+Everything here runs at boot on a Pi Zero, so the time to import each script's
+modules matters as much as the hot path.  Each measurement runs in a fresh
+interpreter and the best of several runs is kept.  Results are the time over
+an interpreter that imports nothing, so they are what our code and its
+dependencies cost.
+
+* imports       the modules each entry point imports at the top
+* first_frame   import, create a SizedRotatingLogger and write one frame,
+                the time from starting the capture process to the first frame
+                on disk less bringing up the bus
+
+For each entry point the slowest imports from python -X importtime are listed
+so the next thing to defer is easy to find.
+
+    python3 bench_startup.py --runs 5 --output startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+# Entry point and the modules it imports at the top.
+ENTRY_POINTS = (
+    ('power-monitor', ('ups_lite', 'rkrutils')),
+    ('ups-state', ('ups_lite',)),
+    ('move-logs', ('rkrutils',)),
+    ('can-send', ('nmea', 'can')),
+    ('can-receive', ('nmea', 'can')),
+    ('logger.py', ('nmea',)),
+    )
+
+FIRST_FRAME = '''
+import cannew, can
+logger = cannew.SizedRotatingLogger(base_filename='first.n2k',
+                                    max_bytes=1024 * 1024)
+logger(can.Message(arbitration_id=0x09f10d0f, is_extended_id=True,
+                   data=bytes(8)))
+logger.stop()
+'''
+
+
+def run_python(code, env, cwd=None, options=()):
+    """Run code in a fresh interpreter, return (seconds, stderr)."""
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, *options, '-c', code], env=env,
+                             cwd=cwd, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if process.returncode:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+    return seconds, process.stderr
+
+
+def best_of(code, env, runs, cwd=None):
+    """Best wall clock seconds over runs."""
+    return min(run_python(code, env, cwd)[0] for _ in range(runs))
+
+
+def slowest_imports(code, env, count=5):
+    """
+    The slowest imports by cumulative time, from python -X importtime.
+
+    Returns
+    -------
+    list of tuple
+        (module, microseconds) slowest first.
+
+    """
+    _, stderr = run_python(code, env, options=('-X', 'importtime'))
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            imports.append((fields[2].strip(), int(fields[1])))
+        except (IndexError, ValueError):
+            continue
+    imports.sort(key=lambda x: -x[1])
+    return imports[:count]
+
+
+def run_benchmarks(runs=5, path=None):
+    """
+    Time every entry point and the first frame.
+
+    Parameters
+    ----------
+    runs : int, optional
+        Runs of each, the best is kept.  The default is 5.
+    path : list of str, optional
+        Directories for PYTHONPATH.  The default is the Logger and UPS
+        directories next to this file.
+
+    Returns
+    -------
+    dict
+        'environment' and 'stages', a list of per stage results.
+
+    """
+    if path is None:
+        here = os.path.dirname(os.path.abspath(__file__))
+        path = [here, os.path.join(os.path.dirname(here), 'UPS')]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path))
+    baseline = best_of('pass', env, runs)
+
+    stages = []
+    for name, modules in ENTRY_POINTS:
+        code = f'import {", ".join(modules)}'
+        try:
+            seconds = best_of(code, env, runs) - baseline
+        except RuntimeError as error:
+            stages.append({'stage': name, 'error': str(error)})
+            continue
+        stages.append({'stage': name, 'seconds': seconds,
+                       'slowest': slowest_imports(code, env)})
+
+    with tempfile.TemporaryDirectory() as work:
+        try:
+            seconds = best_of(FIRST_FRAME, env, runs, cwd=work) - baseline
+            stages.append({'stage': 'first_frame', 'seconds': seconds})
+        except RuntimeError as error:
+            stages.append({'stage': 'first_frame', 'error': str(error)})
+
+    return {
+        'environment': {
+            'python': sys.version.split()[0],
+            'interpreter_seconds': baseline
+            },
+        'stages': stages
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark cold start of the Logger entry points.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='write results to this JSON file')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.runs)
+    for stage in results['stages']:
+        if 'error' in stage:
+            print(f'{stage["stage"]:14s} FAIL {stage["error"]}')
+            continue
+        print(f'{stage["stage"]:14s} {stage["seconds"] * 1000:8.1f}ms')
+        for module, microseconds in stage.get('slowest', ()):
+            print(f'{"":14s} {microseconds / 1000:8.1f}ms {module}')
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Nov  3 09:21:48 2026
+
+@author: wmorland
+
+Manage the CAN interface through netlink rather than sudo ip and ifconfig.
+
+nmea.start_can_bus used to run sudo ip link and sudo ifconfig and search
+their text output, a sudo and a process for every check.  The kernel answers
+the same questions, and more, on a netlink route socket.  One RTM_GETLINK
+request returns the link flags, the interface statistics and, for a CAN
+device, the bitrate, the controller state, its transmit and receive error
+counters and the CAN device statistics, bus-off and restart counts.  That
+costs tens of microseconds, cheap enough to ask every second of a capture.
+Setting the bitrate and taking the link up or down are RTM_NEWLINK requests,
+which need CAP_NET_ADMIN, as the supervisor has running from root's crontab.
+
+Where netlink is not available the flags and statistics are read from
+/sys/class/net/<name>, without the CAN state.
+
+A HealthMonitor polls the interface from the capture loop, logs every change
+of controller state, receive overruns and a status line, and recovers from
+bus-off.  The kernel restarts a controller itself restart_ms after bus-off,
+start_can_bus sets it.  If the controller is still bus-off restart_after
+seconds later the monitor restarts it, or takes the link down and up.
+"""
+
+import os
+import time
+import socket
+import struct
+import logging
+from collections import namedtuple
+
+SYSFS = '/sys/class/net'
+
+# linux/netlink.h and linux/rtnetlink.h
+NETLINK_ROUTE = 0
+NLMSG_ERROR = 2
+NLM_F_REQUEST = 0x1
+NLM_F_ACK = 0x4
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+NLA_TYPE_MASK = 0x3fff
+
+# linux/if.h
+IFF_UP = 0x1
+IFF_RUNNING = 0x40
+
+# linux/if_link.h
+IFLA_IFNAME = 3
+IFLA_LINKINFO = 18
+IFLA_STATS64 = 23
+IFLA_INFO_KIND = 1
+IFLA_INFO_DATA = 2
+IFLA_INFO_XSTATS = 3
+
+# linux/can/netlink.h
+IFLA_CAN_BITTIMING = 1
+IFLA_CAN_STATE = 4
+IFLA_CAN_RESTART_MS = 6
+IFLA_CAN_RESTART = 7
+IFLA_CAN_BERR_COUNTER = 8
+STATES = ('ERROR-ACTIVE', 'ERROR-WARNING', 'ERROR-PASSIVE', 'BUS-OFF',
+          'STOPPED', 'SLEEPING')
+ERROR_ACTIVE = STATES[0]
+BUS_OFF = STATES[3]
+
+NLMSGHDR = struct.Struct('=IHHII')
+IFINFOMSG = struct.Struct('=BxHiII')
+RTATTR = struct.Struct('=HH')
+ERROR = struct.Struct('=i')
+U32 = struct.Struct('=I')
+BITTIMING = struct.Struct('=8I')
+BERR_COUNTER = struct.Struct('=HH')
+
+# struct can_device_stats
+DEVICE_STATISTICS = ('bus_error', 'error_warning', 'error_passive', 'bus_off',
+                     'arbitration_lost', 'restarts')
+DEVICE_STATS = struct.Struct(f'={len(DEVICE_STATISTICS)}I')
+
+# The leading fields of struct rtnl_link_stats64, named as in sysfs
+STATISTICS = ('rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes',
+              'rx_errors', 'tx_errors', 'rx_dropped', 'tx_dropped',
+              'multicast', 'collisions', 'rx_length_errors', 'rx_over_errors',
+              'rx_crc_errors', 'rx_frame_errors', 'rx_fifo_errors',
+              'rx_missed_errors')
+STATS64 = struct.Struct(f'={len(STATISTICS)}Q')
+
+# tec and rec are the transmit and receive error counters of the controller
+Health = namedtuple('Health', ('timestamp', 'name', 'up', 'running', 'kind',
+                               'state', 'bitrate', 'restart_ms', 'tec', 'rec')
+                    + DEVICE_STATISTICS + STATISTICS)
+Health.__new__.__defaults__ = (None,) * len(Health._fields)
+
+
+def attribute(kind, payload):
+    """A netlink attribute, padded to 4 bytes."""
+    size = RTATTR.size + len(payload)
+    return RTATTR.pack(size, kind) + payload + b'\0' * (-size % 4)
+
+
+def parse_attributes(data, offset=0):
+    """Attribute type to payload for the attributes from offset on."""
+    attributes = {}
+    end = len(data)
+    while offset + RTATTR.size <= end:
+        size, kind = RTATTR.unpack_from(data, offset)
+        if size < RTATTR.size:
+            break
+        attributes[kind & NLA_TYPE_MASK] = data[offset + RTATTR.size:
+                                                offset + size]
+        offset += (size + 3) & ~3
+    return attributes
+
+
+def parse_link(payload):
+    """
+    Health fields from the payload of an RTM_NEWLINK message.
+
+    Returns
+    -------
+    dict
+        Every Health field but timestamp, None where the link has no value.
+
+    """
+    _, _, _, flags, _ = IFINFOMSG.unpack_from(payload)
+    fields = dict.fromkeys(Health._fields[1:])
+    fields['up'] = bool(flags & IFF_UP)
+    fields['running'] = bool(flags & IFF_RUNNING)
+    attributes = parse_attributes(payload, IFINFOMSG.size)
+    if IFLA_IFNAME in attributes:
+        fields['name'] = attributes[IFLA_IFNAME].rstrip(b'\0').decode()
+    stats = attributes.get(IFLA_STATS64)
+    if stats is not None and len(stats) >= STATS64.size:
+        fields.update(zip(STATISTICS, STATS64.unpack_from(stats)))
+    info = parse_attributes(attributes.get(IFLA_LINKINFO, b''))
+    if IFLA_INFO_KIND in info:
+        fields['kind'] = info[IFLA_INFO_KIND].rstrip(b'\0').decode()
+    xstats = info.get(IFLA_INFO_XSTATS)
+    if xstats is not None and len(xstats) >= DEVICE_STATS.size:
+        fields.update(zip(DEVICE_STATISTICS, DEVICE_STATS.unpack_from(xstats)))
+    data = parse_attributes(info.get(IFLA_INFO_DATA, b''))
+    if IFLA_CAN_STATE in data:
+        state = U32.unpack_from(data[IFLA_CAN_STATE])[0]
+        fields['state'] = STATES[state] if state < len(STATES) else state
+    if IFLA_CAN_BITTIMING in data:
+        fields['bitrate'] = BITTIMING.unpack_from(
+            data[IFLA_CAN_BITTIMING])[0]
+    if IFLA_CAN_RESTART_MS in data:
+        fields['restart_ms'] = U32.unpack_from(data[IFLA_CAN_RESTART_MS])[0]
+    if IFLA_CAN_BERR_COUNTER in data:
+        fields['tec'], fields['rec'] = BERR_COUNTER.unpack_from(
+            data[IFLA_CAN_BERR_COUNTER])
+    return fields
+
+
+class RouteSocket:
+    """A netlink route socket making one request at a time."""
+
+    def __init__(self):
+        self.socket = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW,
+                                    NETLINK_ROUTE)
+        self.socket.bind((0, 0))
+        self.sequence = 0
+
+    def request(self, kind, flags, body):
+        """
+        Send a request and wait for its answer.
+
+        Returns
+        -------
+        bytes or None
+            The payload of the answer, None for an acknowledgement.
+
+        Raises
+        ------
+        OSError
+            With the errno the kernel answered, e.g. ENODEV or EPERM.
+
+        """
+        self.sequence = (self.sequence + 1) & 0xffffffff
+        self.socket.send(NLMSGHDR.pack(NLMSGHDR.size + len(body), kind,
+                                       NLM_F_REQUEST | flags, self.sequence,
+                                       0) + body)
+        while True:
+            data = self.socket.recv(65536)
+            offset = 0
+            while offset + NLMSGHDR.size <= len(data):
+                size, kind, _, sequence, _ = NLMSGHDR.unpack_from(data, offset)
+                if size < NLMSGHDR.size:
+                    break
+                payload = data[offset + NLMSGHDR.size:offset + size]
+                offset += (size + 3) & ~3
+                if sequence != self.sequence:
+                    continue
+                if kind == NLMSG_ERROR:
+                    error = -ERROR.unpack_from(payload)[0]
+                    if error:
+                        raise OSError(error, os.strerror(error))
+                    return None
+                return payload
+
+    def close(self):
+        self.socket.close()
+
+
+class CANInterface:
+    """
+    Query and configure a network interface, can0 by default.
+
+    Parameters
+    ----------
+    name : str, optional
+        The default is 'can0'.
+    sysfs : str, optional
+        Where to read interfaces when netlink is not available.  The default
+        is /sys/class/net.
+    """
+
+    def __init__(self, name='can0', sysfs=SYSFS):
+        self.name = name
+        self.sysfs = sysfs
+        self.route = None
+        self.netlink = hasattr(socket, 'AF_NETLINK')
+
+    def _request(self, kind, flags, body):
+        if self.route is None:
+            self.route = RouteSocket()
+        return self.route.request(kind, flags, body)
+
+    def _link(self, flags=0, change=0, attributes=b''):
+        """ifinfomsg naming the interface, with attributes."""
+        return (IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, flags, change)
+                + attribute(IFLA_IFNAME, self.name.encode() + b'\0')
+                + attributes)
+
+    def _set(self, flags=0, change=0, attributes=b''):
+        self._request(RTM_NEWLINK, NLM_F_ACK,
+                      self._link(flags, change, attributes))
+
+    def _set_can(self, data):
+        self._set(attributes=attribute(
+            IFLA_LINKINFO, attribute(IFLA_INFO_KIND, b'can')
+            + attribute(IFLA_INFO_DATA, data)))
+
+    def _sysfs_health(self):
+        directory = os.path.join(self.sysfs, self.name)
+        with open(os.path.join(directory, 'flags'), 'r') as file:
+            flags = int(file.read(), 16)
+        with open(os.path.join(directory, 'operstate'), 'r') as file:
+            operstate = file.read().strip()
+        # RUNNING is not in the sysfs flags, it follows the operational state
+        fields = {'name': self.name, 'up': bool(flags & IFF_UP),
+                  'running': bool(flags & IFF_UP)
+                  and operstate in ('up', 'unknown')}
+        for name in STATISTICS:
+            try:
+                with open(os.path.join(directory, 'statistics', name),
+                          'r') as file:
+                    fields[name] = int(file.read())
+            except (OSError, ValueError):
+                pass
+        return fields
+
+    def health(self):
+        """
+        The link flags, CAN controller state and counters.
+
+        Returns
+        -------
+        Health
+
+        Raises
+        ------
+        OSError
+            If there is no such interface.
+
+        """
+        timestamp = time.time()
+        if self.netlink:
+            try:
+                payload = self._request(RTM_GETLINK, 0, self._link())
+            except OSError as error:
+                if self.route is not None:
+                    raise
+                # No netlink socket, e.g. a restricted sandbox
+                logging.getLogger('canif').warning(
+                    f'Netlink: FAIL {error}, reading {self.sysfs}')
+                self.netlink = False
+            else:
+                return Health(timestamp, **parse_link(payload))
+        return Health(timestamp, **self._sysfs_health())
+
+    def is_running(self):
+        """True if the link is up and running."""
+        health = self.health()
+        return health.up and health.running
+
+    def configure(self, bitrate=None, restart_ms=None):
+        """
+        Set the bitrate and the automatic restart after bus-off.
+
+        The link must be down to change the bitrate.
+
+        Parameters
+        ----------
+        bitrate : int, optional
+            Bits per second, the kernel works out the bit timing.
+        restart_ms : int, optional
+            Milliseconds after bus-off until the kernel restarts the
+            controller, 0 to leave it bus-off.
+        """
+        data = b''
+        if bitrate is not None:
+            data += attribute(IFLA_CAN_BITTIMING,
+                              BITTIMING.pack(bitrate, 0, 0, 0, 0, 0, 0, 0))
+        if restart_ms is not None:
+            data += attribute(IFLA_CAN_RESTART_MS, U32.pack(restart_ms))
+        self._set_can(data)
+
+    def set_up(self, up=True):
+        """Take the link up, or down."""
+        self._set(IFF_UP if up else 0, IFF_UP)
+
+    def restart(self):
+        """Restart a bus-off controller now."""
+        self._set_can(attribute(IFLA_CAN_RESTART, U32.pack(1)))
+
+    def close(self):
+        if self.route is not None:
+            self.route.close()
+            self.route = None
+
+
+def interface_for_bus(bus):
+    """The CANInterface of a SocketCAN bus, None for any other bus."""
+    if 'socketcan' not in str(getattr(bus, 'channel_info', '')):
+        return None
+    return CANInterface(getattr(bus, 'channel', None) or 'can0')
+
+
+def overruns(health):
+    """Frames the controller or driver lost because nothing read them."""
+    return (health.rx_over_errors or 0) + (health.rx_fifo_errors or 0)
+
+
+class HealthMonitor:
+    """
+    Poll a CAN interface, log its health and recover from bus-off.
+
+    Parameters
+    ----------
+    interface : CANInterface
+    interval : float, optional
+        Seconds between polls.  The default is 1.
+    status_interval : float, optional
+        Seconds between status lines in the process log.  The default is 60.
+    restart_after : float, optional
+        Seconds bus-off before the monitor restarts the controller.  The
+        default is 2, leaving the kernel time to restart it first.
+    clock : callable, optional
+        The default is time.monotonic.
+    """
+
+    def __init__(self, interface, interval=1.0, status_interval=60.0,
+                 restart_after=2.0, clock=time.monotonic):
+        self.interface = interface
+        self.interval = interval
+        self.status_interval = status_interval
+        self.restart_after = restart_after
+        self.clock = clock
+        self.latest = None
+        self.next_poll = clock()
+        self.next_status = self.next_poll + status_interval
+        self.bus_off_since = None
+        self.recoveries = 0
+        self.failed = False
+
+    def recover(self):
+        """
+        Restart a bus-off controller, or take the link down and up.
+
+        Returns
+        -------
+        bool
+            True if the interface accepted either.
+
+        """
+        logger = logging.getLogger('canif')
+        name = self.interface.name
+        try:
+            self.interface.restart()
+        except OSError as error:
+            logger.warning(f'{name} restart: FAIL {error}')
+            try:
+                self.interface.set_up(False)
+                self.interface.set_up(True)
+            except OSError as error:
+                logger.error(f'{name} down and up: FAIL {error}')
+                return False
+        logger.info(f'{name} restarted after bus-off')
+        self.recoveries += 1
+        return True
+
+    def status_line(self, health):
+        """One line summary for the process log."""
+        return (f'{health.name} state={health.state} '
+                f'bitrate={health.bitrate} tec={health.tec} '
+                f'rec={health.rec} bus_off={health.bus_off} '
+                f'restarts={health.restarts} rx_errors={health.rx_errors} '
+                f'rx_overruns={overruns(health)} '
+                f'rx_dropped={health.rx_dropped} '
+                f'recoveries={self.recoveries}')
+
+    def poll(self, force=False):
+        """
+        Read the interface health if a poll is due or force is set.
+
+        Returns
+        -------
+        Health or None
+            The latest health, None if the interface cannot be read.
+
+        """
+        now = self.clock()
+        if now < self.next_poll and not force:
+            return self.latest
+        self.next_poll = now + self.interval
+        logger = logging.getLogger('canif')
+        try:
+            health = self.interface.health()
+        except OSError as error:
+            if not self.failed:
+                logger.warning(f'{self.interface.name} health: FAIL {error}')
+            self.failed = True
+            return None
+        self.failed = False
+        previous = self.latest
+        self.latest = health
+        if previous is not None:
+            if health.state != previous.state:
+                logger.log(logging.INFO if health.state == ERROR_ACTIVE
+                           else logging.WARNING,
+                           f'{health.name} state {previous.state} to '
+                           f'{health.state}')
+            lost = overruns(health) - overruns(previous)
+            if lost > 0:
+                logger.warning(f'{health.name} rx overruns: {lost}')
+        if health.state == BUS_OFF:
+            if self.bus_off_since is None:
+                self.bus_off_since = now
+            elif now - self.bus_off_since >= self.restart_after:
+                self.recover()
+                self.bus_off_since = now
+        else:
+            self.bus_off_since = None
+        if now >= self.next_status or force:
+            self.next_status = now + self.status_interval
+            logger.info(self.status_line(health))
+        return health
+
+    def snapshot(self):
+        """The latest health as a dict that can be written as JSON."""
+        if self.latest is None:
+            return None
+        snapshot = self.latest._asdict()
+        snapshot['recoveries'] = self.recoveries
+        return snapshot
+
+    def close(self):
+        self.interface.close()
+
+
+class MonitorGroup:
+    """HealthMonitors for the interfaces of a canmerge.MergedBus."""
+
+    def __init__(self, monitors):
+        self.monitors = monitors        # channel to HealthMonitor
+
+    def poll(self, force=False):
+        for monitor in self.monitors.values():
+            monitor.poll(force)
+
+    def snapshot(self):
+        return {channel: monitor.snapshot()
+                for channel, monitor in self.monitors.items()}
+
+    def close(self):
+        for monitor in self.monitors.values():
+            monitor.close()
+
+
+def monitor_bus(bus, **kwargs):
+    """
+    A HealthMonitor for a SocketCAN bus.
+
+    Returns
+    -------
+    HealthMonitor, MonitorGroup or None
+        A MonitorGroup for a merged bus, None if no bus is SocketCAN.
+
+    """
+    buses = getattr(bus, 'buses', None)
+    if buses is not None:
+        monitors = {}
+        for channel, channel_bus in buses.items():
+            monitor = monitor_bus(channel_bus, **kwargs)
+            if monitor is not None:
+                monitors[channel] = monitor
+        return MonitorGroup(monitors) if monitors else None
+    interface = interface_for_bus(bus)
+    return None if interface is None else HealthMonitor(interface, **kwargs)
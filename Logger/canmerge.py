@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Nov  4 09:12:05 2026
+
+@author: wmorland
+
+Capture from several CAN interfaces in one process.
+
+A second NMEA 2000 bus, or a separate engine network, should not need a
+second logger with its own copy of the whole pipeline.  A MergedBus reads
+each interface, can0, can1, vcan0 and so on, in its own thread into a
+bounded queue and merges the queues in timestamp order with a k-way merge on
+a heap that holds at most one frame per interface.  To capture_can_messages
+it looks like one bus, every message tagged with its channel.
+
+The frame with the lowest timestamp is only given out once every interface
+has a frame waiting, or once it is latency seconds old, so an idle interface
+holds the others back by no more than latency.  A frame that reaches its
+reader later than that comes out late and is counted in late.  When a queue
+is full its reader waits and the kernel socket buffer takes the backlog.
+
+Frames are written either to one log, with the channel of each frame in a
+sidecar foo.n2k.ch next to foo.n2k since the canboat plain format has no
+channel column, or each channel to its own log, foo.n2k for the first and
+foo.can1.n2k and so on for the others.
+
+Sidecar file layout:
+
+    header      b'N2KC', u16 version, u16 length of the names
+    names       the channel names, UTF-8, separated by newlines
+    tags        u8 index into the names for each frame in the log, in order
+"""
+
+import os
+import time
+import heapq
+import struct
+import logging
+import threading
+from array import array
+from collections import deque
+import n2klog
+
+CHANNEL_SUFFIX = '.ch'
+MAGIC = b'N2KC'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+
+
+def channel_path(log_path):
+    """Return the sidecar channel file name for a log file."""
+    return f'{log_path}{CHANNEL_SUFFIX}'
+
+
+def channel_log_path(log_path, channel):
+    """Log file for one channel when each channel has its own, foo.can1.n2k."""
+    base, suffix = os.path.splitext(str(log_path))
+    return f'{base}.{channel}{suffix}'
+
+
+class ChannelTags:
+    """The channel of each frame written to one log file."""
+
+    def __init__(self):
+        self.names = []
+        self.indexes = {}
+        self.tags = array('B')
+
+    def add(self, channel):
+        index = self.indexes.get(channel)
+        if index is None:
+            index = self.indexes[channel] = len(self.names)
+            self.names.append(str(channel))
+        self.tags.append(index)
+
+    def write(self, path):
+        names = '\n'.join(self.names).encode()
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, len(names)))
+            file.write(names)
+            self.tags.tofile(file)
+
+
+def read_channels(log_path):
+    """
+    The channel of each frame in a log file.
+
+    Returns
+    -------
+    list of str or None
+        None if the log has no sidecar.
+
+    """
+    try:
+        with open(channel_path(log_path), 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+    magic, version, size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+    names = data[HEADER.size:HEADER.size + size].decode().split('\n')
+    return [names[tag] for tag in data[HEADER.size + size:]]
+
+
+def read_tagged_frames(path, default=None):
+    """
+    Iterate over the frames in a log file with their channels.
+
+    Parameters
+    ----------
+    path : str
+    default : str, optional
+        Channel of every frame when the log has no sidecar.
+
+    Yields
+    ------
+    tuple
+        (channel, (timestamp, priority, pgn, source, destination, data))
+
+    """
+    channels = read_channels(path)
+    for i, frame in enumerate(n2klog.read_frames(path)):
+        yield (channels[i] if channels is not None and i < len(channels)
+               else default), frame
+
+
+class MergedBus:
+    """
+    Several CAN buses read by one thread each and merged in time order.
+
+    Parameters
+    ----------
+    buses : dict
+        Channel name to can.BusABC, the first is the primary channel.
+    latency : float, optional
+        Seconds an interface with nothing waiting can hold back the others.
+        The default is 0.05.
+    maxsize : int, optional
+        Frames queued per interface before its reader waits.  The default is
+        1024.
+    poll : float, optional
+        Receive timeout of the reader threads, how quickly they stop.  The
+        default is 0.5.
+    """
+
+    def __init__(self, buses, latency=0.05, maxsize=1024, poll=0.5):
+        self.buses = dict(buses)
+        self.channels = list(self.buses)
+        self.primary = self.channels[0]
+        self.channel_info = f'merged {", ".join(self.channels)}'
+        self.latency = latency
+        self.maxsize = maxsize
+        self.poll = poll
+        self.queues = [deque() for _ in self.channels]
+        self.condition = threading.Condition()
+        self.heap = []              # (timestamp, stream, msg)
+        self.missing = set(range(len(self.channels)))
+        self.last = float('-inf')
+        self.late = 0
+        self.waits = 0
+        self.stopping = False
+        self.threads = []
+
+    def start(self):
+        """Start a reader thread for every interface."""
+        if self.threads:
+            return
+        self.stopping = False
+        for stream, channel in enumerate(self.channels):
+            thread = threading.Thread(target=self._read, args=(stream,),
+                                      name=f'read-{channel}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _read(self, stream):
+        channel = self.channels[stream]
+        bus = self.buses[channel]
+        queue = self.queues[stream]
+        condition = self.condition
+        maxsize = self.maxsize
+        while not self.stopping:
+            try:
+                msg = bus.recv(self.poll)
+            except Exception as error:
+                # can.CanError or OSError, e.g. the interface went away
+                logging.getLogger('canmerge').error(
+                    f'{channel} recv: FAIL {error!r}')
+                time.sleep(self.poll)
+                continue
+            if msg is None:
+                continue
+            msg.channel = channel
+            with condition:
+                if len(queue) >= maxsize:
+                    self.waits += 1
+                    while len(queue) >= maxsize and not self.stopping:
+                        condition.wait(self.poll)
+                queue.append(msg)
+                condition.notify_all()
+
+    def _fill(self):
+        """Move the next frame of every stream not on the heap onto it."""
+        queues = self.queues
+        filled = False
+        for stream in list(self.missing):
+            queue = queues[stream]
+            if queue:
+                msg = queue.popleft()
+                heapq.heappush(self.heap, (msg.timestamp, stream, msg))
+                self.missing.discard(stream)
+                filled = True
+        if filled:
+            self.condition.notify_all()     # readers waiting for space
+
+    def recv(self, timeout=None):
+        """
+        The next frame in timestamp order, can.BusABC.recv.
+
+        Returns
+        -------
+        can.Message or None
+            None if nothing can be given out within timeout seconds.
+
+        """
+        if not self.threads:
+            self.start()
+        end = None if timeout is None else time.monotonic() + timeout
+        heap = self.heap
+        with self.condition:
+            while True:
+                if self.missing:
+                    self._fill()
+                wait = None
+                if heap:
+                    timestamp = heap[0][0]
+                    wait = timestamp + self.latency - time.time()
+                    if not self.missing or wait <= 0:
+                        _, stream, msg = heapq.heappop(heap)
+                        self.missing.add(stream)
+                        if timestamp < self.last:
+                            self.late += 1
+                        else:
+                            self.last = timestamp
+                        return msg
+                if end is not None:
+                    remaining = end - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait,
+                                                              remaining)
+                self.condition.wait(wait)
+
+    def send(self, msg, timeout=None):
+        """Send on the bus of msg.channel, or the primary bus."""
+        bus = self.buses.get(getattr(msg, 'channel', None),
+                             self.buses[self.primary])
+        bus.send(msg, timeout)
+
+    def set_filters(self, filters=None):
+        """Set the same filters on every bus."""
+        for bus in self.buses.values():
+            bus.set_filters(filters)
+
+    def stop(self):
+        """Stop the reader threads."""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def shutdown(self):
+        """Stop the readers and shut down every bus."""
+        self.stop()
+        for bus in self.buses.values():
+            bus.shutdown()
@@ -7,17 +7,101 @@ Created on Fri Feb  5 18:52:25 2021
 """
 
 import os
+import sys
+import shutil
+import json
+import time
+import importlib
+from importlib import metadata
 import can
 from datetime import datetime
 import pathlib
 import typing
 from typing import Optional, Callable, Union, TextIO, BinaryIO
 from abc import ABC, ABCMeta, abstractmethod
-import nema
+import nmea
+import n2kindex
+import rkrutils
+import lazyimport
+
+# Only needed for the channel tags of a merged log, so loaded when first used
+canmerge = lazyimport.lazy_import('canmerge')
 
 
 StringPathLike = typing.Union[str, "os.PathLike[str]"]
 
+PLUGIN_GROUP = 'can.io.message_writer'
+
+
+def plugin_cache_path():
+    """Where the writer plugin registry is cached."""
+    return os.getenv('N2KPLUGINCACHE', os.path.join(
+        os.path.expanduser('~'), '.cache', 'rkr-logger',
+        'writer-plugins.json'))
+
+
+def _plugin_fingerprint():
+    # Installing or removing a package changes the mtime of its directory on
+    # sys.path, which is far cheaper to check than scanning every package.
+    fingerprint = [can.__version__]
+    for entry in sys.path:
+        try:
+            fingerprint.append(f'{entry}:{os.stat(entry).st_mtime_ns}')
+        except OSError:
+            pass
+    return fingerprint
+
+
+def writer_plugins(cache_path=None):
+    """
+    Find the message writer plugins installed for python-can.
+
+    Scanning the entry points of every installed package takes seconds on a
+    Pi Zero, so the result is cached in a file until a package is installed
+    or removed.
+
+    Returns
+    -------
+    dict
+        File suffix to 'module:attribute' of the writer class.
+
+    """
+    if cache_path is None:
+        cache_path = plugin_cache_path()
+    fingerprint = _plugin_fingerprint()
+    try:
+        with open(cache_path, 'r') as file:
+            cached = json.load(file)
+        if cached['fingerprint'] == fingerprint:
+            return cached['plugins']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        entry_points = entry_points.select(group=PLUGIN_GROUP)
+    else:
+        entry_points = entry_points.get(PLUGIN_GROUP, ())
+    plugins = {entry.name: entry.value for entry in entry_points}
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp = f'{cache_path}.tmp'
+        with open(temp, 'w') as file:
+            json.dump({'fingerprint': fingerprint, 'plugins': plugins}, file)
+        os.replace(temp, cache_path)
+    except OSError:
+        pass
+    return plugins
+
+
+def load_plugin(value):
+    """Import the object named by an entry point value, 'module:attribute'."""
+    module_name, _, attribute = value.partition(':')
+    loaded = importlib.import_module(module_name)
+    for name in filter(None, attribute.split('.')):
+        loaded = getattr(loaded, name)
+    return loaded
+
 
 class MessageWriter(can.io.generic.BaseIOHandler, can.Listener,
                     metaclass=ABCMeta):
@@ -55,9 +139,18 @@ class N2KWriter(can.io.generic.BaseIOHandler, can.Listener):
     ================ ======================= =======================
 
     Each line is terminated with a platform specific line separator.
+
+    When index is set a sidecar index, see :mod:`n2kindex`, is written next to
+    the log file when the writer is stopped so that readers can seek straight
+    to a time window or PGN.
+
+    When channels is set the channel of each message, for a log merged from
+    several interfaces, is written to a sidecar, see :mod:`canmerge`, when
+    the writer is stopped.
     """
 
-    def __init__(self, file, append=False):
+    def __init__(self, file, append=False, index=False, index_frames=1000,
+                 channels=False):
         """
         :param file: a path-like object or a file-like object to write to.
                      If this is a file-like object, is has to open in text
@@ -66,23 +159,72 @@ class N2KWriter(can.io.generic.BaseIOHandler, can.Listener):
                             the file and no header line is written, else
                             the file is truncated and starts with a newly
                             written header line
+        :param bool index: if set to `True` a sidecar index file is written
+                           when the writer is stopped.  Ignored when
+                           appending or writing to a file-like object.
+        :param int index_frames: add an index checkpoint at least every
+                                 index_frames frames as well as every second
+        :param bool channels: if set to `True` a sidecar with the channel of
+                              each message is written when the writer is
+                              stopped.  Ignored when appending or writing to
+                              a file-like object.
         """
         mode = 'a' if append else 'w'
         super(N2KWriter, self).__init__(file, mode=mode)
 
+        self._index = None
+        self._offset = 0
+        if index and not append and isinstance(file, (str, os.PathLike)):
+            self._index = n2kindex.IndexBuilder(every_frames=index_frames)
+        self._channels = None
+        if channels and not append and isinstance(file, (str, os.PathLike)):
+            self._channels = canmerge.ChannelTags()
+
         # Write a header row
         if not append:
-            self.file.write('timestamp,priority,pgn,source,destination,dlc,'
-                            'data\n')
+            header = 'timestamp,priority,pgn,source,destination,dlc,data\n'
+            self.file.write(header)
+            self._offset = len(header)
 
     def on_message_received(self, msg):
         """Write message to file in NMEA2000 plain format."""
         assert msg.is_extended_id  # NEMA2000 messages are always extended ID
         assert msg.dlc == 8        # NEMA2000 messages always have 8 data bytes
 
-        nema_msg = nema.NMEA2000_Frame(msg)
-        self.file.write(str(nema_msg))
-        self.file.write('\n')
+        nmea_msg = nmea.NMEA2000_Frame(msg)
+        line = f'{nmea_msg}\n'
+        if self._index is not None:
+            # The log is plain ASCII so characters and bytes are the same.
+            self._index.add(self._offset, msg.timestamp, nmea_msg.pgn)
+            self._offset += len(line)
+        if self._channels is not None:
+            self._channels.add(msg.channel)
+        self.file.write(line)
+
+    def write_batch(self, batch):
+        """Write every frame of a framebatch.FrameBatch with one write."""
+        lines = batch.lines()
+        if self._index is not None:
+            timestamps = batch.timestamp
+            pgns = batch.pgn
+            for i, line in enumerate(lines):
+                self._index.add(self._offset, timestamps[i], pgns[i])
+                self._offset += len(line)
+        if self._channels is not None:
+            for _ in lines:
+                self._channels.add(batch.channel)
+        self.file.write(''.join(lines))
+
+    def stop(self):
+        """Close the file, writing any sidecar index and channels."""
+        if self._index is not None:
+            index = self._index.finish(self._offset)
+            self._index = None
+            index.write(n2kindex.index_path(self.file.name))
+        if self._channels is not None:
+            self._channels.write(canmerge.channel_path(self.file.name))
+            self._channels = None
+        super(N2KWriter, self).stop()
 
 
 class Logger(can.io.generic.BaseIOHandler, can.Listener):
@@ -104,6 +246,7 @@ class Logger(can.io.generic.BaseIOHandler, can.Listener):
     """
 
     fetched_plugins = False
+    plugins: dict = {}
     message_writers = {
         ".asc": can.ASCWriter,
         ".blf": can.BLFWriter,
@@ -126,16 +269,14 @@ class Logger(can.io.generic.BaseIOHandler, can.Listener):
             return can.Printer(*args, **kwargs)
 
         if not Logger.fetched_plugins:
-            Logger.message_writers.update(
-                {
-                    writer.name: writer.load()
-                    for writer in
-                    can.iter_entry_points("can.io.message_writer")
-                }
-            )
+            Logger.plugins = writer_plugins()
             Logger.fetched_plugins = True
 
         suffix = pathlib.PurePath(filename).suffix.lower()
+        # Only the plugin for this suffix is imported
+        plugin = Logger.plugins.pop(suffix, None)
+        if plugin is not None:
+            Logger.message_writers[suffix] = load_plugin(plugin)
         try:
             return Logger.message_writers[suffix](filename, *args, **kwargs)
         except KeyError:
@@ -180,6 +321,8 @@ class BaseRotatingLogger(can.Listener, ABC):
     namer: Optional[Callable] = None
     rotator: Optional[Callable] = None
     rollover_count: int = 0
+    last_rollover_duration: float = 0.0
+    bytes_rotated: int = 0
     _writer: Optional[FileIOMessageWriter] = None
 
     def __init__(self, *args, **kwargs):
@@ -233,11 +376,33 @@ class BaseRotatingLogger(can.Listener, ABC):
         :param msg:
             the delivered message
         """
+        self._rollover(msg)
+        self.writer.on_message_received(msg)
+
+    def _rollover(self, msg):
         if self.should_rollover(msg):
+            start = time.perf_counter()
             self.do_rollover()
+            self.last_rollover_duration = time.perf_counter() - start
             self.rollover_count += 1
 
-        self.writer.on_message_received(msg)
+    def write_batch(self, batch):
+        """Write a framebatch.FrameBatch.
+
+        Rollover is checked once per batch, with the first frame, so a file
+        can go over its size by up to one batch.
+        :param batch:
+            the frames to write
+        """
+        if not len(batch):
+            return
+        self._rollover(None)
+        write_batch = getattr(self.writer, 'write_batch', None)
+        if write_batch is not None:
+            write_batch(batch)
+        else:
+            for msg in batch.messages():
+                self.writer.on_message_received(msg)
 
     def get_new_writer(self, filename: StringPathLike):
         """Instantiate a new writer.
@@ -261,6 +426,10 @@ class BaseRotatingLogger(can.Listener, ABC):
                 filename, *self.writer_args, **self.writer_kwargs
             )
 
+    def bytes_written(self) -> int:
+        """Total bytes written to this and previously rotated files."""
+        return self.bytes_rotated + self.writer.file.tell()
+
     def stop(self):
         """Stop handling new messages.
         Carry out any final tasks to ensure
@@ -337,11 +506,24 @@ class SizedRotatingLogger(BaseRotatingLogger):
 
     def do_rollover(self):
         if self.writer:
+            self.bytes_rotated += self.writer.file.tell()
             self.writer.stop()
 
         sfn = self.base_filename
         dfn = self.rotation_filename(self._default_name())
         self.rotate(sfn, dfn)
+        # Keep any sidecar index, channels and transport messages with their
+        # log file
+        for sidecar_path in rkrutils.renamed_sidecars():
+            sidecar = sidecar_path(sfn)
+            if os.path.exists(sidecar):
+                os.rename(sidecar, sidecar_path(dfn))
+        # The device inventory and source selections go on for the next
+        # file, so copy them
+        for sidecar_path in rkrutils.copied_sidecars():
+            sidecar = sidecar_path(sfn)
+            if os.path.exists(sidecar):
+                shutil.copyfile(sidecar, sidecar_path(dfn))
 
         self.get_new_writer(self.base_filename)
 
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Nov  5 09:17:33 2026
+
+@author: wmorland
+
+Frames held a batch at a time in preallocated columns.
+
+Frame by frame the Logger makes a can.Message, about 18 slots, then an
+NMEA2000_Frame, 18 more and a datetime, just to write one line, and analysis
+makes a tuple per frame.  A FrameBatch holds up to capacity frames in
+columns allocated once and reused:
+
+* timestamp         f64
+* arbitration_id    u32
+* dlc               u8
+* data              8 bytes per frame, padded with 0xff, in one bytearray
+* priority, pgn, source and destination decoded from the arbitration id as
+  each frame is added
+
+Batches are filled from a bus with receive, or from a log file with
+read_batches, which parses each second's timestamp prefix once.  select
+keeps the frames of some PGNs by compacting the columns in place, lines
+formats a batch in the plain log format with one prefix per second and
+bytes.hex for the data, and N2KWriter.write_batch writes it with one call.
+nmea.capture_can_messages receives, selects and writes a batch at a time,
+and gives listeners a Frame tuple per frame instead of a can.Message.
+decode_batches adds batches to per PGN n2klog.PGNFrames for analysis.
+
+numpy is not needed, the logger on the Pi runs without it.  Where it is
+installed, columns gives zero copy numpy views for vectorised analysis.
+"""
+
+import time
+from array import array
+from datetime import datetime
+from collections import namedtuple
+import n2klog
+
+DEFAULT_CAPACITY = 1024
+FRAME_SIZE = 8
+PAD = tuple(b'\xff' * (FRAME_SIZE - n) for n in range(FRAME_SIZE + 1))
+
+# The fields of a can.Message that capture listeners read
+Frame = namedtuple('Frame', ['timestamp', 'arbitration_id', 'data',
+                             'channel'])
+
+
+class FrameBatch:
+    """
+    Up to capacity frames in preallocated columns.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        The default is DEFAULT_CAPACITY.
+    channel : str, optional
+        The channel the frames came from, for a merged log.
+    """
+
+    __slots__ = (
+        'capacity',
+        'size',
+        'errors',
+        'channel',
+        'timestamp',
+        'arbitration_id',
+        'dlc',
+        'data',
+        'priority',
+        'pgn',
+        'source',
+        'destination'
+        )
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, channel=None):
+        self.capacity = capacity
+        self.size = 0
+        self.errors = 0
+        self.channel = channel
+        self.timestamp = array('d', bytes(8 * capacity))
+        self.arbitration_id = array('I', bytes(4 * capacity))
+        self.dlc = array('B', bytes(capacity))
+        self.data = bytearray(b'\xff' * (FRAME_SIZE * capacity))
+        self.priority = array('B', bytes(capacity))
+        self.pgn = array('I', bytes(4 * capacity))
+        self.source = array('B', bytes(capacity))
+        self.destination = array('B', bytes(capacity))
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def full(self):
+        return self.size >= self.capacity
+
+    def clear(self):
+        """Empty the batch, keeping its buffers."""
+        self.size = 0
+        self.errors = 0
+
+    def append(self, timestamp, arbitration_id, data):
+        """
+        Add a frame.
+
+        Raises
+        ------
+        IndexError
+            If the batch is full.
+
+        """
+        i = self.size
+        if i >= self.capacity:
+            raise IndexError('FrameBatch is full')
+        self.timestamp[i] = timestamp
+        self.arbitration_id[i] = arbitration_id
+        size = len(data)
+        if size > FRAME_SIZE:
+            data = data[:FRAME_SIZE]
+            size = FRAME_SIZE
+        self.dlc[i] = size
+        at = i * FRAME_SIZE
+        self.data[at:at + size] = data
+        if size < FRAME_SIZE:
+            self.data[at + size:at + FRAME_SIZE] = PAD[size]
+        self.priority[i] = (arbitration_id >> 26) & 0x7
+        pf = (arbitration_id >> 16) & 0xff
+        if pf < 240:
+            self.pgn[i] = (arbitration_id >> 8) & 0x3ff00
+            self.destination[i] = (arbitration_id >> 8) & 0xff
+        else:
+            self.pgn[i] = (arbitration_id >> 8) & 0x3ffff
+            self.destination[i] = 255
+        self.source[i] = arbitration_id & 0xff
+        self.size = i + 1
+
+    def append_message(self, msg):
+        """Add a can.Message."""
+        self.append(msg.timestamp, msg.arbitration_id, msg.data)
+
+    def append_frame(self, timestamp, priority, pgn, source, destination,
+                     data):
+        """Add a frame as read by n2klog.read_frames."""
+        self.append(timestamp,
+                    n2klog.arbitration_id(priority, pgn, source, destination),
+                    data)
+
+    def frame_data(self, i):
+        """Return the data bytes for frame i."""
+        at = i * FRAME_SIZE
+        return bytes(self.data[at:at + self.dlc[i]])
+
+    def frame(self, i):
+        """Frame i as a Frame, for listeners that take a can.Message."""
+        return Frame(self.timestamp[i], self.arbitration_id[i],
+                     self.frame_data(i), self.channel)
+
+    def frames(self):
+        """
+        Iterate over the frames as n2klog.read_frames gives them.
+
+        Yields
+        ------
+        tuple
+            (timestamp, priority, pgn, source, destination, data)
+
+        """
+        for i in range(self.size):
+            yield (self.timestamp[i], self.priority[i], self.pgn[i],
+                   self.source[i], self.destination[i], self.frame_data(i))
+
+    def items(self):
+        """Iterate over (timestamp, arbitration_id, data) as for replay."""
+        for i in range(self.size):
+            yield self.timestamp[i], self.arbitration_id[i], \
+                self.frame_data(i)
+
+    def messages(self):
+        """Iterate over the frames as can.Message, for other writers."""
+        import can
+        for timestamp, arbitration_id, data in self.items():
+            yield can.Message(timestamp=timestamp,
+                              arbitration_id=arbitration_id,
+                              is_extended_id=True, data=data,
+                              channel=self.channel)
+
+    def select(self, pgns):
+        """
+        Keep only the frames of some PGNs, compacting the columns in place.
+
+        Returns
+        -------
+        int
+            The number of frames dropped.
+
+        """
+        kept = 0
+        pgn = self.pgn
+        data = self.data
+        columns = (self.timestamp, self.arbitration_id, self.dlc,
+                   self.priority, pgn, self.source, self.destination)
+        for i in range(self.size):
+            if pgn[i] not in pgns:
+                continue
+            if kept != i:
+                for column in columns:
+                    column[kept] = column[i]
+                data[kept * FRAME_SIZE:(kept + 1) * FRAME_SIZE] = \
+                    data[i * FRAME_SIZE:(i + 1) * FRAME_SIZE]
+            kept += 1
+        dropped = self.size - kept
+        self.size = kept
+        return dropped
+
+    def lines(self):
+        """
+        The frames in the plain log format written by cannew.N2KWriter.
+
+        Returns
+        -------
+        list of str
+            One line per frame, each ending in a newline.
+
+        """
+        lines = []
+        second = None
+        prefix = ''
+        data = self.data
+        for i in range(self.size):
+            timestamp = self.timestamp[i]
+            whole = int(timestamp)
+            micro = round((timestamp - whole) * 1e6)
+            if micro >= 1000000:
+                whole += 1
+                micro -= 1000000
+            if whole != second:
+                second = whole
+                prefix = time.strftime('%Y-%m-%d %H:%M:%S',
+                                       time.localtime(whole))
+            dlc = self.dlc[i]
+            at = i * FRAME_SIZE
+            lines.append(f'{prefix}.{micro:06d},{self.priority[i]},'
+                         f'{self.pgn[i]},{self.source[i]},'
+                         f'{self.destination[i]},{dlc},'
+                         f'{data[at:at + dlc].hex(",").upper()}\n')
+        return lines
+
+    def columns(self):
+        """
+        Zero copy numpy views of the filled part of each column.
+
+        Returns
+        -------
+        dict
+            Column name to numpy array, data as an (N, 8) uint8 matrix.
+
+        Raises
+        ------
+        ModuleNotFoundError
+            If numpy is not installed.
+
+        """
+        import numpy
+        size = self.size
+        views = {name: numpy.frombuffer(getattr(self, name),
+                                        dtype=getattr(self, name).typecode,
+                                        count=size)
+                 for name in ('timestamp', 'arbitration_id', 'dlc',
+                              'priority', 'pgn', 'source', 'destination')}
+        views['data'] = numpy.frombuffer(
+            self.data, dtype=numpy.uint8,
+            count=size * FRAME_SIZE).reshape(size, FRAME_SIZE)
+        return views
+
+
+def receive(bus, batch, timeout=1.0):
+    """
+    Fill a batch from a bus.
+
+    Waits up to timeout for the first frame, then takes only the frames
+    already queued, so a quiet bus does not hold a batch back.  Error frames
+    are skipped and counted in batch.errors.
+
+    Returns
+    -------
+    int
+        Frames in the batch.
+
+    """
+    msg = bus.recv(timeout)
+    while msg is not None:
+        if msg.is_error_frame:
+            batch.errors += 1
+        else:
+            batch.append_message(msg)
+            if batch.full:
+                break
+        msg = bus.recv(0)
+    return len(batch)
+
+
+def read_batches(path, capacity=DEFAULT_CAPACITY, batch=None):
+    """
+    Iterate over a log file a batch at a time.
+
+    The same batch is filled again for each yield, copy anything needed
+    from it before asking for the next.
+
+    Parameters
+    ----------
+    path : str
+        A plain .n2k log file or a .zip archive holding one.
+    capacity : int, optional
+        Frames per batch.  The default is DEFAULT_CAPACITY.
+    batch : FrameBatch, optional
+        Reuse this batch.
+
+    Yields
+    ------
+    FrameBatch
+
+    """
+    if batch is None:
+        batch = FrameBatch(capacity)
+    batch.clear()
+    prefix = None
+    prefix_time = 0.0
+    append = batch.append
+    arbitration_id = n2klog.arbitration_id
+    with n2klog.open_log(path) as log:
+        for line in log:
+            fields = line.split(',', 6)
+            if len(fields) < 6 or not fields[0][:1].isdigit():
+                continue
+            stamp = fields[0]
+            try:
+                if stamp[:19] != prefix:
+                    prefix_time = datetime.fromisoformat(
+                        stamp[:19]).timestamp()
+                    prefix = stamp[:19]
+                fraction = float(stamp[19:]) if len(stamp) > 19 else 0.0
+                dlc = int(fields[5])
+                data = bytes.fromhex(fields[6].replace(',', ' ')) \
+                    if dlc else b''
+                identifier = arbitration_id(int(fields[1]), int(fields[2]),
+                                            int(fields[3]), int(fields[4]))
+            except (ValueError, IndexError):
+                continue
+            append(prefix_time + fraction, identifier, data[:dlc])
+            if batch.full:
+                yield batch
+                batch.clear()
+    if batch.size:
+        yield batch
+
+
+def decode_batches(batches, pgns=None):
+    """
+    Add batches to per PGN columns, as n2klog.decode_log gives them.
+
+    Parameters
+    ----------
+    batches : iterable of FrameBatch
+    pgns : dict, optional
+        PGN to n2klog.PGNFrames to add to.
+
+    Returns
+    -------
+    dict
+        PGN to n2klog.PGNFrames.
+
+    """
+    if pgns is None:
+        pgns = {}
+    for batch in batches:
+        view = memoryview(batch.data)
+        for i in range(batch.size):
+            pgn = batch.pgn[i]
+            try:
+                frames = pgns[pgn]
+            except KeyError:
+                frames = pgns[pgn] = n2klog.PGNFrames(pgn)
+            frames.timestamp.append(batch.timestamp[i])
+            frames.priority.append(batch.priority[i])
+            frames.source.append(batch.source[i])
+            frames.destination.append(batch.destination[i])
+            frames.dlc.append(batch.dlc[i])
+            frames.data += view[i * FRAME_SIZE:(i + 1) * FRAME_SIZE]
+        view.release()
+    return pgns
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 10:37:25 2026
+
+@author: wmorland
+
+Bridge NMEA 0183 GPS sentences onto the NMEA 2000 bus.
+
+Sentences from the Garmin GLO are parsed with nmea0183 and encoded as
+
+* 129025 Position, Rapid Update     from RMC and GGA
+* 129026 COG & SOG, Rapid Update    from RMC and VTG
+* 129029 GNSS Position Data         from GGA, with the date from RMC, sent as
+                                    a fast packet
+
+Messages are encoded with n2kcodec from the definitions in pgns.json, and
+129029 is split into frames by an n2kcodec.FastPacketSegmenter that reuses
+one buffer.
+Encoded messages go through a SendQueue that limits the frame rate on the bus.
+The queue holds at most one message per PGN, a newer fix replaces one that has
+not been sent yet, so a burst of sentences never leaves stale positions
+queued behind it.
+
+Frames are sent with a send(timestamp, arbitration_id, data) callable, the
+same as replay.replay, so replay.bus_sender(bus) puts them on the bus.
+"""
+
+import time
+from collections import OrderedDict
+import n2klog
+import n2kcodec
+import nmea0183
+
+PRIORITY = 2
+GNSS_PRIORITY = 3
+SECONDS_PER_DAY = 86400
+
+POSITION_RAPID = n2kcodec.codec(129025)
+COG_SOG_RAPID = n2kcodec.codec(129026)
+GNSS_POSITION = n2kcodec.codec(129029)
+
+
+def encode_129025(latitude, longitude):
+    """Position, Rapid Update.  Degrees, south and west negative."""
+    return POSITION_RAPID.encode(latitude=latitude, longitude=longitude)
+
+
+def encode_129026(sid, cog, sog):
+    """COG & SOG, Rapid Update.  True COG in radians, SOG in m/s."""
+    return COG_SOG_RAPID.encode(sid=sid, cogReference=0, cog=cog, sog=sog)
+
+
+def encode_129029(sid, date, seconds, gga):
+    """
+    GNSS Position Data, 43 bytes.
+
+    Parameters
+    ----------
+    sid : int
+    date : float
+        POSIX time of midnight UTC on the day of the fix.
+    seconds : float
+        Seconds since midnight UTC.
+    gga : nmea0183.GGA
+    """
+    # GNSS type GPS, method from the GGA fix quality
+    return GNSS_POSITION.encode(
+        sid=sid, date=date // SECONDS_PER_DAY, time=seconds,
+        latitude=gga.latitude, longitude=gga.longitude,
+        altitude=gga.altitude, gnssType=0, method=min(gga.quality, 8),
+        integrity=0, numberOfSvs=gga.satellites, hdop=gga.hdop,
+        geoidalSeparation=gga.geoid)
+
+
+class SendQueue:
+    """
+    Rate limited queue of messages for the bus, at most one per key.
+
+    A token bucket allows rate frames per second with bursts of up to burst
+    frames.  All the frames of a message are sent together.
+
+    Parameters
+    ----------
+    send : callable
+        Called as send(timestamp, arbitration_id, data).  data may be a view
+        that is reused after the call, copy it to keep it.
+    rate : float, optional
+        Frames per second.  The default is 100.
+    burst : int, optional
+        The default is 20.
+    clock : callable, optional
+        The default is time.monotonic.
+    """
+
+    def __init__(self, send, rate=100.0, burst=20, clock=time.monotonic):
+        self.send = send
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.pending = OrderedDict()
+        self.sent = 0
+        self.replaced = 0
+
+    def put(self, key, arbitration_id, frames):
+        """Queue the frames of a message, replacing any unsent one for key."""
+        if key in self.pending:
+            self.replaced += 1
+            del self.pending[key]
+        self.pending[key] = (arbitration_id, frames)
+
+    def pump(self):
+        """
+        Send whatever the rate allows.
+
+        Returns
+        -------
+        float
+            Seconds until the next message can be sent, 0 if the queue is
+            empty.
+
+        """
+        now = self.clock()
+        self.tokens = min(self.tokens + (now - self.updated) * self.rate,
+                          self.burst)
+        self.updated = now
+        pending = self.pending
+        while pending and self.tokens >= 1:
+            _, (arbitration_id, frames) = pending.popitem(last=False)
+            timestamp = time.time()
+            for data in frames:
+                self.send(timestamp, arbitration_id, data)
+            self.tokens -= len(frames)
+            self.sent += len(frames)
+        if not pending:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class GPSBridge:
+    """
+    Turn NMEA 0183 sentences into NMEA 2000 messages.
+
+    Call the bridge with each line read from the GPS.
+
+    Parameters
+    ----------
+    send : callable
+        Called as send(timestamp, arbitration_id, data).
+    source : int
+        Our source address on the bus.
+    rate : float, optional
+        Frames per second allowed on the bus.  The default is 100.
+    claimer : addressclaim.AddressClaimer, optional
+        Nothing is sent until it has claimed an address, and source follows
+        its address if it has to claim another.
+    """
+
+    def __init__(self, send, source, rate=100.0, clock=time.monotonic,
+                 claimer=None):
+        self.queue = SendQueue(send, rate, clock=clock)
+        self.claimer = claimer
+        self.set_source(source)
+        self.date = None
+        self.fix_time = None
+        self.sid = 0
+        self.segmenter = n2kcodec.FastPacketSegmenter()
+
+    def set_source(self, source):
+        """Change our source address, after an address claim."""
+        self.source = source
+        self.ids = {pgn: n2klog.arbitration_id(priority, pgn, source)
+                    for pgn, priority in ((129025, PRIORITY),
+                                          (129026, PRIORITY),
+                                          (129029, GNSS_PRIORITY))}
+
+    def _sid(self, fix_time):
+        # One sequence id for all messages from the same fix
+        if fix_time != self.fix_time:
+            self.fix_time = fix_time
+            self.sid = (self.sid + 1) % 253
+        return self.sid
+
+    def handle(self, sentence):
+        """Parse a sentence and queue the messages it gives."""
+        fix = nmea0183.parse(sentence)
+        if fix is None:
+            return
+        if self.claimer is not None:
+            address = self.claimer.poll()
+            if address is None:
+                return
+            if address != self.source:
+                self.set_source(address)
+        put = self.queue.put
+        ids = self.ids
+        if isinstance(fix, nmea0183.RMC):
+            if fix.date is not None:
+                self.date = fix.date
+            if not fix.valid:
+                return
+            sid = self._sid(fix.time)
+            put(129025, ids[129025], (encode_129025(fix.latitude,
+                                                    fix.longitude),))
+            put(129026, ids[129026], (encode_129026(sid, fix.cog, fix.sog),))
+        elif isinstance(fix, nmea0183.GGA):
+            if not fix.quality:
+                return
+            sid = self._sid(fix.time)
+            put(129025, ids[129025], (encode_129025(fix.latitude,
+                                                    fix.longitude),))
+            if self.date is not None and fix.time is not None:
+                # The frames are views of the segmenter buffer.  The queue
+                # holds one 129029 at most and this put replaces it, so no
+                # queued frames are overwritten by the next fix.
+                payload = encode_129029(sid, self.date, fix.time, fix)
+                put(129029, ids[129029], self.segmenter.segment(payload))
+        else:
+            put(129026, ids[129026],
+                (encode_129026(self.sid, fix.cog, fix.sog),))
+
+    def __call__(self, sentence):
+        self.handle(sentence)
+        return self.queue.pump()
+
+
+def run_serial(ser, bridge, stop=None):
+    """
+    Read sentences from a serial port into a bridge until stop is set.
+
+    The port should have a short read timeout.  Whatever has arrived is read
+    in one call and split into lines here, so a fix reaches the bus as soon
+    as its sentence is complete.
+
+    Parameters
+    ----------
+    ser : serial.Serial
+    bridge : GPSBridge
+    stop : threading.Event, optional
+        By default run until the port fails or KeyboardInterrupt.
+    """
+    buffer = b''
+    while stop is None or not stop.is_set():
+        data = ser.read(ser.in_waiting or 1)
+        if data:
+            buffer += data
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                bridge.handle(line.decode('ascii', errors='replace'))
+        bridge.queue.pump()
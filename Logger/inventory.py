@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Nov  1 09:18:55 2026
+
+@author: wmorland
+
+Inventory of the devices on the bus, by source address.
+
+Instruments are known in the logs only by source address, e.g. wind from
+sources 12, 16 and 17, and addresses can change from one boot to the next.
+The inventory follows the two PGNs that identify a device:
+
+* 60928  ISO Address Claim, the 64 bit NAME holding the manufacturer,
+         function, class, instances and a unique number
+* 126996 Product Information, a fast packet with the model, software
+         version and serial code
+
+A device is keyed by its NAME, so one that moves to a new address keeps its
+product information.  Whenever the table changes it is written to a small
+JSON sidecar next to the log file, foo.devices.json next to foo.n2k, replaced
+atomically so a reader never sees half a file.  Analysis reads the sidecar
+with load_inventory and maps a source to a device with a dictionary lookup.
+build_inventory scans old logs that have no sidecar.
+
+The logger only listens, devices are seen when they claim an address at
+power up or answer a request from a display.
+"""
+
+import os
+import json
+import struct
+import n2klog
+import n2kcodec
+import addressclaim
+
+ADDRESS_CLAIM = 60928
+PRODUCT_INFORMATION = 126996
+INVENTORY_PGNS = frozenset((ADDRESS_CLAIM, PRODUCT_INFORMATION))
+
+PRODUCT = struct.Struct('<HH32s32s32s32sBB')
+
+
+def decode_product_information(payload):
+    """PGN 126996 payload to a dict, None if it is too short."""
+    if len(payload) < PRODUCT.size:
+        return None
+    (version, code, model, software, model_version, serial, level,
+     load) = PRODUCT.unpack_from(payload)
+
+    def text(value):
+        return value.rstrip(b'\xff\x00 @').decode('ascii', errors='replace')
+    return {'nmea2000_version': version / 1000, 'product_code': code,
+            'model_id': text(model), 'software_version': text(software),
+            'model_version': text(model_version), 'serial_code': text(serial),
+            'certification_level': level, 'load_equivalency': load}
+
+
+def inventory_path(log_path):
+    """Sidecar inventory for a log file, foo.devices.json."""
+    base, _ = os.path.splitext(str(log_path))
+    if base.endswith('.n2k'):
+        base = base[:-4]            # foo.n2k.zip
+    return f'{base}.devices.json'
+
+
+class DeviceInventory:
+    """
+    Devices seen on the bus.
+
+    Call with each can.Message as a capture listener, or use add_frame for
+    frames from a log file.
+
+    Parameters
+    ----------
+    path : str, optional
+        Sidecar file written whenever the inventory changes.  By default
+        nothing is written.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.devices = {}       # NAME to device dict
+        self.sources = {}       # source address to NAME
+        self.assembler = n2kcodec.FastPacketAssembler()
+        # Product information from sources not yet seen claiming an address
+        self.products = {}
+        self.writes = 0
+
+    def source_map(self):
+        """Source address to device dict for the devices now on the bus."""
+        return {source: self.devices[name]
+                for source, name in self.sources.items()}
+
+    def _claim(self, timestamp, source, data):
+        if len(data) < 8 or source == addressclaim.NULL:
+            return False
+        name = int.from_bytes(data[:8], 'little')
+        if self.sources.get(source) == name:
+            return False
+        device = self.devices.get(name)
+        if device is None:
+            device = {'name': f'{name:016x}', 'first_seen': timestamp,
+                      'addresses': []}
+            device.update(addressclaim.parse_name(name))
+            self.devices[name] = device
+        # The device left its old address and anyone here before has gone
+        for other, other_name in list(self.sources.items()):
+            if other_name == name:
+                del self.sources[other]
+        previous = self.sources.get(source)
+        if previous is not None:
+            self.devices[previous]['source'] = None
+        self.sources[source] = name
+        device['source'] = source
+        device['addresses'].append([timestamp, source])
+        product = self.products.pop(source, None)
+        if product is not None:
+            device['product'] = product
+        return True
+
+    def _product(self, source, data):
+        payload = self.assembler.add(source, data)
+        if payload is None:
+            return False
+        product = decode_product_information(payload)
+        if product is None:
+            return False
+        name = self.sources.get(source)
+        if name is None:
+            self.products[source] = product
+            return False
+        device = self.devices[name]
+        if device.get('product') == product:
+            return False
+        device['product'] = product
+        return True
+
+    def add_frame(self, timestamp, priority, pgn, source, destination, data):
+        """
+        Add a frame as read by n2klog.read_frames.
+
+        Returns
+        -------
+        bool
+            True if the inventory changed.
+
+        """
+        if pgn == ADDRESS_CLAIM:
+            changed = self._claim(timestamp, source, data)
+        elif pgn == PRODUCT_INFORMATION:
+            changed = self._product(source, data)
+        else:
+            return False
+        if changed and self.path is not None:
+            self.write()
+        return changed
+
+    def __call__(self, msg):
+        pf = (msg.arbitration_id >> 16) & 0xff
+        pgn = (msg.arbitration_id >> 8) & (0x3ff00 if pf < 240 else 0x3ffff)
+        self.add_frame(msg.timestamp, 0, pgn, msg.arbitration_id & 0xff, 0,
+                       msg.data)
+
+    def to_json(self):
+        return {'sources': {str(source): f'{name:016x}'
+                            for source, name in sorted(self.sources.items())},
+                'devices': sorted(self.devices.values(),
+                                  key=lambda device: device['first_seen'])}
+
+    def write(self, path=None):
+        """Write the inventory sidecar, replacing it atomically."""
+        path = self.path if path is None else path
+        temp = f'{path}.tmp'
+        with open(temp, 'w') as file:
+            json.dump(self.to_json(), file, indent=1)
+        os.replace(temp, path)
+        self.writes += 1
+
+
+def load_inventory(log_path):
+    """
+    Source address to device dict from a log file's sidecar.
+
+    Returns
+    -------
+    dict or None
+        None if the log has no sidecar.
+
+    """
+    try:
+        with open(inventory_path(log_path), 'r') as file:
+            saved = json.load(file)
+    except (OSError, ValueError):
+        return None
+    devices = {device['name']: device for device in saved['devices']}
+    return {int(source): devices[name]
+            for source, name in saved['sources'].items()}
+
+
+def build_inventory(paths, write=True):
+    """
+    Scan log files for identification PGNs.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        Rotated segments of one session in order.
+    write : bool, optional
+        Write the sidecar of the last log file.  The default is True.
+
+    Returns
+    -------
+    DeviceInventory
+
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    inventory = DeviceInventory()
+    for path in paths:
+        for frame in n2klog.read_frames(path):
+            if frame[2] in INVENTORY_PGNS:
+                inventory.add_frame(*frame)
+    if write and paths:
+        inventory.write(inventory_path(paths[-1]))
+    return inventory
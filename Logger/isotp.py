@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 28 09:47:12 2026
+
+@author: wmorland
+
+Reassemble ISO 11783 / J1939 transport protocol messages.
+
+Messages of 9 to 1785 bytes, e.g. ISO Product Information or Configuration
+Information broadcast with BAM, are sent as a connection management frame,
+TP.CM PGN 60416, announcing the size and PGN, followed by numbered data
+frames, TP.DT PGN 60160, carrying 7 bytes each.
+
+* BAM     broadcast, the data frames follow at 50-200ms intervals
+* RTS/CTS to one destination, the receiver paces the sender with CTS and
+          ends with an End of Message Acknowledge
+
+The logger only listens, so both forms are reassembled the same way from the
+data frames, and CTS and acknowledgements just keep a session alive.  A
+session ends when all its packets have arrived, when either side sends an
+Abort, or after 750ms (BAM) or 1250ms (RTS/CTS) without a frame, the J1939-21
+T1 and T2 timeouts.
+
+Each session is given a preallocated 1785 byte buffer from a free list, so a
+busy bus does not allocate per frame.  Complete messages are
+(timestamp, priority, pgn, source, destination, data) tuples, the same as
+n2klog.read_frames, and can be written to a sidecar log with TransportLog so
+analysis reads each message once instead of piecing it together from
+fragments.
+"""
+
+import os
+from datetime import datetime
+from collections import namedtuple
+import n2klog
+
+TP_CM = 60416
+TP_DT = 60160
+TRANSPORT_PGNS = frozenset((TP_CM, TP_DT))
+
+RTS = 16
+CTS = 17
+EOM_ACK = 19
+BAM = 32
+ABORT = 255
+
+MAX_SIZE = 1785
+PACKET_BYTES = 7
+BAM_TIMEOUT = 0.75
+RTS_TIMEOUT = 1.25
+
+Message = namedtuple('Message', ['timestamp', 'priority', 'pgn', 'source',
+                                 'destination', 'data'])
+
+
+class Session:
+    """One transport session in progress."""
+
+    __slots__ = (
+        'pgn',
+        'priority',
+        'size',
+        'packets',
+        'received',
+        'seen',
+        'buffer',
+        'timeout',
+        'deadline'
+        )
+
+    def __init__(self):
+        self.buffer = bytearray(MAX_SIZE)
+        self.seen = bytearray(256)
+
+    def reset(self, pgn, priority, size, packets, timeout, now):
+        self.pgn = pgn
+        self.priority = priority
+        self.size = size
+        self.packets = packets
+        self.received = 0
+        self.timeout = timeout
+        self.deadline = now + timeout
+        self.seen[:] = bytes(256)
+
+
+class Reassembler:
+    """
+    Reassemble transport protocol sessions from CAN frames.
+
+    Use add for frames from a log file, or call the reassembler with a
+    can.Message as a capture listener.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Called with each complete Message.
+    max_sessions : int, optional
+        Sessions open at once, a new announcement beyond this is dropped.
+        The default is 32.
+    """
+
+    def __init__(self, callback=None, max_sessions=32):
+        self.callback = callback
+        self.max_sessions = max_sessions
+        self.sessions = {}      # (source, destination) to Session
+        self.free = []
+        self.completed = 0
+        self.aborted = 0
+        self.timed_out = 0
+        self.dropped = 0
+
+    def _open(self, key, pgn, priority, size, packets, timeout, now):
+        session = self.sessions.pop(key, None)
+        if session is not None:
+            # A new announcement replaces an unfinished session
+            self.aborted += 1
+        elif len(self.sessions) >= self.max_sessions:
+            self.dropped += 1
+            return
+        elif self.free:
+            session = self.free.pop()
+        else:
+            session = Session()
+        session.reset(pgn, priority, size, packets, timeout, now)
+        self.sessions[key] = session
+
+    def _close(self, key):
+        session = self.sessions.pop(key, None)
+        if session is not None:
+            self.free.append(session)
+        return session
+
+    def expire(self, now):
+        """Close sessions that have had no frames within their timeout."""
+        for key in [key for key, session in self.sessions.items()
+                    if now > session.deadline]:
+            self._close(key)
+            self.timed_out += 1
+
+    def _control(self, timestamp, priority, source, destination, data):
+        control = data[0]
+        pgn = data[5] | data[6] << 8 | data[7] << 16
+        if control == BAM or control == RTS:
+            size = data[1] | data[2] << 8
+            packets = data[3]
+            if not 9 <= size <= MAX_SIZE \
+                    or packets != (size + PACKET_BYTES - 1) // PACKET_BYTES:
+                self.dropped += 1
+                return
+            self._open((source, destination), pgn, priority, size, packets,
+                       BAM_TIMEOUT if control == BAM else RTS_TIMEOUT,
+                       timestamp)
+        elif control == CTS or control == EOM_ACK:
+            # From the receiver, the session is keyed by the sender
+            session = self.sessions.get((destination, source))
+            if session is not None:
+                session.deadline = timestamp + session.timeout
+        elif control == ABORT:
+            if self._close((source, destination)) is not None \
+                    or self._close((destination, source)) is not None:
+                self.aborted += 1
+
+    def _data(self, timestamp, source, destination, data):
+        key = (source, destination)
+        session = self.sessions.get(key)
+        sequence = data[0]
+        if session is None or not 1 <= sequence <= session.packets:
+            self.dropped += 1
+            return None
+        session.deadline = timestamp + session.timeout
+        if session.seen[sequence]:
+            return None         # retransmitted after a CTS
+        session.seen[sequence] = 1
+        start = (sequence - 1) * PACKET_BYTES
+        session.buffer[start:start + PACKET_BYTES] = data[1:8]
+        session.received += 1
+        if session.received < session.packets:
+            return None
+        self._close(key)
+        self.completed += 1
+        message = Message(timestamp, session.priority, session.pgn, source,
+                          destination, bytes(session.buffer[:session.size]))
+        if self.callback is not None:
+            self.callback(message)
+        return message
+
+    def add_frame(self, timestamp, priority, pgn, source, destination, data):
+        """
+        Add a frame as read by n2klog.read_frames.
+
+        Returns
+        -------
+        Message or None
+            The message completed by this frame.
+
+        """
+        if pgn != TP_CM and pgn != TP_DT:
+            return None
+        if self.sessions:
+            self.expire(timestamp)
+        if len(data) < 8:
+            self.dropped += 1
+            return None
+        if pgn == TP_DT:
+            return self._data(timestamp, source, destination, data)
+        self._control(timestamp, priority, source, destination, data)
+        return None
+
+    def add(self, timestamp, arbitration_id, data):
+        """Add a frame by arbitration id, see add_frame."""
+        pf = (arbitration_id >> 16) & 0xff
+        if pf != 236 and pf != 235:
+            return None
+        return self.add_frame(timestamp, (arbitration_id >> 26) & 0x7,
+                              (arbitration_id >> 8) & 0x3ff00,
+                              arbitration_id & 0xff,
+                              (arbitration_id >> 8) & 0xff, data)
+
+    def __call__(self, msg):
+        self.add(msg.timestamp, msg.arbitration_id, msg.data)
+
+
+def transport_log_path(log_path):
+    """
+    Sidecar log of reassembled messages for a log file, foo.tp.csv.
+
+    Not .n2k, so it is never taken for a raw log.  Messages can be longer
+    than the 8 bytes of a frame that n2klog.decode_log expects.
+    """
+    base, _ = os.path.splitext(str(log_path))
+    return f'{base}.tp.csv'
+
+
+class TransportLog:
+    """
+    Write complete messages to a plain format log.
+
+    The format is the same as cannew.N2KWriter except that the dlc is the
+    message size, so the file reads with n2klog.read_frames.  The file is
+    only created when the first message arrives.  Messages are appended,
+    opening the file for each one as they are rare, so a file left by an
+    earlier run is kept and the file can be renamed with its log file by
+    cannew.SizedRotatingLogger at rollover.
+
+    Parameters
+    ----------
+    path : str
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.messages = 0
+
+    def __call__(self, message):
+        timestamp = datetime.fromtimestamp(message.timestamp)
+        data = ','.join(format(n, '02X') for n in message.data)
+        new = not os.path.exists(self.path)
+        with open(self.path, 'a', encoding='ascii') as file:
+            if new:
+                file.write(
+                    'timestamp,priority,pgn,source,destination,dlc,data\n')
+            file.write(
+                f'{timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")},'
+                f'{message.priority},{message.pgn},{message.source},'
+                f'{message.destination},{len(message.data)},{data}\n')
+        self.messages += 1
+
+    def close(self):
+        """Nothing to close, the file is opened for each message."""
+
+
+def reassemble_log(paths):
+    """
+    Complete transport messages from one or more raw log files.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        Rotated segments of one session in order.
+
+    Yields
+    ------
+    Message
+
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    reassembler = Reassembler()
+    for path in paths:
+        for frame in n2klog.read_frames(path):
+            message = reassembler.add_frame(*frame)
+            if message is not None:
+                yield message
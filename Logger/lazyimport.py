@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 13:48:05 2026
+
+@author: wmorland
+
+Defer heavy imports until they are first used.
+
+Everything in the Logger and UPS scripts runs at boot on a Pi Zero, where
+importing smbus, RPi.GPIO or the less used parts of the logger adds up.  A
+lazily imported module is put in sys.modules straight away but its code only
+runs on the first attribute access, so a script that never touches it never
+pays for it.
+
+    GPIO = lazyimport.lazy_import('RPi.GPIO')
+
+A module that is not installed, smbus or RPi.GPIO anywhere but on a Pi,
+raises ModuleNotFoundError on first use rather than at the lazy_import call,
+so the scripts and their tests can be imported anywhere.
+"""
+
+import sys
+import types
+import importlib.util
+
+
+class MissingModule(types.ModuleType):
+    """Stands in for a module that is not installed until it is used."""
+
+    def __getattr__(self, name):
+        raise ModuleNotFoundError(f'No module named {self.__name__!r}',
+                                  name=self.__name__)
+
+
+def lazy_import(name):
+    """
+    Return a module that is only executed when first used.
+
+    Parameters
+    ----------
+    name : str
+        Full dotted module name.
+
+    Returns
+    -------
+    module
+        The module from sys.modules if it has already been imported, or a
+        MissingModule that raises ModuleNotFoundError on any attribute
+        access if there is no such module.
+
+    """
+    try:
+        return sys.modules[name]
+    except KeyError:
+        pass
+    try:
+        spec = importlib.util.find_spec(name)
+    except ModuleNotFoundError:
+        # The parent package is missing
+        spec = None
+    if spec is None:
+        return MissingModule(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:05:12 2026
+
+@author: wmorland
+
+Live in memory state of the boat's instruments.
+
+The logger decodes the filtered PGNs into channels, rudder angle, heading, boat
+speed, wind and so on, and keeps the last few minutes of each channel in a
+fixed size ring buffer.  A display or other local consumer can ask for the
+latest value or the values over the last few seconds without reading the log
+files.
+
+Each ring buffer is a pair of preallocated arrays so memory use is fixed when
+the LiveState is created: 16 bytes per sample, 10 minutes at 10Hz is under
+100kB per channel.  Reads copy into arrays supplied by the caller and never
+build lists.
+"""
+
+import struct
+from array import array
+
+# name, pgn, byte offset, struct format, scale, optional (byte, mask, value)
+# that must match, e.g. the wind reference.  Offsets and resolutions are from
+# the canboat PGN database.  Angles are radians, speeds m/s.
+CHANNELS = (
+    ('rudder_position', 127245, 4, '<h', 0.0001, None),
+    ('heading', 127250, 1, '<H', 0.0001, None),
+    ('rate_of_turn', 127251, 1, '<i', 3.125e-08, None),
+    ('heave', 127252, 1, '<h', 0.01, None),
+    ('yaw', 127257, 1, '<h', 0.0001, None),
+    ('pitch', 127257, 3, '<h', 0.0001, None),
+    ('roll', 127257, 5, '<h', 0.0001, None),
+    ('speed_water', 128259, 1, '<H', 0.01, None),
+    ('speed_ground', 128259, 3, '<H', 0.01, None),
+    ('latitude', 129025, 0, '<i', 1e-07, None),
+    ('longitude', 129025, 4, '<i', 1e-07, None),
+    ('cog', 129026, 2, '<H', 0.0001, None),
+    ('sog', 129026, 4, '<H', 0.01, None),
+    ('apparent_wind_speed', 130306, 1, '<H', 0.01, (5, 0x07, 2)),
+    ('apparent_wind_angle', 130306, 3, '<H', 0.0001, (5, 0x07, 2)),
+    ('true_wind_speed', 130306, 1, '<H', 0.01, (5, 0x07, 3)),
+    ('true_wind_angle', 130306, 3, '<H', 0.0001, (5, 0x07, 3)),
+    )
+
+# NMEA 2000 reserves the top values of a field to mean no data or out of range
+NO_DATA = {
+    '<h': (0x7fff, 0x7ffe),
+    '<H': (0xffff, 0xfffe),
+    '<i': (0x7fffffff, 0x7ffffffe),
+    '<I': (0xffffffff, 0xfffffffe),
+    }
+
+
+def pgn_from_id(arbitration_id):
+    """Return the PGN from a 29 bit NMEA 2000 arbitration id."""
+    pdu_f = (arbitration_id >> 16) & 0xff
+    if pdu_f < 240:
+        return (arbitration_id >> 8) & 0x3ff00
+    return (arbitration_id >> 8) & 0x3ffff
+
+
+class RingBuffer:
+    """
+    Fixed size time series of one channel.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of samples kept.  Older samples are overwritten.
+    """
+
+    __slots__ = ('capacity', 'times', 'values', 'count', 'head')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.count = 0      # number of samples held
+        self.head = 0       # where the next sample goes
+
+    def __len__(self):
+        return self.count
+
+    def push(self, time, value):
+        """Add a sample, overwriting the oldest when full."""
+        head = self.head
+        self.times[head] = time
+        self.values[head] = value
+        # Advance head after the sample is written so a reader never sees a
+        # half written sample.
+        self.head = head + 1 if head + 1 < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _slot(self, i):
+        """Array position of the i'th oldest sample."""
+        slot = self.head - self.count + i
+        return slot + self.capacity if slot < 0 else slot
+
+    def latest(self):
+        """Return (time, value) of the newest sample or None if empty."""
+        if not self.count:
+            return None
+        slot = self.head - 1 if self.head else self.capacity - 1
+        return self.times[slot], self.values[slot]
+
+    def first_since(self, since):
+        """Logical index of the oldest sample with time >= since."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.times[self._slot(middle)] < since:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def window(self, since, times, values):
+        """
+        Copy samples with time >= since into caller supplied arrays.
+
+        Parameters
+        ----------
+        since : float
+            POSIX timestamp.
+        times, values : array
+            Preallocated output arrays.  At most len(values) of the newest
+            samples are copied.
+
+        Returns
+        -------
+        int
+            Number of samples copied, oldest first.
+
+        """
+        first = max(self.first_since(since), self.count - len(values))
+        n = self.count - first
+        for i in range(n):
+            slot = self._slot(first + i)
+            times[i] = self.times[slot]
+            values[i] = self.values[slot]
+        return n
+
+    def mean(self, since):
+        """Mean of the samples with time >= since, None if there are none."""
+        first = self.first_since(since)
+        n = self.count - first
+        if not n:
+            return None
+        total = 0.0
+        for i in range(first, self.count):
+            total += self.values[self._slot(i)]
+        return total / n
+
+
+class LiveState:
+    """
+    Ring buffers for every channel decoded from the filtered PGNs.
+
+    A LiveState is callable with a can.Message so it can be passed to
+    nmea.capture_can_messages as a listener or to a can.Notifier.
+
+    Parameters
+    ----------
+    seconds : float, optional
+        How much history to keep.  The default is 600.
+    rate : float, optional
+        Highest expected update rate in Hz, used to size the buffers.  The
+        default is 10.
+    sources : dict, optional
+        Channel name to the only source address to accept for it.  By default
+        every source is accepted.
+    """
+
+    def __init__(self, seconds=600, rate=10, sources=None, channels=CHANNELS):
+        capacity = int(seconds * rate)
+        self.sources = dict(sources or {})
+        self.buffers = {}
+        self._decoders = {}
+        for name, pgn, offset, fmt, scale, match in channels:
+            buffer = RingBuffer(capacity)
+            self.buffers[name] = buffer
+            self._decoders.setdefault(pgn, []).append(
+                (name, buffer, struct.Struct(fmt), offset, scale, match,
+                 NO_DATA.get(fmt, ()), self.sources.get(name)))
+
+    def __call__(self, msg):
+        self.on_message_received(msg)
+
+    def on_message_received(self, msg):
+        """Decode a CAN message into any channels it carries."""
+        decoders = self._decoders.get(pgn_from_id(msg.arbitration_id))
+        if decoders is None:
+            return
+        source = msg.arbitration_id & 0xff
+        data = msg.data
+        for (name, buffer, fmt, offset, scale, match, no_data,
+             wanted) in decoders:
+            if wanted is not None and source != wanted:
+                continue
+            if match is not None and (data[match[0]] & match[1]) != match[2]:
+                continue
+            if len(data) < offset + fmt.size:
+                continue
+            raw = fmt.unpack_from(data, offset)[0]
+            if raw in no_data:
+                continue
+            buffer.push(msg.timestamp, raw * scale)
+
+    def latest(self, name):
+        """Return (time, value) for a channel or None if nothing received."""
+        return self.buffers[name].latest()
+
+    def window(self, name, since, times, values):
+        """Copy a channel's samples since a time, see RingBuffer.window."""
+        return self.buffers[name].window(since, times, values)
+
+    def mean(self, name, since):
+        """Mean of a channel since a time, see RingBuffer.mean."""
+        return self.buffers[name].mean(since)
+
+    def snapshot(self):
+        """Return a dict of channel name to (time, value) for every channel."""
+        return {name: buffer.latest() for name, buffer in self.buffers.items()
+                if buffer.count}
+
+    def memory_bytes(self):
+        """Bytes held by the ring buffers."""
+        return sum(16 * buffer.capacity for buffer in self.buffers.values())
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:15:20 2026
+
+@author: wmorland
+
+Runtime metrics for the capture process.
+
+When a log turns out short or gappy these tell us why.  The capture loop keeps
+
+* frames received per PGN and source, error frames and frames dropped by the
+  software PGN filter,
+* the high water mark of receive lag, how far behind the kernel timestamp a
+  frame is when we get to it, which grows when the socket receive queue backs
+  up,
+* a histogram of write latency, sampled on every Nth frame, with percentiles,
+* rollover count and duration and bytes written per second,
+* the health of the CAN controller, from a canif.HealthMonitor.
+
+Counts live in preallocated arrays and the per frame cost is a dict lookup and
+two array increments.  Every interval seconds a status line is written to the
+process log and the same numbers can be read at any time as JSON from a Unix
+socket:
+
+    python3 metrics.py $RKRPROCESSLOGS/capture.sock
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import threading
+from array import array
+import livestate
+
+MAX_PGNS = 64
+BUCKETS = 25    # log2 microseconds, up to about 16 seconds
+DEFAULT_SOCKET = 'capture.sock'
+
+
+def default_socket_path():
+    """Unix socket path in the process log directory."""
+    return os.path.join(os.getenv('RKRPROCESSLOGS', '.'), DEFAULT_SOCKET)
+
+
+class CaptureMetrics:
+    """
+    Counters and histograms for the capture loop.
+
+    Parameters
+    ----------
+    interval : float, optional
+        Seconds between status lines in the process log.  The default is 60.
+    sample_every : int, optional
+        Time the write of one frame in this many, a power of two.  The default
+        is 16.  The write of each batch is timed.
+    """
+
+    def __init__(self, interval=60.0, sample_every=16):
+        self.interval = interval
+        self.sample_mask = sample_every - 1
+        self.slots = {}
+        self.slot_pgns = array('L', [0]) * MAX_PGNS
+        # Frames per PGN slot and source, row per slot.  The last slot
+        # collects any PGNs beyond MAX_PGNS - 1.
+        self.counts = array('L', [0]) * (MAX_PGNS * 256)
+        self.latency = array('L', [0]) * BUCKETS
+        self.frames = 0
+        self.error_frames = 0
+        self.filtered = 0
+        self.max_lag = 0.0
+        self.rollovers = 0
+        self.max_rollover = 0.0
+        self.bytes_written = 0
+        self.started = time.monotonic()
+        self.next_status = self.started + interval
+        self.last_status = (self.started, 0, 0)
+        self.controller = None      # canif.HealthMonitor
+        self.lock = threading.Lock()
+
+    def _slot(self, pgn):
+        slot = len(self.slots)
+        if slot >= MAX_PGNS - 1:
+            slot = MAX_PGNS - 1
+        else:
+            self.slot_pgns[slot] = pgn
+        self.slots[pgn] = slot
+        return slot
+
+    def record(self, msg):
+        """
+        Count a received frame.
+
+        Returns
+        -------
+        int or None
+            The PGN, or None for an error frame.
+
+        """
+        if msg.is_error_frame:
+            self.error_frames += 1
+            return None
+        arbitration_id = msg.arbitration_id
+        pgn = livestate.pgn_from_id(arbitration_id)
+        slot = self.slots.get(pgn)
+        if slot is None:
+            slot = self._slot(pgn)
+        self.counts[(slot << 8) | (arbitration_id & 0xff)] += 1
+        self.frames += 1
+        return pgn
+
+    def record_batch(self, batch):
+        """Count the frames and error frames of a framebatch.FrameBatch."""
+        slots = self.slots
+        counts = self.counts
+        pgns = batch.pgn
+        sources = batch.source
+        for i in range(batch.size):
+            pgn = pgns[i]
+            slot = slots.get(pgn)
+            if slot is None:
+                slot = self._slot(pgn)
+            counts[(slot << 8) | sources[i]] += 1
+        self.frames += batch.size
+        self.error_frames += batch.errors
+
+    def sample(self):
+        """True if the write of the current frame should be timed."""
+        return not self.frames & self.sample_mask
+
+    def record_write(self, seconds, msg):
+        """Add a sampled write latency and the receive lag of its frame."""
+        bucket = int(seconds * 1e6).bit_length()
+        self.latency[bucket if bucket < BUCKETS else BUCKETS - 1] += 1
+        lag = time.time() - msg.timestamp
+        if lag > self.max_lag:
+            self.max_lag = lag
+
+    def record_logger(self, can_logger):
+        """Pick up rollover and byte counts from a rotating logger."""
+        self.rollovers = can_logger.rollover_count
+        self.max_rollover = max(self.max_rollover,
+                                can_logger.last_rollover_duration)
+        try:
+            self.bytes_written = can_logger.bytes_written()
+        except (AttributeError, ValueError, OSError):
+            pass
+
+    def percentile(self, fraction):
+        """Upper bound in microseconds of a write latency percentile."""
+        total = sum(self.latency)
+        if not total:
+            return None
+        target = fraction * total
+        running = 0
+        for bucket, count in enumerate(self.latency):
+            running += count
+            if running >= target:
+                return 1 << bucket
+        return 1 << (BUCKETS - 1)
+
+    def per_source(self):
+        """Dict of 'pgn/source' to frames for every non zero count."""
+        counts = {}
+        for slot in range(min(len(self.slots), MAX_PGNS)):
+            name = 'other' if slot == MAX_PGNS - 1 else self.slot_pgns[slot]
+            row = slot << 8
+            for source in range(256):
+                count = self.counts[row | source]
+                if count:
+                    counts[f'{name}/{source}'] = count
+        return counts
+
+    def snapshot(self):
+        """All the metrics as a dict that can be written as JSON."""
+        now = time.monotonic()
+        then, frames, written = self.last_status
+        seconds = max(now - then, 1e-9)
+        return {
+            'uptime': now - self.started,
+            'frames': self.frames,
+            'frames_per_second': (self.frames - frames) / seconds,
+            'error_frames': self.error_frames,
+            'filtered': self.filtered,
+            'max_receive_lag': self.max_lag,
+            'write_p50_us': self.percentile(0.5),
+            'write_p99_us': self.percentile(0.99),
+            'write_max_us': self.percentile(1.0),
+            'rollovers': self.rollovers,
+            'max_rollover_seconds': self.max_rollover,
+            'bytes_written': self.bytes_written,
+            'bytes_per_second': (self.bytes_written - written) / seconds,
+            'per_source': self.per_source(),
+            'controller': (None if self.controller is None
+                           else self.controller.snapshot())
+            }
+
+    def status_line(self, snapshot):
+        """One line summary for the process log."""
+        return (f'frames={snapshot["frames"]} '
+                f'rate={snapshot["frames_per_second"]:1.1f}/s '
+                f'errors={snapshot["error_frames"]} '
+                f'filtered={snapshot["filtered"]} '
+                f'lag_max={snapshot["max_receive_lag"] * 1000:1.1f}ms '
+                f'write_p50={snapshot["write_p50_us"]}us '
+                f'write_p99={snapshot["write_p99_us"]}us '
+                f'rollovers={snapshot["rollovers"]} '
+                f'rollover_max='
+                f'{snapshot["max_rollover_seconds"] * 1000:1.0f}ms '
+                f'bytes/s={snapshot["bytes_per_second"]:1.0f}')
+
+    def tick(self, can_logger=None, force=False):
+        """
+        Write a status line if one is due or force is set.
+
+        This reads the clock so the capture loop only calls it when idle,
+        after each batch and every 256 frames.
+        """
+        now = time.monotonic()
+        if now < self.next_status and not force:
+            return
+        self.next_status = now + self.interval
+        with self.lock:
+            if can_logger is not None:
+                self.record_logger(can_logger)
+            snapshot = self.snapshot()
+            self.last_status = (now, self.frames, self.bytes_written)
+        logging.getLogger('metrics').info(self.status_line(snapshot))
+
+
+class MetricsServer:
+    """
+    Serve CaptureMetrics.snapshot as JSON on a Unix socket.
+
+    Each connection gets one JSON document and is closed.
+
+    Parameters
+    ----------
+    metrics : CaptureMetrics
+    path : str, optional
+        Socket path.  The default is capture.sock in RKRPROCESSLOGS.
+    """
+
+    def __init__(self, metrics, path=None):
+        self.metrics = metrics
+        self.path = default_socket_path() if path is None else path
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        self.server.listen(2)
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            with connection:
+                with self.metrics.lock:
+                    snapshot = self.metrics.snapshot()
+                try:
+                    connection.sendall(json.dumps(snapshot).encode())
+                except OSError:
+                    pass
+
+    def close(self):
+        """Stop serving and remove the socket."""
+        self.server.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def query(path=None, timeout=1.0):
+    """Read the metrics from a running capture process."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(default_socket_path() if path is None else path)
+        chunks = []
+        for chunk in iter(lambda: client.recv(65536), b''):
+            chunks.append(chunk)
+    return json.loads(b''.join(chunks))
+
+
+if __name__ == '__main__':
+    print(json.dumps(query(sys.argv[1] if len(sys.argv) > 1 else None),
+                     indent=2))
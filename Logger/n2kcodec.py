@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 30 09:05:41 2026
+
+@author: wmorland
+
+Encode and decode NMEA 2000 PGN fields from canboat style definitions.
+
+A definition, see pgns.json and the excerpt in nmea-new.py, lists each field
+with its bit offset, bit length, resolution and sign.  compile_plan turns it
+into a plan of byte aligned chunks.  A chunk is one field or a run of bit
+fields that together fill whole bytes, packed as one little endian integer.
+A PGNCodec builds a struct.Struct for the fixed fields of a plan and one for
+the repeating set, so encoding is a loop over the chunks and one pack call.
+
+Values are in the units of the definition, radians, m/s, degrees of latitude
+and so on.  None, or a field left out, is sent as not available, all ones, or
+the largest positive value for a signed field.  Reserved fields are always all
+ones.  Lookup fields take the raw value or its name.
+
+Plans are tuples of plain values so pgnregistry can cache them with marshal.
+
+Fast packet PGNs are split into frames by a FastPacketSegmenter that writes
+into one reusable buffer, and put back together by a FastPacketAssembler.
+"""
+
+import os
+import json
+import struct
+
+DEFINITIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'pgns.json')
+INT_CODES = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+FAST_PACKET_MAX = 223
+SINGLE_FRAME = 8
+
+
+def _field(definition, start):
+    """Plan tuple for a field starting start bits into its chunk."""
+    resolution = float(definition.get('Resolution') or 1)
+    lookup = tuple((value['name'], int(value['value']))
+                   for value in definition.get('EnumValues') or ())
+    return (definition['Id'], start, definition['BitLength'],
+            bool(definition.get('Signed')),
+            1 if resolution == 1 else resolution, lookup,
+            definition['Id'].startswith('reserved'))
+
+
+def _chunks(fields):
+    """
+    Group fields into byte aligned chunks.
+
+    Returns
+    -------
+    tuple
+        ((bytes in chunk, (field, ...)), ...) and the length in bytes.
+
+    """
+    chunks = []
+    group = []
+    start = position = fields[0]['BitOffset'] if fields else 0
+    base = start
+
+    def add(definition):
+        nonlocal start, position, group
+        group.append(_field(definition, position - start))
+        position += definition['BitLength']
+        if position % 8 == 0:
+            chunks.append(((position - start) // 8, tuple(group)))
+            group = []
+            start = position
+
+    for definition in fields:
+        if definition['BitOffset'] > position:
+            add({'Id': 'reserved', 'BitOffset': position,
+                 'BitLength': definition['BitOffset'] - position})
+        add(definition)
+    if position % 8:
+        add({'Id': 'reserved', 'BitOffset': position,
+             'BitLength': 8 - position % 8})
+    return tuple(chunks), (position - base) // 8
+
+
+def compile_plan(definition):
+    """
+    Compile a canboat PGN definition into a plan.
+
+    Returns
+    -------
+    tuple
+        (pgn, id, fast, chunks, repeat chunks, count field id)
+
+    """
+    fields = sorted(definition['Fields'], key=lambda f: f['BitOffset'])
+    repeating = definition.get('RepeatingFields') or 0
+    fixed = fields[:len(fields) - repeating]
+    count_id = None
+    if repeating:
+        count_order = definition.get('RepeatingFieldSet1CountField')
+        count_id = next((f['Id'] for f in fixed if f['Order'] == count_order),
+                        fixed[-1]['Id'])
+        repeat = [dict(f, BitOffset=f['BitOffset'] - fields[-repeating]
+                       ['BitOffset']) for f in fields[-repeating:]]
+        repeat_chunks, _ = _chunks(repeat)
+    else:
+        repeat_chunks = ()
+    chunks, _ = _chunks(fixed)
+    return (definition['PGN'], definition['Id'],
+            definition.get('Type') == 'Fast', chunks, repeat_chunks, count_id)
+
+
+def _prepare(chunks):
+    """Struct and per field constants for a chunk tuple."""
+    fmt = '<' + ''.join(INT_CODES.get(size, f'{size}s') for size, _ in chunks)
+    prepared = []
+    for size, fields in chunks:
+        rows = []
+        for (field_id, start, bits, signed, resolution, lookup,
+             reserved) in fields:
+            mask = (1 << bits) - 1
+            high = mask >> 1 if signed else mask
+            low = -(high + 1) if signed else 0
+            rows.append((field_id, start, mask, high, low, signed,
+                         resolution, dict(lookup) or None,
+                         {v: n for n, v in lookup} or None, reserved))
+        prepared.append((size if size not in INT_CODES else 0, tuple(rows)))
+    return struct.Struct(fmt), tuple(prepared)
+
+
+class PGNCodec:
+    """
+    Encoder and decoder for one PGN.
+
+    Parameters
+    ----------
+    plan : tuple
+        From compile_plan.
+    """
+
+    def __init__(self, plan):
+        (self.pgn, self.id, self.fast, chunks, repeat_chunks,
+         self.count_id) = plan
+        self.fixed, self.chunks = _prepare(chunks)
+        self.repeat, self.repeat_chunks = _prepare(repeat_chunks) \
+            if repeat_chunks else (None, ())
+        self.segmenter = FastPacketSegmenter() if self.fast else None
+
+    @staticmethod
+    def _pack(structure, chunks, values):
+        get = values.get
+        raws = []
+        for size, rows in chunks:
+            raw = 0
+            for (field_id, start, mask, high, low, signed, resolution,
+                 names, _, reserved) in rows:
+                value = None if reserved else get(field_id)
+                if value is None:
+                    raw |= high << start
+                    continue
+                if names is not None and isinstance(value, str):
+                    value = names[value]
+                value = int(round(value / resolution)) if resolution != 1 \
+                    else int(value)
+                raw |= (min(max(value, low), high) & mask) << start
+            raws.append(raw.to_bytes(size, 'little') if size else raw)
+        return structure.pack(*raws)
+
+    def encode(self, repeat=(), **values):
+        """
+        Pack field values, keyed by canboat field id, into a payload.
+
+        Parameters
+        ----------
+        repeat : sequence of dict, optional
+            Values for each repeating set.  The count field defaults to the
+            number of sets.
+
+        Returns
+        -------
+        bytes
+            Single frame PGNs are padded to 8 bytes with 0xff.
+
+        """
+        if self.count_id is not None and values.get(self.count_id) is None:
+            values[self.count_id] = len(repeat)
+        payload = self._pack(self.fixed, self.chunks, values)
+        for item in repeat:
+            payload += self._pack(self.repeat, self.repeat_chunks, item)
+        if not self.fast and len(payload) < SINGLE_FRAME:
+            payload += b'\xff' * (SINGLE_FRAME - len(payload))
+        return payload
+
+    def frames(self, repeat=(), **values):
+        """
+        Encode and split into frames.
+
+        Fast packet frames are views of the segmenter buffer, good until the
+        next call, copy them with bytes() to keep them.
+        """
+        payload = self.encode(repeat, **values)
+        if self.fast:
+            return self.segmenter.segment(payload)
+        return [payload]
+
+    @staticmethod
+    def _unpack(structure, chunks, data, offset, values):
+        for raw, (size, rows) in zip(structure.unpack_from(data, offset),
+                                     chunks):
+            if size:
+                raw = int.from_bytes(raw, 'little')
+            for (field_id, start, mask, high, low, signed, resolution,
+                 _, lookup, reserved) in rows:
+                if reserved:
+                    continue
+                value = (raw >> start) & mask
+                if value == high and mask > 1:
+                    values[field_id] = None
+                    continue
+                if signed and value > high:
+                    value -= mask + 1
+                if lookup is not None:
+                    values[field_id] = lookup.get(value, value)
+                else:
+                    values[field_id] = value * resolution \
+                        if resolution != 1 else value
+        return values
+
+    def decode(self, data):
+        """
+        Unpack a payload into a dict of field values.
+
+        Repeating sets, if any, are a list of dicts under 'repeat'.
+        """
+        if len(data) < self.fixed.size:
+            data = bytes(data) + b'\xff' * (self.fixed.size - len(data))
+        values = self._unpack(self.fixed, self.chunks, data, 0, {})
+        if self.repeat is not None:
+            offset = self.fixed.size
+            repeat = []
+            for _ in range(values.get(self.count_id) or 0):
+                if offset + self.repeat.size > len(data):
+                    break
+                repeat.append(self._unpack(self.repeat, self.repeat_chunks,
+                                           data, offset, {}))
+                offset += self.repeat.size
+            values['repeat'] = repeat
+        return values
+
+
+class FastPacketSegmenter:
+    """
+    Split payloads into fast packet frames in a reusable buffer.
+
+    The first frame holds the sequence and frame counters, the payload length
+    and 6 bytes, following frames the counters and 7 bytes, the last frame is
+    padded with 0xff.  The sequence counter goes up by one each payload.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray(SINGLE_FRAME * 32)
+        view = memoryview(self.buffer)
+        self.views = [view[i:i + SINGLE_FRAME]
+                      for i in range(0, len(self.buffer), SINGLE_FRAME)]
+        self.sequence = 0
+
+    def segment(self, payload):
+        """
+        Segment a payload.
+
+        Returns
+        -------
+        list of memoryview
+            One 8 byte view per frame, valid until the next call.
+
+        """
+        size = len(payload)
+        if size > FAST_PACKET_MAX:
+            raise ValueError(f'Fast packet payload of {size} bytes, the '
+                             f'most is {FAST_PACKET_MAX}')
+        count = 1 + (max(size - 6, 0) + 6) // 7
+        buffer = self.buffer
+        end = count * SINGLE_FRAME
+        buffer[:end] = b'\xff' * end
+        counter = self.sequence << 5
+        self.sequence = (self.sequence + 1) & 0x7
+        buffer[0] = counter
+        buffer[1] = size
+        first = payload[:6]
+        buffer[2:2 + len(first)] = first
+        for frame in range(1, count):
+            part = payload[frame * 7 - 1:frame * 7 + 6]
+            at = frame * SINGLE_FRAME
+            buffer[at] = counter | frame
+            buffer[at + 1:at + 1 + len(part)] = part
+        return self.views[:count]
+
+
+class FastPacketAssembler:
+    """
+    Reassemble fast packet payloads.
+
+    One payload at a time is assembled per key, e.g. (pgn, source).  A frame
+    out of order or from another sequence drops the payload in progress.
+    """
+
+    def __init__(self):
+        self.partial = {}       # key to [sequence, size, bytearray, frame]
+        self.completed = 0
+        self.dropped = 0
+
+    def add(self, key, data):
+        """
+        Add a frame.
+
+        Returns
+        -------
+        bytes or None
+            The payload completed by this frame.
+
+        """
+        if len(data) < 2:
+            return None
+        sequence = data[0] >> 5
+        frame = data[0] & 0x1f
+        if frame == 0:
+            if key in self.partial:
+                self.dropped += 1
+            size = data[1]
+            partial = self.partial[key] = [sequence, size,
+                                           bytearray(data[2:8]), 1]
+        else:
+            partial = self.partial.get(key)
+            if partial is None:
+                return None
+            if partial[0] != sequence or partial[3] != frame:
+                del self.partial[key]
+                self.dropped += 1
+                return None
+            partial[2] += data[1:8]
+            partial[3] += 1
+        if len(partial[2]) < partial[1]:
+            return None
+        del self.partial[key]
+        self.completed += 1
+        return bytes(partial[2][:partial[1]])
+
+
+def load_definitions(path=DEFINITIONS):
+    """PGN number to canboat definition from a pgns.json file."""
+    with open(path, 'r', encoding='utf-8') as file:
+        return {definition['PGN']: definition
+                for definition in json.load(file)['PGNs']}
+
+
+def codec(pgn):
+    """
+    The PGNCodec for a PGN, from pgnregistry.default_registry().
+
+    Definitions are compiled once and cached on disk, and a codec is made the
+    first time its PGN is asked for.
+    """
+    import pgnregistry
+    return pgnregistry.default_registry().codec(pgn)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:31:55 2026
+
+@author: wmorland
+
+Random access index for plain .n2k log files.
+
+A plain log file can only be read from the start.  The index is a small
+sidecar file, foo.n2k.idx next to foo.n2k, holding:
+
+* a checkpoint every N frames or every second: timestamp, byte offset and
+  frame number of the line at that point,
+* for each PGN the byte offset of the first and last frame, the number of
+  frames and the first and last timestamp.
+
+With the index a reader can seek straight to a time window, or to the part of
+the file holding the PGNs it wants, instead of parsing everything before it.
+
+The index is written by cannew.N2KWriter when it is created with index=True,
+or afterwards by build_index.  Offsets are only meaningful for the plain file,
+not for the .n2k.zip archives written by rkrutils.zip_logs.
+
+Index file layout, all integers little endian:
+
+    header      b'N2KI', u16 version, u64 size of indexed log file,
+                u32 every_frames, f64 every_seconds, u32 checkpoints,
+                u32 PGNs
+    checkpoints f64 timestamps, u64 offsets, u32 frame numbers
+    per PGN     u32 pgn, u64 first offset, u64 last offset, u32 frames,
+                f64 first timestamp, f64 last timestamp
+"""
+
+import os
+import sys
+import struct
+import logging
+from array import array
+from bisect import bisect_right
+import n2klog
+
+INDEX_SUFFIX = '.idx'
+MAGIC = b'N2KI'
+VERSION = 1
+HEADER = struct.Struct('<4sHQIdII')
+PGN_ENTRY = struct.Struct('<IQQIdd')
+
+
+def index_path(log_path):
+    """Return the sidecar index file name for a log file."""
+    return f'{log_path}{INDEX_SUFFIX}'
+
+
+class Index:
+    """
+    Checkpoints and per PGN ranges for one log file.
+
+    Attributes
+    ----------
+    size : int
+        Size in bytes of the log file when it was indexed.
+    timestamps, offsets, frames : array
+        One entry per checkpoint in file order.
+    pgns : dict
+        PGN to [first offset, last offset, frames, first time, last time]
+    """
+
+    def __init__(self, size, every_frames, every_seconds, timestamps,
+                 offsets, frames, pgns):
+        self.size = size
+        self.every_frames = every_frames
+        self.every_seconds = every_seconds
+        self.timestamps = timestamps
+        self.offsets = offsets
+        self.frames = frames
+        self.pgns = pgns
+
+    def start_offset(self, start):
+        """Offset of the last checkpoint at or before time start."""
+        i = bisect_right(self.timestamps, start) - 1
+        return self.offsets[i] if i >= 0 else 0
+
+    def end_offset(self, end):
+        """Offset of the first checkpoint after time end, or the file size."""
+        i = bisect_right(self.timestamps, end)
+        return self.offsets[i] if i < len(self.offsets) else self.size
+
+    def byte_range(self, start=None, end=None, pgns=None):
+        """
+        The part of the log file that can hold the frames asked for.
+
+        Parameters
+        ----------
+        start, end : float, optional
+            Time window as POSIX timestamps.  None for no limit.
+        pgns : iterable of int, optional
+            Only these PGNs are wanted.
+
+        Returns
+        -------
+        tuple
+            (first, stop) byte offsets.  first == stop if nothing matches.
+
+        """
+        first = 0 if start is None else self.start_offset(start)
+        stop = self.size if end is None else self.end_offset(end)
+        if pgns is not None:
+            entries = [self.pgns[pgn] for pgn in pgns if pgn in self.pgns]
+            if start is not None:
+                entries = [e for e in entries if e[4] >= start]
+            if end is not None:
+                entries = [e for e in entries if e[3] <= end]
+            if not entries:
+                return first, first
+            first = max(first, min(e[0] for e in entries))
+            # The line at the last offset has to be read too, a bound on its
+            # length is the next checkpoint.
+            last = max(e[1] for e in entries)
+            i = bisect_right(self.offsets, last)
+            stop = min(stop, self.offsets[i] if i < len(self.offsets)
+                       else self.size)
+        return first, max(first, stop)
+
+    def write(self, path):
+        """Write the index to a sidecar file."""
+        timestamps = array('d', self.timestamps)
+        offsets = array('Q', self.offsets)
+        frames = array('I', self.frames)
+        if sys.byteorder == 'big':
+            for column in (timestamps, offsets, frames):
+                column.byteswap()
+        temp = f'{path}.tmp'
+        with open(temp, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.size,
+                                   self.every_frames, self.every_seconds,
+                                   len(timestamps), len(self.pgns)))
+            file.write(timestamps.tobytes())
+            file.write(offsets.tobytes())
+            file.write(frames.tobytes())
+            for pgn, entry in sorted(self.pgns.items()):
+                file.write(PGN_ENTRY.pack(pgn, *entry))
+        os.replace(temp, path)
+
+    @classmethod
+    def read(cls, path):
+        """
+        Read an index from a sidecar file.
+
+        Raises
+        ------
+        ValueError
+            The file is not an index or is the wrong version.
+
+        """
+        with open(path, 'rb') as file:
+            buffer = file.read()
+        try:
+            (magic, version, size, every_frames, every_seconds, count,
+             pgn_count) = HEADER.unpack_from(buffer, 0)
+        except struct.error:
+            raise ValueError(f'{path} is not an index file') from None
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not an index file')
+        offset = HEADER.size
+        columns = []
+        for typecode in ('d', 'Q', 'I'):
+            column = array(typecode)
+            length = count * column.itemsize
+            column.frombytes(buffer[offset:offset + length])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            columns.append(column)
+            offset += length
+        pgns = {}
+        for _ in range(pgn_count):
+            pgn, *entry = PGN_ENTRY.unpack_from(buffer, offset)
+            pgns[pgn] = entry
+            offset += PGN_ENTRY.size
+        return cls(size, every_frames, every_seconds, *columns, pgns)
+
+
+class IndexBuilder:
+    """
+    Build an index one frame at a time as a log file is written or read.
+
+    Parameters
+    ----------
+    every_frames : int, optional
+        Add a checkpoint at least every every_frames frames.  Default 1000.
+    every_seconds : float, optional
+        Add a checkpoint at least every every_seconds of log time.
+        Default 1.0.
+    """
+
+    def __init__(self, every_frames=1000, every_seconds=1.0):
+        self.every_frames = every_frames
+        self.every_seconds = every_seconds
+        self.timestamps = array('d')
+        self.offsets = array('Q')
+        self.frames = array('I')
+        self.pgns = {}
+        self.count = 0
+        self.next_time = None
+
+    def add(self, offset, timestamp, pgn):
+        """Record the frame starting at byte offset in the log file."""
+        if (self.count % self.every_frames == 0
+                or timestamp >= self.next_time):
+            self.timestamps.append(timestamp)
+            self.offsets.append(offset)
+            self.frames.append(self.count)
+            self.next_time = timestamp + self.every_seconds
+        entry = self.pgns.get(pgn)
+        if entry is None:
+            self.pgns[pgn] = [offset, offset, 1, timestamp, timestamp]
+        else:
+            entry[1] = offset
+            entry[2] += 1
+            entry[4] = timestamp
+        self.count += 1
+
+    def finish(self, size):
+        """Return the Index for a log file of size bytes."""
+        return Index(size, self.every_frames, self.every_seconds,
+                     self.timestamps, self.offsets, self.frames,
+                     {pgn: tuple(entry) for pgn, entry in self.pgns.items()})
+
+
+def build_index(log_path, every_frames=1000, every_seconds=1.0, write=True):
+    """
+    Index an existing plain .n2k log file.
+
+    Parameters
+    ----------
+    log_path : str
+    every_frames : int, optional
+        The default is 1000.
+    every_seconds : float, optional
+        The default is 1.0.
+    write : bool, optional
+        Write the sidecar index file.  The default is True.
+
+    Returns
+    -------
+    Index
+
+    """
+    builder = IndexBuilder(every_frames, every_seconds)
+    offset = 0
+    with open(log_path, 'rb') as log:
+        for line in log:
+            frame = n2klog.parse_line(line.decode('ascii', 'replace'))
+            if frame is not None:
+                builder.add(offset, frame[0], frame[2])
+            offset += len(line)
+    index = builder.finish(offset)
+    if write:
+        index.write(index_path(log_path))
+    return index
+
+
+def load_index(log_path, build=True):
+    """
+    Return the index for a log file.
+
+    The sidecar file is used if it matches the size of the log file, otherwise
+    the log is indexed again.
+
+    Parameters
+    ----------
+    log_path : str
+    build : bool, optional
+        Build the index if there is no usable sidecar file, otherwise return
+        None.  The default is True.
+
+    Returns
+    -------
+    Index or None
+
+    """
+    logger = logging.getLogger('n2kindex')
+    try:
+        index = Index.read(index_path(log_path))
+        if index.size == os.path.getsize(log_path):
+            return index
+        logger.info(f'Index for {log_path} is out of date')
+    except FileNotFoundError:
+        pass
+    except ValueError as error:
+        logger.warning(str(error))
+    if not build:
+        return None
+    logger.info(f'Indexing {log_path}')
+    return build_index(log_path)
+
+
+def read_window(log_path, start=None, end=None, pgns=None, index=None):
+    """
+    Read the frames in a time window and/or for some PGNs only.
+
+    Parameters
+    ----------
+    log_path : str
+        A plain .n2k log file.
+    start, end : float, optional
+        Time window as POSIX timestamps, inclusive.  None for no limit.
+    pgns : iterable of int, optional
+        Only return these PGNs.
+    index : Index, optional
+        The default is load_index(log_path).
+
+    Yields
+    ------
+    tuple
+        (timestamp, priority, pgn, source, destination, data) as for
+        n2klog.read_frames.
+
+    """
+    if index is None:
+        index = load_index(log_path)
+    wanted = None if pgns is None else {str(pgn) for pgn in pgns}
+    first, stop = index.byte_range(start, end, pgns)
+    with open(log_path, 'rb') as log:
+        log.seek(first)
+        remaining = stop - first
+        while remaining > 0:
+            line = log.readline()
+            if not line:
+                break
+            remaining -= len(line)
+            text = line.decode('ascii', 'replace')
+            if wanted is not None:
+                fields = text.split(',', 3)
+                if len(fields) < 4 or fields[2] not in wanted:
+                    continue
+            frame = n2klog.parse_line(text)
+            if frame is None:
+                continue
+            if start is not None and frame[0] < start:
+                continue
+            if end is not None and frame[0] > end:
+                continue
+            yield frame
+
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:44 2026
+
+@author: wmorland
+
+Read NMEA 2000 log files written by the logger.
+
+Log files are in the canboat plain format written by cannew.N2KWriter, either
+as a plain .n2k text file or as the .n2k.zip archive produced by
+rkrutils.zip_logs.
+
+# time----------------------,p,pgn---,s,d--,b,data-------------------
+# 2020-10-04 21:48:20.582346,3,129029,9,255,8,80,2b,b3,6d,48,a0,e2,a8
+"""
+
+import io
+import zipfile
+from array import array
+from datetime import datetime
+
+# Bump this whenever the output of decode_log changes so that anything cached
+# from an older decoder is thrown away.
+DECODER_VERSION = 1
+
+# NMEA 2000 bus bitrate, bits per second
+BITRATE = 250000
+
+
+class PGNFrames:
+    """
+    All the frames for a single PGN from a log file.
+
+    Columns are held in flat arrays rather than one object per frame so that a
+    six hour log can be held in memory on a modest laptop.  Data bytes for
+    frame i are data[8 * i:8 * i + 8], padded with 0xff when the dlc is less
+    than 8.
+    """
+
+    __slots__ = (
+        'pgn',
+        'timestamp',
+        'priority',
+        'source',
+        'destination',
+        'dlc',
+        'data'
+        )
+
+    def __init__(self, pgn):
+        self.pgn = pgn
+        self.timestamp = array('d')
+        self.priority = array('B')
+        self.source = array('B')
+        self.destination = array('B')
+        self.dlc = array('B')
+        self.data = bytearray()
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def append(self, timestamp, priority, source, destination, data):
+        """Add a single frame."""
+        self.timestamp.append(timestamp)
+        self.priority.append(priority)
+        self.source.append(source)
+        self.destination.append(destination)
+        self.dlc.append(len(data))
+        self.data += data
+        if len(data) < 8:
+            self.data += b'\xff' * (8 - len(data))
+
+    def extend(self, other):
+        """Add all the frames from another PGNFrames for the same PGN."""
+        self.timestamp.extend(other.timestamp)
+        self.priority.extend(other.priority)
+        self.source.extend(other.source)
+        self.destination.extend(other.destination)
+        self.dlc.extend(other.dlc)
+        self.data += other.data
+
+    def frame_data(self, i):
+        """Return the data bytes for frame i."""
+        return bytes(self.data[8 * i:8 * i + self.dlc[i]])
+
+
+def arbitration_id(priority, pgn, source, destination=255):
+    """
+    Build the 29 bit CAN arbitration id for a frame in a log file.
+
+    PDU1 PGNs, PDU format below 240, carry the destination in the PDU specific
+    byte.  PDU2 PGNs are always broadcast and the PDU specific byte is part of
+    the PGN.
+    """
+    if (pgn >> 8) & 0xff < 240:
+        return ((priority & 0x7) << 26 | (pgn & 0x3ff00) << 8
+                | (destination & 0xff) << 8 | (source & 0xff))
+    return (priority & 0x7) << 26 | (pgn & 0x3ffff) << 8 | (source & 0xff)
+
+
+def frame_bits(dlc, stuffing=0.5):
+    """
+    Bits on the wire for an extended CAN frame, including interframe space.
+
+    An extended data frame is 67 bits plus 8 per data byte before bit
+    stuffing.  Stuffing adds at most one bit in every four after the first,
+    over the 54 bits of header and the data and CRC.  stuffing is the fraction
+    of that worst case to assume, 0.5 is typical of NMEA 2000 traffic.
+    """
+    return 67 + 8 * dlc + stuffing * ((54 + 8 * dlc - 1) // 4)
+
+
+def open_log(path):
+    """
+    Open a log file for reading as text.
+
+    Parameters
+    ----------
+    path : str
+        A plain .n2k log file or a .zip archive holding one.
+
+    Returns
+    -------
+    io.TextIOBase
+
+    """
+    if str(path).endswith('.zip'):
+        archive = zipfile.ZipFile(path)
+        members = [name for name in archive.namelist()
+                   if not name.endswith('/')]
+        if len(members) != 1:
+            archive.close()
+            raise ValueError(f'Expected one log file in {path}, '
+                             f'found {len(members)}')
+        return io.TextIOWrapper(archive.open(members[0]), encoding='ascii')
+    return open(path, 'r', encoding='ascii')
+
+
+def parse_line(line):
+    """
+    Parse one line of a plain format log.
+
+    Parameters
+    ----------
+    line : str
+
+    Returns
+    -------
+    tuple or None
+        (timestamp, priority, pgn, source, destination, data) or None if the
+        line is a header, blank or cannot be parsed.
+
+    """
+    fields = line.split(',', 6)
+    if len(fields) < 6 or not fields[0][:1].isdigit():
+        return None
+    try:
+        timestamp = datetime.fromisoformat(fields[0]).timestamp()
+        dlc = int(fields[5])
+        data = bytes.fromhex(fields[6].replace(',', ' ')) if dlc else b''
+        return (timestamp, int(fields[1]), int(fields[2]), int(fields[3]),
+                int(fields[4]), data[:dlc])
+    except (ValueError, IndexError):
+        return None
+
+
+def read_frames(path):
+    """
+    Iterate over the frames in a log file.
+
+    Lines that cannot be parsed are skipped.
+
+    Parameters
+    ----------
+    path : str
+        A plain .n2k log file or a .zip archive holding one.
+
+    Yields
+    ------
+    tuple
+        (timestamp, priority, pgn, source, destination, data)
+
+    """
+    with open_log(path) as log:
+        for line in log:
+            frame = parse_line(line)
+            if frame is not None:
+                yield frame
+
+
+def decode_log(paths):
+    """
+    Decode one or more log files into per PGN columns.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        Log files to decode.  Rotated segments of one session should be given
+        in order.
+
+    Returns
+    -------
+    dict
+        PGN number to PGNFrames.
+
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    pgns = {}
+    for path in paths:
+        for timestamp, priority, pgn, source, destination, data in \
+                read_frames(path):
+            try:
+                frames = pgns[pgn]
+            except KeyError:
+                frames = pgns[pgn] = PGNFrames(pgn)
+            frames.append(timestamp, priority, source, destination, data)
+    return pgns
@@ -7,16 +7,40 @@ Created on Fri Feb  5 18:52:25 2021
 """
 
 import logging
-import subprocess
 import can
 import cannew
+import metrics
+import n2klog
+import framebatch
+import profiler
+import lazyimport
+from time import perf_counter
 from datetime import datetime
 
+# Only loaded when first used, by capture or by bringing up the bus, so
+# importing this module for a helper or a constant is cheap.
+canif = lazyimport.lazy_import('canif')
+canmerge = lazyimport.lazy_import('canmerge')
+addressclaim = lazyimport.lazy_import('addressclaim')
+isotp = lazyimport.lazy_import('isotp')
+inventory = lazyimport.lazy_import('inventory')
+sourceselect = lazyimport.lazy_import('sourceselect')
 
-def can_bus_is_up():
+
+CAN_CHANNEL = 'can0'
+BITRATE = 100000
+RESTART_MS = 100        # kernel restart after bus-off
+
+
+def can_bus_is_up(interface=None):
     """
     Check if the NMEA 2000 network is already up and running.
 
+    Parameters
+    ----------
+    interface : canif.CANInterface, optional
+        The default is CAN_CHANNEL.
+
     Returns
     -------
     bool
@@ -26,26 +50,30 @@ def can_bus_is_up():
     """
 
     logger = logging.getLogger('nmea')
+    if interface is None:
+        interface = canif.CANInterface(CAN_CHANNEL)
 
     try:
-        config = subprocess.run(['sudo', 'ifconfig', 'can0'], check=True,
-                                capture_output=True, text=True)
-    except subprocess.CalledProcessError as process_error:
-        rc = process_error.returncode
-        logger.error('ifconfig can0: FAIL')
-        logger.error(f'return code = {rc}')
+        return interface.is_running()
+    except OSError as error:
+        logger.error(f'{interface.name} link: FAIL')
+        logger.error(f'error = {error}')
         return False
 
-    if (config.stdout.find('can0') == 0 and config.stdout.find('RUNNING') > 0):
-        return True
 
-    return False
-
-
-def start_can_bus():
+def start_can_bus(channel=CAN_CHANNEL):
     """
     Start the the NMEA 2000 network
 
+    The interface is configured through netlink, see :mod:`canif`, with the
+    kernel restarting the controller RESTART_MS after bus-off.  A virtual
+    vcan interface is only set up.
+
+    Parameters
+    ----------
+    channel : str, optional
+        The default is CAN_CHANNEL.
+
     Returns
     -------
     can.BusABC
@@ -53,37 +81,72 @@ def start_can_bus():
     """
 
     logger = logging.getLogger('nmea')
+    interface = canif.CANInterface(channel)
 
-    if can_bus_is_up():
-        logger.info('CAN bus is already running.')
-    else:
-        try:
-            subprocess.run(['sudo', 'ip', 'link', 'set', 'can0', 'type', 'can',
-                            'bitrate', '100000'],
-                           check=True)
-        except subprocess.CalledProcessError as process_error:
-            rc = process_error.returncode
-            logger.error('ip link set can0: FAIL')
-            logger.error(f'return code = {rc}')
-            return None
-        logger.info('ip link set can0: SUCCESS')
-
-        try:
-            subprocess.run(['sudo', 'ifconfig', 'can0', 'up'], check=True)
-        except subprocess.CalledProcessError as process_error:
-            rc = process_error.returncode
-            logger.error('ifconfig can0 up: FAIL')
-            logger.error(f'return code = {rc}')
-            return None
-        logger.info('ifconfig can0 up: SUCCESS')
+    try:
+        if can_bus_is_up(interface):
+            logger.info(f'CAN bus {channel} is already running.')
+        else:
+            if not channel.startswith('vcan'):
+                try:
+                    interface.configure(bitrate=BITRATE,
+                                        restart_ms=RESTART_MS)
+                except OSError as error:
+                    logger.error(f'set {channel} bitrate: FAIL')
+                    logger.error(f'error = {error}')
+                    return None
+                logger.info(f'set {channel} bitrate: SUCCESS')
+
+            try:
+                interface.set_up(True)
+            except OSError as error:
+                logger.error(f'set {channel} up: FAIL')
+                logger.error(f'error = {error}')
+                return None
+            logger.info(f'set {channel} up: SUCCESS')
+    finally:
+        interface.close()
 
-    return can.interface.Bus(channel='can0', bustype='socketcan_ctypes')
+    return can.interface.Bus(channel=channel, bustype='socketcan_ctypes')
 
 
-def stop_can_bus():
+def start_can_buses(channels=(CAN_CHANNEL,)):
+    """
+    Start one or more CAN interfaces for capture.
+
+    Parameters
+    ----------
+    channels : sequence of str, optional
+        The first is the primary channel.  The default is CAN_CHANNEL.
+
+    Returns
+    -------
+    can.BusABC or canmerge.MergedBus
+        The bus itself for one channel, None if any channel fails to start.
+
+    """
+    if len(channels) == 1:
+        return start_can_bus(channels[0])
+    buses = {}
+    for channel in channels:
+        bus = start_can_bus(channel)
+        if bus is None:
+            for started in buses.values():
+                started.shutdown()
+            return None
+        buses[channel] = bus
+    return canmerge.MergedBus(buses)
+
+
+def stop_can_bus(channel=CAN_CHANNEL):
     """
     Stop the NMEA 2000 network.
 
+    Parameters
+    ----------
+    channel : str, optional
+        The default is CAN_CHANNEL.
+
     Returns
     -------
     None.
@@ -91,13 +154,16 @@ def stop_can_bus():
     """
 
     logger = logging.getLogger('nmea')
+    interface = canif.CANInterface(channel)
     try:
-        subprocess.run(['sudo', 'ifconfig', 'can0', 'down'], check=True)
-    except subprocess.CalledProcessError as process_error:
-        rc = process_error.returncode
-        logger.error('ifconfig can0 down: FAIL')
-        logger.error(f'return code = {rc}')
-    logger.info('ifconfig can0 down: SUCCESS')
+        interface.set_up(False)
+    except OSError as error:
+        logger.error(f'set {channel} down: FAIL')
+        logger.error(f'error = {error}')
+    else:
+        logger.info(f'set {channel} down: SUCCESS')
+    finally:
+        interface.close()
 
     return None
 
@@ -119,6 +185,7 @@ class NMEA2000_Frame:
         "pdu_s",
         "pgn",
         "source",
+        "destination",
         "is_short_pgn",
         "is_extended_id",
         "is_remote_frame",
@@ -137,27 +204,30 @@ class NMEA2000_Frame:
         self.date_time = datetime.fromtimestamp(msg.timestamp)
 
         # Pick apart the arbitration ID into the separate NMEA2000 fields
-        self.priority = (msg.arbitration_id & PRIORITY) >> 26
-        self.pdu_f = (msg.arbitration_id & PDU_F) >> 16
+        self.priority = (msg.arbitration_id & self.PRIORITY) >> 26
+        self.pdu_f = (msg.arbitration_id & self.PDU_F) >> 16
         if self.pdu_f <= 239:
             # The message has a specific destination
-            self.destination = (msg.arbitration_id & PDU_S) >> 8
-            self.pgn = (msg.arbitration_id & SHORT_PGN) >> 16
+            self.destination = (msg.arbitration_id & self.PDU_S) >> 8
+            self.pgn = (msg.arbitration_id & self.SHORT_PGN) >> 8
             self.is_short_pgn = True
         else:
             self.destination = 255
-            self.pgn = (msg.arbitration_id & LONG_PGN) >> 8
+            self.pgn = (msg.arbitration_id & self.LONG_PGN) >> 8
             self.is_short_pgn = False
-        self.source = msg.arbitration_id & SOURCE
+        self.source = msg.arbitration_id & self.SOURCE
 
         self.is_extended_id = msg.is_extended_id
         self.is_remote_frame = msg.is_remote_frame
+        self.is_error_frame = msg.is_error_frame
         self.channel = msg.channel
         self.is_fd = msg.is_fd
         self.is_rx = msg.is_rx
         self.srr = 0b1                # Subsitute Remote Request, what is this?
         self.bitrate_switch = msg.bitrate_switch
         self.error_state_indicator = msg.error_state_indicator
+        self.dlc = msg.dlc
+        self.data = msg.data
 
     def __str__(self) -> str:
         field_data = ','.join(format(n, '02X') for n in self.data)
@@ -169,24 +239,18 @@ class NMEA2000_Frame:
             str(self.source),
             str(self.destination),
             str(self.dlc),
-            data
+            field_data
         ])
 
         return line
 
     def can_message(self):
-        # Assemble an arbitration_id
-        arbitraiton_id = self.priority << 26
-        if self.is_short_pgn:
-            arbitration_id |= (self.pgn << 16)
-            arbitration_id |= (self.destination << 8)
-        else:
-            arbitration_id |= (self.pgn << 8)
-        arbitration_id |= self.source
-
+        """Rebuild the can.Message for this frame."""
         new = can.Message(
-            timstamp=self.date_time.timestamp(),
-            arbitration_id=arbitration_id,
+            timestamp=self.date_time.timestamp(),
+            arbitration_id=n2klog.arbitration_id(self.priority, self.pgn,
+                                                 self.source,
+                                                 self.destination),
             is_extended_id=self.is_extended_id,
             is_remote_frame=self.is_remote_frame,
             is_error_frame=self.is_error_frame,
@@ -196,36 +260,52 @@ class NMEA2000_Frame:
             is_fd=self.is_fd,
             is_rx=self.is_rx,
             bitrate_switch=self.bitrate_switch,
-            error_state_indicator=self.error_state_indictor
+            error_state_indicator=self.error_state_indicator
             )
         return new
 
 
-def negotiate_node_id():
+def negotiate_node_id(can0=None, name=None):
     """
     Negotiate a node ID for the Pi on the NMEA 2000 network.
 
     https://copperhilltech.com/blog/tag/Address+Claim
 
-    How does this process work?
-    PGN 59392: isoAcknowledgement
-    PGN 59904: isoRequest
-    PGN 60160: isoTransportProtocolDataTransfer
-    PGN 60416: isoTransportProtocolConnectionManagementRequestToSend
-    PGN 60416: isoTransportProtocolConnectionManagementClearToSend
-    PGN 60416: isoTransportProtocolConnectionManagementEndOfMessage
-    PGN 60416: isoTransportProtocolConnectionManagementBroadcastAnnounce
-    PGN 60416: isoTransportProtocolConnectionManagementAbort
-    PGN 60928: isoAddressClaim
-    PGN 65240: isoCommandedAddress
+    The address claim, PGN 60928, is done by addressclaim.AddressClaimer.  The
+    last address claimed is saved and claimed again first, so on a bus that
+    has not changed this takes 250ms.
+
+    Parameters
+    ----------
+    can0 : can.BusABC, optional
+        Without a bus the saved address is returned without claiming it.
+    name : int, optional
+        Our 64 bit NAME.  The default is made from the Pi serial number.
 
     Returns
     -------
     int
-        DESCRIPTION.
+        Our source address, 254 if no address could be claimed.
 
     """
+    if name is None:
+        name = addressclaim.make_name(pi_serial_number())
+    if can0 is None:
+        saved = addressclaim.load_address(name)
+        return addressclaim.NULL if saved is None else saved
+    claimer = addressclaim.claim_address(can0, name)
+    return claimer.address if claimer.ready else addressclaim.NULL
 
+
+def pi_serial_number():
+    """Low 21 bits of the Pi serial number, for the identity in our NAME."""
+    try:
+        with open('/proc/cpuinfo', 'r') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('Serial'):
+                    return int(line.split(':')[1], 16) & 0x1fffff
+    except (OSError, ValueError, IndexError):
+        pass
     return 0
 
 
@@ -234,7 +314,9 @@ def set_filters(can0):
     Set filters on the NMEA 2000 network.
 
     The filters ensure that only messages directly relevent to sailing
-    performance are logged.
+    performance are logged, with the address claims and product information
+    for the device inventory and the ISO transport protocol frames that
+    capture_can_messages reassembles.
 
     Parameters
     ----------
@@ -260,6 +342,12 @@ def set_filters(can0):
     # COG & SOG     = 129026, 0x1f80200
     # Date & Time   = 129033, 0x1f80900
     # Wind Data     = 130306, 0x1fd0200
+    # Product Info  = 126996, 0x1f01400
+    # PDU1 PGNs carry the destination in the low byte, so only the PGN is
+    # matched
+    # Addr Claim    = 60928,  0x0ee0000
+    # TP.CM         = 60416,  0x0ec0000
+    # TP.DT         = 60160,  0x0eb0000
 
     filters = [
         {'can_id': 0x1f10d00, 'can_mask': 0x3ffff00, 'extended': True},
@@ -272,6 +360,10 @@ def set_filters(can0):
         {'can_id': 0x1f80200, 'can_mask': 0x3ffff00, 'extended': True},
         {'can_id': 0x1f80900, 'can_mask': 0x3ffff00, 'extended': True},
         {'can_id': 0x1fd0200, 'can_mask': 0x3ffff00, 'extended': True},
+        {'can_id': 0x1f01400, 'can_mask': 0x3ffff00, 'extended': True},
+        {'can_id': 0x0ee0000, 'can_mask': 0x3ff0000, 'extended': True},
+        {'can_id': 0x0ec0000, 'can_mask': 0x3ff0000, 'extended': True},
+        {'can_id': 0x0eb0000, 'can_mask': 0x3ff0000, 'extended': True},
         ]
     can0.set_filters(filters)
 
@@ -308,25 +400,77 @@ def is_gps_time_message(msg):
     if pgn != 129029:
         # Not GNS Postiion Data
         return False
-    if msg.data[:1] & 0b1111:
-        # Frame identifier not zero
-        # Is the first fram zero or one?
+    if msg.data[0] & 0x1f:
+        # Fast packet frame counter not zero, not the first frame
         return False
 
     return True
 
 
-def capture_can_messages(can0):
+def capture_can_messages(can0, listeners=(), wanted_pgns=None,
+                         status_interval=60.0, metrics_socket=None,
+                         sampler=None, stop=None, monitor=None,
+                         split_channels=False, on_logger=None):
     """
     Capture all messages from the CAN Bus.
 
     Messages are captured in series of log files, once the max file size is
-    reached a new file is started.  In this simple initial version there is no
-    filtering on the messages.
+    reached a new file is started.  Frames are filtered by the bus, see
+    set_filters, and any other PGNs that get past are dropped here if
+    wanted_pgns is given.
+
+    ISO transport protocol messages, see :mod:`isotp`, are reassembled as they
+    arrive and written complete to a sidecar log next to the log files.  The
+    devices on the bus, see :mod:`inventory`, are kept in a sidecar of each
+    log file.  Every frame is logged, but listeners only get the frames from
+    the best source of PGNs sent by more than one, see :mod:`sourceselect`.
+
+    Runtime metrics, see :mod:`metrics`, are written to the process log every
+    status_interval seconds and can be queried from a Unix socket.  The
+    health of the CAN controller, see :mod:`canif`, is polled with them and
+    the controller is restarted if it stays bus-off.
+
+    One bus is captured a batch at a time, see :mod:`framebatch`: the frames
+    queued on the bus are received together, the unwanted PGNs dropped and
+    the rest written with one write.  Listeners get a framebatch.Frame for
+    each frame, with the can.Message fields they read.
+
+    Several interfaces are captured by one canmerge.MergedBus, see
+    start_can_buses.  Their frames are logged in timestamp order to one log,
+    with the channel of each frame in a sidecar, or with split_channels to a
+    log per channel.  These are captured frame by frame.  Transport
+    protocol, the device inventory, source selection and listeners only
+    follow the primary channel, the first.
 
     Parameters
     ----------
-    can0 : can.BusABC
+    can0 : can.BusABC or canmerge.MergedBus
+    listeners : iterable of callable, optional
+        Also called with every frame received from a primary source, e.g.
+        a livestate.LiveState holding the latest instrument values for a
+        display.
+    wanted_pgns : set of int, optional
+        Drop any other PGNs that get past the bus filters.  By default every
+        message is logged.
+    status_interval : float, optional
+        Seconds between metrics status lines.  The default is 60.
+    metrics_socket : str, optional
+        Unix socket for metrics queries.  The default is capture.sock in
+        RKRPROCESSLOGS.
+    sampler : profiler.SamplingProfiler, optional
+        Profile the capture loop.  By default a profiler is only run if
+        RKRPROFILE is set.
+    stop : threading.Event, optional
+        Capture ends when this is set, for running in a worker thread.  By
+        default capture runs until KeyboardInterrupt.
+    monitor : canif.HealthMonitor, optional
+        The default monitors the interface of a SocketCAN bus.
+    split_channels : bool, optional
+        Log each channel of a MergedBus to its own files, foo.can1.n2k and so
+        on, with the primary channel in foo.n2k.  The default is False.
+    on_logger : callable, optional
+        Called with the cannew.SizedRotatingLogger of the primary channel
+        once it is created, e.g. to publish its rollover count.
 
     Returns
     -------
@@ -339,17 +483,132 @@ def capture_can_messages(can0):
     file_size = 2048
     log_file = 'foo.n2k'
 
-    can_logger = cannew.SizedRotatingLogger(base_filename=log_file,
-                                            max_bytes=file_size)
+    channels = getattr(can0, 'channels', None)
+    primary = getattr(can0, 'primary', None)
+    can_logger = cannew.SizedRotatingLogger(
+        base_filename=log_file, max_bytes=file_size,
+        channels=channels is not None and not split_channels)
+    loggers = None
+    if channels is not None and split_channels:
+        loggers = {channel: cannew.SizedRotatingLogger(
+            base_filename=canmerge.channel_log_path(log_file, channel),
+            max_bytes=file_size) for channel in channels[1:]}
+        loggers[primary] = can_logger
+    if on_logger is not None:
+        on_logger(can_logger)
+    transport_log = isotp.TransportLog(isotp.transport_log_path(log_file))
+    transport = isotp.Reassembler(transport_log)
+    devices = inventory.DeviceInventory(
+        inventory.inventory_path(can_logger.base_filename))
+    selector = sourceselect.SourceSelector(
+        on_change=sourceselect.SelectionLog(
+            sourceselect.selection_log_path(can_logger.base_filename)))
+    capture_metrics = metrics.CaptureMetrics(interval=status_interval)
+    if monitor is None:
+        monitor = canif.monitor_bus(can0, status_interval=status_interval)
+    capture_metrics.controller = monitor
+    try:
+        server = metrics.MetricsServer(capture_metrics, metrics_socket)
+    except OSError as error:
+        logger.warning(f'Metrics socket: FAIL {error}')
+        server = None
+    if sampler is None:
+        sampler = profiler.from_environment()
+    if sampler is not None:
+        sampler.start()
+
+    stopped = stop.is_set if stop is not None else lambda: False
+    # One bus is captured a batch at a time, a MergedBus frame by frame as
+    # the frames of a batch share one channel
+    batch = framebatch.FrameBatch() if channels is None else None
 
     try:
-        while True:
+        while batch is not None and not stopped():
+            if not framebatch.receive(can0, batch, 1):
+                capture_metrics.error_frames += batch.errors
+                batch.clear()
+                capture_metrics.tick(can_logger)
+                if monitor is not None:
+                    monitor.poll()
+                continue
+            capture_metrics.record_batch(batch)
+            if wanted_pgns is not None:
+                capture_metrics.filtered += batch.select(wanted_pgns)
+            if batch.size:
+                start = perf_counter()
+                can_logger.write_batch(batch)
+                capture_metrics.record_write(perf_counter() - start,
+                                             batch.frame(batch.size - 1))
+            capture_metrics.tick(can_logger)
+            if monitor is not None:
+                monitor.poll()
+            pgns = batch.pgn
+            sources = batch.source
+            for i in range(batch.size):
+                pgn = pgns[i]
+                frame = batch.frame(i)
+                if pgn in isotp.TRANSPORT_PGNS:
+                    transport(frame)
+                elif pgn in inventory.INVENTORY_PGNS:
+                    devices(frame)
+                elif pgn in selector.pgns and not selector.update(
+                        frame.timestamp, pgn, sources[i], frame.data):
+                    continue
+                for listener in listeners:
+                    listener(frame)
+            batch.clear()
+        while batch is None and not stopped():
             msg = can0.recv(1)
-            if msg is not None:
-                can_logger(msg)
-                if msg
+            if msg is None:
+                capture_metrics.tick(can_logger)
+                if monitor is not None:
+                    monitor.poll()
+                continue
+            pgn = capture_metrics.record(msg)
+            if pgn is None:
+                continue
+            if wanted_pgns is not None and pgn not in wanted_pgns:
+                capture_metrics.filtered += 1
+                continue
+            writer = can_logger if loggers is None else loggers[msg.channel]
+            if capture_metrics.sample():
+                start = perf_counter()
+                writer(msg)
+                capture_metrics.record_write(perf_counter() - start, msg)
+                if not capture_metrics.frames & 0xff:
+                    capture_metrics.tick(can_logger)
+                    if monitor is not None:
+                        monitor.poll()
+            else:
+                writer(msg)
+            if primary is not None and msg.channel != primary:
+                continue
+            if pgn in isotp.TRANSPORT_PGNS:
+                transport(msg)
+            elif pgn in inventory.INVENTORY_PGNS:
+                devices(msg)
+            elif pgn in selector.pgns and not selector.update(
+                    msg.timestamp, pgn, msg.arbitration_id & 0xff, msg.data):
+                continue
+            for listener in listeners:
+                listener(msg)
     except KeyboardInterrupt:
         pass
     finally:
-        stop_can_bus()
+        if sampler is not None:
+            sampler.stop()
+        capture_metrics.tick(can_logger, force=True)
+        if server is not None:
+            server.close()
+        if monitor is not None:
+            monitor.close()
+        can0.shutdown()
+        # Take down the interfaces captured, not always can0
+        for channel in channels or (getattr(can0, 'channel', None)
+                                    or CAN_CHANNEL,):
+            stop_can_bus(channel)
         can_logger.stop()
+        for channel_logger in (loggers or {}).values():
+            if channel_logger is not can_logger:
+                channel_logger.stop()
+        transport_log.close()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 09:08:41 2026
+
+@author: wmorland
+
+Fast parser for the NMEA 0183 sentences the GPS bridge uses.
+
+pynmea2 handles every sentence type but builds a class per sentence and
+parses every field.  The bridge only needs RMC, GGA and VTG from the Garmin
+GLO, so those have a dedicated parser each, picked by a dict lookup on the
+sentence type, and only the fields we use are converted.  Any talker, GP, GN
+or GL, is accepted.  Other sentences are skipped after the type lookup
+without checking the checksum.
+
+Parsed sentences are namedtuples in SI units: radians, metres per second and
+POSIX seconds.
+"""
+
+import math
+from collections import namedtuple
+from datetime import datetime, timezone
+
+KNOTS = 1852 / 3600
+KPH = 1000 / 3600
+DEGREES = math.pi / 180
+
+RMC = namedtuple('RMC', ['time', 'valid', 'latitude', 'longitude', 'sog',
+                         'cog', 'date'])
+GGA = namedtuple('GGA', ['time', 'latitude', 'longitude', 'quality',
+                         'satellites', 'hdop', 'altitude', 'geoid'])
+VTG = namedtuple('VTG', ['cog', 'sog'])
+
+
+def checksum_ok(sentence):
+    """True if the sentence has a valid *hh checksum."""
+    star = sentence.rfind('*')
+    if star < 0 or len(sentence) < star + 3:
+        return False
+    total = 0
+    for char in sentence[1:star].encode('ascii', errors='replace'):
+        total ^= char
+    try:
+        return total == int(sentence[star + 1:star + 3], 16)
+    except ValueError:
+        return False
+
+
+def _coordinate(value, hemisphere):
+    """ddmm.mmmm or dddmm.mmmm with N/S/E/W to signed degrees."""
+    if not value:
+        return None
+    point = value.find('.')
+    if point < 0:
+        point = len(value)
+    degrees = float(value[:point - 2]) + float(value[point - 2:]) / 60
+    return -degrees if hemisphere in ('S', 'W') else degrees
+
+
+def _float(value, scale=1.0):
+    return float(value) * scale if value else None
+
+
+def _seconds_of_day(value):
+    """hhmmss.ss to seconds since midnight."""
+    if len(value) < 6:
+        return None
+    return (int(value[0:2]) * 3600 + int(value[2:4]) * 60
+            + float(value[4:]))
+
+
+def _rmc(fields):
+    date = None
+    if len(fields[9]) == 6:
+        day = fields[9]
+        date = datetime(2000 + int(day[4:6]), int(day[2:4]), int(day[0:2]),
+                        tzinfo=timezone.utc).timestamp()
+    return RMC(_seconds_of_day(fields[1]), fields[2] == 'A',
+               _coordinate(fields[3], fields[4]),
+               _coordinate(fields[5], fields[6]),
+               _float(fields[7], KNOTS), _float(fields[8], DEGREES), date)
+
+
+def _gga(fields):
+    return GGA(_seconds_of_day(fields[1]),
+               _coordinate(fields[2], fields[3]),
+               _coordinate(fields[4], fields[5]),
+               int(fields[6] or 0), int(fields[7] or 0), _float(fields[8]),
+               _float(fields[9]), _float(fields[11]))
+
+
+def _vtg(fields):
+    sog = _float(fields[7], KPH)
+    if sog is None:
+        sog = _float(fields[5], KNOTS)
+    return VTG(_float(fields[1], DEGREES), sog)
+
+
+# Sentence type to (parser, fields needed)
+PARSERS = {
+    'RMC': (_rmc, 10),
+    'GGA': (_gga, 12),
+    'VTG': (_vtg, 8),
+    }
+
+
+def parse(sentence):
+    """
+    Parse one sentence.
+
+    Parameters
+    ----------
+    sentence : str
+        With or without the line ending.
+
+    Returns
+    -------
+    RMC, GGA, VTG or None
+        None for other sentence types and for sentences that are truncated,
+        have a bad checksum or cannot be parsed.
+
+    """
+    if len(sentence) < 7 or sentence[0] != '$':
+        return None
+    parser = PARSERS.get(sentence[3:6])
+    if parser is None:
+        return None
+    sentence = sentence.rstrip('\r\n')
+    if not checksum_ok(sentence):
+        return None
+    parse_fields, needed = parser
+    fields = sentence[:sentence.rfind('*')].split(',')
+    if len(fields) < needed:
+        return None
+    try:
+        return parse_fields(fields)
+    except (ValueError, IndexError):
+        return None
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 31 09:32:18 2026
+
+@author: wmorland
+
+Registry of PGN definitions compiled once and cached on disk.
+
+The full canboat pgns.json is several MB and takes seconds to parse on a Pi
+Zero.  The registry compiles each definition to an n2kcodec plan once and
+saves them in a cache file named by the SHA-1 of the JSON, so a changed
+database is compiled again and an unchanged one never is.
+
+The cache file is marshal data, read in one call:
+
+    (CACHE_VERSION, {pgn: marshalled plan, ...})
+
+Each plan stays marshalled until its PGN is first asked for, so the time and
+memory at startup depend on the PGNs actually seen rather than the size of
+the database.  Where canboat has more than one definition for a PGN, the
+proprietary ones, the first is used.
+
+The database is pgns.json next to this module, the PGNs we send, unless
+N2KPGNDB names another, e.g. the canboat one.  Cache files go in
+~/.cache/rkr-logger/pgns, or N2KPGNCACHE.
+"""
+
+import os
+import json
+import marshal
+import hashlib
+import logging
+import n2kcodec
+
+# Bump this whenever the output of n2kcodec.compile_plan changes.
+CACHE_VERSION = 1
+SUFFIX = '.pgns'
+
+
+def definitions_path():
+    """The PGN database in canboat pgns.json format."""
+    return os.getenv('N2KPGNDB', n2kcodec.DEFINITIONS)
+
+
+def cache_directory():
+    """Where compiled databases are cached."""
+    return os.getenv('N2KPGNCACHE', os.path.join(
+        os.path.expanduser('~'), '.cache', 'rkr-logger', 'pgns'))
+
+
+def compile_definitions(source):
+    """
+    Compile a pgns.json file.
+
+    Parameters
+    ----------
+    source : bytes
+        The JSON.
+
+    Returns
+    -------
+    dict
+        PGN to marshalled plan.
+
+    """
+    entries = {}
+    for definition in json.loads(source)['PGNs']:
+        pgn = definition['PGN']
+        if pgn in entries or not definition.get('Fields'):
+            continue
+        try:
+            entries[pgn] = marshal.dumps(n2kcodec.compile_plan(definition))
+        except (KeyError, TypeError, ValueError) as error:
+            logging.getLogger('pgnregistry').warning(
+                f'PGN {pgn}: FAIL {error!r}')
+    return entries
+
+
+class PGNRegistry:
+    """
+    PGN codecs from a definitions file, through the cache.
+
+    Parameters
+    ----------
+    path : str, optional
+        The default is definitions_path().
+    directory : str, optional
+        Cache directory.  The default is cache_directory().
+    """
+
+    def __init__(self, path=None, directory=None):
+        self.path = definitions_path() if path is None else path
+        self.directory = cache_directory() if directory is None \
+            else directory
+        self.entries = None
+        self.codecs = {}
+        self.from_cache = False
+
+    def cache_path(self, digest):
+        return os.path.join(self.directory, f'{digest}{SUFFIX}')
+
+    def load(self):
+        """Load the cache, compiling and saving it if it is missing."""
+        with open(self.path, 'rb') as file:
+            source = file.read()
+        digest = hashlib.sha1(source).hexdigest()
+        cache_path = self.cache_path(digest)
+        try:
+            with open(cache_path, 'rb') as file:
+                version, entries = marshal.loads(file.read())
+            if version == CACHE_VERSION:
+                self.entries = entries
+                self.from_cache = True
+                return
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        self.entries = compile_definitions(source)
+        self.from_cache = False
+        self._save(cache_path)
+
+    def _save(self, cache_path):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp = f'{cache_path}.tmp'
+            with open(temp, 'wb') as file:
+                file.write(marshal.dumps((CACHE_VERSION, self.entries)))
+            os.replace(temp, cache_path)
+            # Only the current database is worth keeping
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if name.endswith(SUFFIX) and path != cache_path:
+                    os.remove(path)
+        except OSError as error:
+            logging.getLogger('pgnregistry').warning(
+                f'Save PGN cache: FAIL {error}')
+
+    def __contains__(self, pgn):
+        if self.entries is None:
+            self.load()
+        return pgn in self.entries
+
+    def __len__(self):
+        if self.entries is None:
+            self.load()
+        return len(self.entries)
+
+    def plan(self, pgn):
+        """The compiled plan for a PGN, KeyError if it is not defined."""
+        if self.entries is None:
+            self.load()
+        return marshal.loads(self.entries[pgn])
+
+    def codec(self, pgn):
+        """The n2kcodec.PGNCodec for a PGN, made on first use."""
+        try:
+            return self.codecs[pgn]
+        except KeyError:
+            codec = self.codecs[pgn] = n2kcodec.PGNCodec(self.plan(pgn))
+            return codec
+
+    def get(self, pgn):
+        """The codec for a PGN, or None if it is not defined."""
+        try:
+            return self.codec(pgn)
+        except KeyError:
+            return None
+
+
+_default = None
+
+
+def default_registry():
+    """The registry for definitions_path(), shared by the process."""
+    global _default
+    if _default is None:
+        _default = PGNRegistry()
+    return _default
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 09:26:14 2026
+
+@author: wmorland
+
+Sampling profiler for long capture sessions.
+
+Slowdowns on the boat tend to show up only after hours of logging.  The
+profiler samples the thread that starts it, 50 times per CPU second of that
+thread by default.  Each sample records the stack as a tuple of code objects
+and counts it, which costs a few microseconds, so the overhead is well under
+1% and it can be left on during a race.
+
+In the main thread samples are taken by a SIGPROF handler driven by an
+interval timer on CPU time.  Signal handlers only run in the main thread, so
+in any other thread, e.g. capture run by the supervisor in a worker thread,
+a sampler thread wakes every interval, reads the CPU clock of the profiled
+thread and takes its stack from sys._current_frames once it has used
+another interval of CPU.
+
+Every snapshot_interval seconds a background thread writes the counts out as
+a gzipped folded stack file, one 'outer;...;inner count' line per stack, the
+format flamegraph.pl and speedscope read, and starts counting again.
+Snapshots go in a profiles directory next to the process logs and the oldest
+are deleted to keep the directory under max_bytes.
+
+Profiling is opt in, set RKRPROFILE=1 before starting the logger.  To see the
+hottest functions over all snapshots:
+
+    python3 profiler.py $RKRPROCESSLOGS/profiles
+"""
+
+import os
+import sys
+import gzip
+import time
+import signal
+import logging
+import threading
+
+DEFAULT_DIRECTORY = 'profiles'
+SUFFIX = '.folded.gz'
+
+
+def default_directory():
+    """Profiles directory in the process log directory."""
+    return os.path.join(os.getenv('RKRPROCESSLOGS', '.'), DEFAULT_DIRECTORY)
+
+
+def _name(code):
+    return (f'{os.path.basename(code.co_filename)}:'
+            f'{code.co_name}:{code.co_firstlineno}')
+
+
+class SamplingProfiler:
+    """
+    Count stacks of the thread that starts it, sampled on its CPU time.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Where to write snapshots.  The default is profiles in RKRPROCESSLOGS.
+    interval : float, optional
+        CPU seconds between samples.  The default is 0.02.
+    snapshot_interval : float, optional
+        Seconds between snapshot files.  The default is 300.
+    max_bytes : int, optional
+        Disk space for snapshots, the oldest are removed beyond this.  The
+        default is 20MB.
+    max_depth : int, optional
+        Frames kept from each stack.  The default is 48.
+    """
+
+    def __init__(self, directory=None, interval=0.02, snapshot_interval=300.0,
+                 max_bytes=20 * 1024 * 1024, max_depth=48):
+        self.directory = default_directory() if directory is None \
+            else directory
+        self.interval = interval
+        self.snapshot_interval = snapshot_interval
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.samples = 0
+        self.snapshots = 0
+        self.previous_handler = None
+        self.stopping = threading.Event()
+        self.thread = None
+        self.sampler = None
+
+    def _sample(self, signum, frame):
+        self._count(frame)
+
+    def _poll(self, ident):
+        # Sample thread ident each time it has used interval of CPU
+        clock = time.pthread_getcpuclockid(ident)
+        last = time.clock_gettime(clock)
+        while not self.stopping.wait(self.interval):
+            try:
+                used = time.clock_gettime(clock) - last
+            except OSError:
+                return              # the thread has finished
+            ticks = int(used / self.interval)
+            if not ticks:
+                continue
+            last += ticks * self.interval
+            frame = sys._current_frames().get(ident)
+            if frame is None:
+                return
+            self._count(frame, ticks)
+
+    def _count(self, frame, samples=1):
+        stack = []
+        depth = self.max_depth
+        while frame is not None and depth:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+            depth -= 1
+        key = tuple(stack)
+        with self.lock:
+            counts = self.counts
+            counts[key] = counts.get(key, 0) + samples
+            self.samples += samples
+
+    def start(self):
+        """Start sampling the calling thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.stopping.clear()
+        if threading.current_thread() is threading.main_thread():
+            self.previous_handler = signal.signal(signal.SIGPROF,
+                                                  self._sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval,
+                             self.interval)
+        else:
+            self.sampler = threading.Thread(
+                target=self._poll, args=(threading.get_ident(),),
+                name='profiler-sampler', daemon=True)
+            self.sampler.start()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        logging.getLogger('profiler').info(
+            f'Sampling every {self.interval}s of CPU to {self.directory}')
+
+    def stop(self):
+        """Stop sampling and write a final snapshot."""
+        if self.thread is None:
+            return
+        if self.sampler is None:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF,
+                          self.previous_handler or signal.SIG_DFL)
+        self.stopping.set()
+        if self.sampler is not None:
+            self.sampler.join()
+            self.sampler = None
+        self.thread.join()
+        self.thread = None
+        self.snapshot()
+
+    def _run(self):
+        while not self.stopping.wait(self.snapshot_interval):
+            self.snapshot()
+
+    def snapshot(self):
+        """
+        Write the counts so far to a new snapshot file and reset them.
+
+        Returns
+        -------
+        str or None
+            The snapshot path, None if there were no samples.
+
+        """
+        # The handler counts under the lock too, so no sample is added to the
+        # old dict after it is taken
+        with self.lock:
+            counts, self.counts = self.counts, {}
+        if not counts:
+            return None
+        folded = {}
+        for stack, count in counts.items():
+            line = ';'.join(_name(code) for code in reversed(stack))
+            folded[line] = folded.get(line, 0) + count
+        stamp = time.strftime('%Y-%m-%dT%H%M%S')
+        path = os.path.join(self.directory,
+                            f'profile_{stamp}_{self.snapshots:04}{SUFFIX}')
+        with gzip.open(path, 'wt', encoding='utf-8') as file:
+            for line, count in sorted(folded.items(), key=lambda x: -x[1]):
+                file.write(f'{line} {count}\n')
+        self.snapshots += 1
+        self.prune()
+        return path
+
+    def prune(self):
+        """Remove the oldest snapshots until they fit in max_bytes."""
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name, stat.st_size, path))
+        files.sort()
+        total = sum(file[2] for file in files)
+        for _, _, size, path in files[:-1]:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+def from_environment():
+    """Return a SamplingProfiler if RKRPROFILE is set, otherwise None."""
+    setting = os.getenv('RKRPROFILE', '')
+    if setting in ('', '0'):
+        return None
+    return SamplingProfiler()
+
+
+def top_functions(directory, count=20):
+    """
+    Functions with the most samples over every snapshot in a directory.
+
+    Returns
+    -------
+    list of tuple
+        (function, self samples, total samples) most self samples first.
+
+    """
+    own = {}
+    total = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(SUFFIX):
+            continue
+        with gzip.open(os.path.join(directory, name), 'rt',
+                       encoding='utf-8') as file:
+            for line in file:
+                stack, _, samples = line.rstrip('\n').rpartition(' ')
+                samples = int(samples)
+                functions = stack.split(';')
+                own[functions[-1]] = own.get(functions[-1], 0) + samples
+                for function in set(functions):
+                    total[function] = total.get(function, 0) + samples
+    ranked = sorted(own.items(), key=lambda x: -x[1])[:count]
+    return [(function, samples, total[function])
+            for function, samples in ranked]
+
+
+if __name__ == '__main__':
+    rows = top_functions(sys.argv[1] if len(sys.argv) > 1
+                         else default_directory())
+    print(f'{"self":>8s} {"total":>8s}  function')
+    for function, samples, cumulative in rows:
+        print(f'{samples:8d} {cumulative:8d}  {function}')
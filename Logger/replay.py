@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 16:18:44 2026
+
+@author: wmorland
+
+Replay recorded NMEA 2000 logs onto a CAN bus or into the logging pipeline.
+
+Frames can be replayed in real time, at N times real time or as fast as
+possible.  Pacing uses time.monotonic and frames that fall due within a short
+batch window are sent together after a single sleep, so replay keeps up with
+race traffic on a Pi Zero without a sleep per frame.
+
+Plain .n2k logs and the .n2k.zip archives made by zip_logs are read with
+n2klog.  Any other format python-can can read (.asc, .blf, .csv, .log, .db)
+is read with can.LogReader.
+"""
+
+import time
+from collections import namedtuple
+import n2klog
+
+ReplayStats = namedtuple('ReplayStats', ['frames', 'seconds',
+                                         'frames_per_second', 'max_lag'])
+
+
+def read_messages(path):
+    """
+    Iterate over the frames in a log file of any supported format.
+
+    Yields
+    ------
+    tuple
+        (timestamp, arbitration_id, data)
+
+    """
+    name = str(path).lower()
+    if name.endswith('.n2k') or name.endswith('.n2k.zip'):
+        for (timestamp, priority, pgn, source, destination,
+             data) in n2klog.read_frames(path):
+            yield (timestamp,
+                   n2klog.arbitration_id(priority, pgn, source, destination),
+                   data)
+    else:
+        import can
+        for msg in can.LogReader(path):
+            if msg.is_error_frame or msg.is_remote_frame:
+                continue
+            yield msg.timestamp, msg.arbitration_id, bytes(msg.data)
+
+
+def replay(frames, send, speed=1.0, batch_window=0.002,
+           clock=time.monotonic, sleep=time.sleep):
+    """
+    Replay frames with their recorded timing.
+
+    Parameters
+    ----------
+    frames : iterable
+        (timestamp, arbitration_id, data) in time order, see read_messages.
+    send : callable
+        Called as send(timestamp, arbitration_id, data) for each frame.
+    speed : float, optional
+        1.0 for real time, 10.0 for ten times real time, 0 for as fast as
+        possible.  The default is 1.0.
+    batch_window : float, optional
+        Frames due within this many seconds of now are sent without sleeping.
+        The default is 0.002.
+    clock, sleep : callable, optional
+        Monotonic clock and sleep, replaceable for testing.
+
+    Returns
+    -------
+    ReplayStats
+        Frames sent, wall clock seconds, frames per second achieved and the
+        largest delay in seconds of a frame behind its due time.
+
+    """
+    count = 0
+    max_lag = 0.0
+    start = clock()
+    first = None
+    for timestamp, arbitration_id, data in frames:
+        if speed:
+            if first is None:
+                first = timestamp
+            due = (timestamp - first) / speed
+            now = clock() - start
+            if due - now > batch_window:
+                sleep(due - now)
+            elif now - due > max_lag:
+                max_lag = now - due
+        send(timestamp, arbitration_id, data)
+        count += 1
+    seconds = clock() - start
+    return ReplayStats(count, seconds, count / seconds if seconds else 0.0,
+                       max_lag)
+
+
+def message_sender(callback, retimestamp=True, channel=None):
+    """
+    Return a send function that turns frames into can.Message objects.
+
+    Parameters
+    ----------
+    callback : callable
+        Called with each can.Message, e.g. bus.send or a listener.
+    retimestamp : bool, optional
+        Stamp messages with the current time rather than the recorded time.
+        The default is True.
+    channel : str, optional
+        Channel to put in the messages.
+    """
+    import can
+
+    def send(timestamp, arbitration_id, data):
+        callback(can.Message(timestamp=time.time() if retimestamp
+                             else timestamp,
+                             arbitration_id=arbitration_id,
+                             is_extended_id=True,
+                             data=data,
+                             channel=channel))
+    return send
+
+
+def bus_sender(bus):
+    """Return a send function that transmits frames on a can.BusABC."""
+    return message_sender(bus.send)
+
+
+def pipeline_sender(listeners, retimestamp=False):
+    """
+    Return a send function that feeds frames straight to listeners.
+
+    Listeners are anything that can be called with a can.Message, such as
+    cannew.SizedRotatingLogger or livestate.LiveState, so the in process
+    pipeline can be driven without a bus.
+    """
+    listeners = list(listeners)
+
+    def callback(msg):
+        for listener in listeners:
+            listener(msg)
+    return message_sender(callback, retimestamp)
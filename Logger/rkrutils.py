@@ -12,6 +12,47 @@ import zipfile
 import contextlib
 import shutil
 import subprocess
+import lazyimport
+
+# Only needed for the names of the sidecars of a log, see sidecar_paths
+n2kindex = lazyimport.lazy_import('n2kindex')
+canmerge = lazyimport.lazy_import('canmerge')
+isotp = lazyimport.lazy_import('isotp')
+inventory = lazyimport.lazy_import('inventory')
+sourceselect = lazyimport.lazy_import('sourceselect')
+
+
+def renamed_sidecars():
+    """
+    Path functions of the sidecars that belong to one log file alone.
+
+    The index, channel tags and reassembled transport messages, renamed with
+    their log at rollover.
+    """
+    return (n2kindex.index_path, canmerge.channel_path,
+            isotp.transport_log_path)
+
+
+def copied_sidecars():
+    """
+    Path functions of the sidecars that go on describing the next log file.
+
+    The device inventory and source selections, copied at rollover.
+    """
+    return (inventory.inventory_path, sourceselect.selection_log_path)
+
+
+def sidecar_paths(log_path):
+    """
+    Paths of every sidecar of a log file, whether or not they exist.
+
+    The sidecars of foo.n2k.zip are those of foo.n2k.
+    """
+    log_path = str(log_path)
+    if log_path.endswith('.zip'):
+        log_path = log_path[:-4]
+    return [sidecar_path(log_path)
+            for sidecar_path in renamed_sidecars() + copied_sidecars()]
 
 
 def zip_logs(directory='.', file_extension='.n2k'):
@@ -88,7 +129,9 @@ def send_to_usb(pi_directory='.', file_extension='.n2k'):
 
     All files from the pi directory matching the file_extension are copied to
     the USB storage.  If the copy is successful the files are deleted from the
-    Pi.
+    Pi.  The sidecars of each log file, see sidecar_paths, go with it so the
+    devices, source selections and transport messages of a log can still be
+    looked up.
     The USB drive is expected to be mounted at the location specified in the
     environment variable USBDRIVE.  If the drive is not mounted an error is
     logged.
@@ -138,6 +181,16 @@ def send_to_usb(pi_directory='.', file_extension='.n2k'):
             except OSError:
                 failed += 1
                 logger.warning(f'Moving {pi_file} to USB: FAIL')
+                continue
+            for sidecar in sidecar_paths(pi_file):
+                if not os.path.exists(f'{pi_directory}/{sidecar}'):
+                    continue
+                try:
+                    shutil.move(f'{pi_directory}/{sidecar}',
+                                f'{usb_directory}/{sidecar}')
+                    logger.info(f'Moving {sidecar} to USB: SUCCESS')
+                except OSError:
+                    logger.warning(f'Moving {sidecar} to USB: FAIL')
 
     if not found:
         logger.info(f'No files ending with {file_extension}')
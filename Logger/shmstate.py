@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 13:40:27 2026
+
+@author: wmorland
+
+Publish the live state of the logger to other processes in shared memory.
+
+The logger writes the latest value of each livestate channel and a few
+counters into a multiprocessing.shared_memory block.  Other processes on the
+Pi, a dashboard or power-monitor, can read it without opening a CAN socket or
+parsing the log files.
+
+There is only ever one writer.  Readers never take a lock, instead the block
+has a seqlock style sequence number.  The writer makes it odd before changing
+anything and even again afterwards, a reader copies the block and tries again
+if the sequence was odd or changed while it was copying.
+
+Block layout, little endian:
+
+    offset 0    4s magic b'RKRS', u16 layout version, u16 number of channels
+    offset 8    u64 sequence
+    offset 16   f64 time of last update, u64 frames received, u32 logger pid,
+                u32 rollovers
+    offset 40   per channel f64 time, f64 value.  NaN time means no data yet.
+    after that  per channel 32 byte channel name, NUL padded
+"""
+
+import os
+import math
+import time
+import struct
+from multiprocessing import shared_memory, resource_tracker
+import livestate
+
+DEFAULT_NAME = 'rkr-logger'
+MAGIC = b'RKRS'
+VERSION = 1
+PREFIX = struct.Struct('<4sHH')
+SEQUENCE = struct.Struct('<Q')
+COUNTERS = struct.Struct('<dQII')
+SAMPLE = struct.Struct('<dd')
+NAME = struct.Struct('32s')
+SEQUENCE_OFFSET = PREFIX.size
+COUNTERS_OFFSET = SEQUENCE_OFFSET + SEQUENCE.size
+CHANNELS_OFFSET = COUNTERS_OFFSET + COUNTERS.size
+
+
+def block_size(channels):
+    """Size in bytes of the block for a number of channels."""
+    return CHANNELS_OFFSET + channels * (SAMPLE.size + NAME.size)
+
+
+class SharedStatePublisher:
+    """
+    Writes the live state into shared memory.
+
+    A publisher is callable with a can.Message, like a LiveState, so it can be
+    given to nmea.capture_can_messages after the LiveState.  It counts frames
+    and copies the latest values out at most every interval seconds.
+
+    Parameters
+    ----------
+    state : livestate.LiveState
+    name : str, optional
+        Name of the shared memory block.  The default is 'rkr-logger'.
+    interval : float, optional
+        Seconds between updates.  The default is 0.1.
+    rotating_logger : cannew.BaseRotatingLogger, optional
+        Its rollover_count is published.
+    """
+
+    def __init__(self, state, name=DEFAULT_NAME, interval=0.1,
+                 rotating_logger=None):
+        self.state = state
+        self.interval = interval
+        self.rotating_logger = rotating_logger
+        self.names = list(state.buffers)
+        self.buffers = [state.buffers[name] for name in self.names]
+        size = block_size(len(self.names))
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=size)
+        except FileExistsError:
+            # Left behind by a logger that did not shut down cleanly.
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=size)
+        self.buf = self.shm.buf
+        self.sequence = 0
+        self.frames = 0
+        self.next_update = 0.0
+
+        PREFIX.pack_into(self.buf, 0, MAGIC, VERSION, len(self.names))
+        names_offset = CHANNELS_OFFSET + len(self.names) * SAMPLE.size
+        for i, channel in enumerate(self.names):
+            NAME.pack_into(self.buf, names_offset + i * NAME.size,
+                           channel.encode('ascii'))
+        self.publish()
+
+    def __call__(self, msg):
+        self.frames += 1
+        if msg.timestamp >= self.next_update:
+            self.next_update = msg.timestamp + self.interval
+            self.publish()
+
+    def publish(self):
+        """Copy the latest values and counters into shared memory."""
+        buf = self.buf
+        rollovers = (self.rotating_logger.rollover_count
+                     if self.rotating_logger is not None else 0)
+        self.sequence += 1
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, self.sequence)
+        COUNTERS.pack_into(buf, COUNTERS_OFFSET, time.time(), self.frames,
+                           os.getpid(), rollovers)
+        offset = CHANNELS_OFFSET
+        for buffer in self.buffers:
+            latest = buffer.latest()
+            if latest is None:
+                SAMPLE.pack_into(buf, offset, math.nan, math.nan)
+            else:
+                SAMPLE.pack_into(buf, offset, *latest)
+            offset += SAMPLE.size
+        self.sequence += 1
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, self.sequence)
+
+    def close(self):
+        """Remove the shared memory block."""
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedStateReader:
+    """
+    Reads the live state published by the logger.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the shared memory block.  The default is 'rkr-logger'.
+
+    Raises
+    ------
+    FileNotFoundError
+        The logger is not running.
+    ValueError
+        The block is not in a layout this reader understands.
+    """
+
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = shared_memory.SharedMemory(name=name)
+        # Only the logger should remove the block.  Before Python 3.13 the
+        # resource tracker would unlink it when this process exits.
+        try:
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        except Exception:
+            pass
+        magic, version, count = PREFIX.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f'Shared memory {name} is not RKR live state')
+        self.count = count
+        self.samples = struct.Struct(f'<{2 * count}d')
+        names_offset = CHANNELS_OFFSET + count * SAMPLE.size
+        self.names = [NAME.unpack_from(self.shm.buf,
+                                       names_offset + i * NAME.size)[0]
+                      .rstrip(b'\0').decode('ascii') for i in range(count)]
+        self.copy = bytearray(names_offset)
+
+    def read(self, retries=100):
+        """
+        Return a consistent copy of the published state.
+
+        Parameters
+        ----------
+        retries : int, optional
+            Attempts before giving up if the writer keeps changing the block.
+            The default is 100.
+
+        Returns
+        -------
+        dict or None
+            'updated', 'frames', 'pid', 'rollovers' and 'channels', a dict of
+            channel name to (time, value) for channels with data.  None if a
+            consistent copy could not be made.
+
+        """
+        buf = self.shm.buf
+        size = len(self.copy)
+        for _ in range(retries):
+            before = SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0]
+            if before & 1:
+                time.sleep(0)
+                continue
+            self.copy[:] = buf[:size]
+            after = SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0]
+            if before == after:
+                break
+        else:
+            return None
+        updated, frames, pid, rollovers = COUNTERS.unpack_from(
+            self.copy, COUNTERS_OFFSET)
+        values = self.samples.unpack_from(self.copy, CHANNELS_OFFSET)
+        channels = {name: (values[2 * i], values[2 * i + 1])
+                    for i, name in enumerate(self.names)
+                    if not math.isnan(values[2 * i])}
+        return {'updated': updated, 'frames': frames, 'pid': pid,
+                'rollovers': rollovers, 'channels': channels}
+
+    def close(self):
+        """Detach from the shared memory block."""
+        self.shm.close()
+
+
+def read_state(name=DEFAULT_NAME):
+    """
+    Read the published state once.
+
+    Returns
+    -------
+    dict or None
+        See SharedStateReader.read.  None if the logger is not running.
+
+    """
+    try:
+        reader = SharedStateReader(name)
+    except FileNotFoundError:
+        return None
+    try:
+        return reader.read()
+    finally:
+        reader.close()
+
+
+def new_publisher(name=DEFAULT_NAME, rotating_logger=None, **kwargs):
+    """Return a LiveState and a SharedStatePublisher for it."""
+    state = livestate.LiveState(**kwargs)
+    return state, SharedStatePublisher(state, name,
+                                       rotating_logger=rotating_logger)
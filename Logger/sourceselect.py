@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Nov  2 09:26:40 2026
+
+@author: wmorland
+
+Pick the best source for each channel of instrument data.
+
+Several PGNs arrive from more than one source, speed from 11 and 12, wind
+from 12, 16 and 17, rudder from 1 and 15.  A channel is a PGN, split by
+instance or wind reference where the sources may be measuring different
+things.  Every source on a channel is scored continuously from streaming
+statistics that cost the same for each frame however long the log:
+
+* rate          exponentially weighted mean interval, against the fastest
+                source on the channel
+* jitter        exponentially weighted mean absolute deviation of the
+                interval
+* dropout       no frame for dropout times the mean interval scores zero
+* plausibility  exponentially weighted fraction of frames whose main value
+                is available and within limits, decoded with n2kcodec
+
+One source is the primary.  Another takes over at once when the primary
+scores zero, because it dropped out or sends nothing plausible, or when it
+has scored more than hysteresis better for hold seconds, so two similar
+sources do not flap.  Every change is recorded with its reason.
+
+Live, capture_can_messages gives listeners only the frames of the primary
+sources and appends each change to a foo.sources.jsonl sidecar, started
+afresh by each capture and copied to each log file at rollover so every log
+has the choices in effect for it.  In batch,
+select_pgns filters the output of n2klog.decode_log the same way.
+"""
+
+import os
+import json
+from collections import namedtuple
+import n2klog
+import pgnregistry
+
+# PGNs that arrive from more than one source, see the Logger README
+DEFAULT_PGNS = frozenset((127245, 128259, 130306))
+
+# PGN to (byte, mask) of the instance or reference that splits channels
+CHANNEL_FIELDS = {
+    127245: (0, 0xff),          # rudder instance
+    130306: (5, 0x07),          # wind reference
+    }
+
+# PGN to (field, low, high) of the value checked for plausibility
+LIMITS = {
+    127245: ('position', -0.8, 0.8),
+    128259: ('speedWaterReferenced', 0.0, 25.0),
+    130306: ('windSpeed', 0.0, 60.0),
+    }
+
+Selection = namedtuple('Selection', ['timestamp', 'pgn', 'channel', 'source',
+                                     'previous', 'reason'])
+
+
+class SourceStats:
+    """Streaming statistics for one source on a channel."""
+
+    __slots__ = (
+        'last',
+        'period',
+        'jitter',
+        'plausible',
+        'frames'
+        )
+
+    def __init__(self):
+        self.last = None
+        self.period = None
+        self.jitter = 0.0
+        self.plausible = 1.0
+        self.frames = 0
+
+    def update(self, timestamp, plausible, alpha):
+        if self.last is not None:
+            interval = timestamp - self.last
+            if self.period is None:
+                self.period = interval
+            else:
+                self.jitter += alpha * (abs(interval - self.period)
+                                        - self.jitter)
+                self.period += alpha * (interval - self.period)
+        self.plausible += alpha * ((1.0 if plausible else 0.0)
+                                   - self.plausible)
+        self.last = timestamp
+        self.frames += 1
+
+    def score(self, now, fastest, dropout):
+        """Score from 0 to 1, 0 once the source has dropped out."""
+        period = self.period
+        if not period or now - self.last > dropout * period:
+            return 0.0
+        return (self.plausible * min(1.0, fastest / period)
+                / (1.0 + self.jitter / period))
+
+
+class Channel:
+    """The sources on one channel and the current primary."""
+
+    __slots__ = (
+        'sources',
+        'primary',
+        'candidate',
+        'since',
+        'evaluated'
+        )
+
+    def __init__(self):
+        self.sources = {}
+        self.primary = None
+        self.candidate = None
+        self.since = None
+        self.evaluated = None
+
+
+class SourceSelector:
+    """
+    Choose a primary source per channel with failover.
+
+    Parameters
+    ----------
+    pgns : iterable of int, optional
+        PGNs to select sources for, every other PGN passes through.  The
+        default is DEFAULT_PGNS.
+    on_change : callable, optional
+        Called with each Selection.
+    alpha : float, optional
+        Weight of each new frame in the moving averages.  The default is 0.05.
+    dropout : float, optional
+        Mean intervals without a frame before a source counts as gone.  The
+        default is 5.
+    hysteresis : float, optional
+        How much better another source must score to take over.  The default
+        is 0.2.
+    hold : float, optional
+        Seconds it must stay better.  The default is 2.
+    interval : float, optional
+        Seconds between scoring each channel.  The default is 0.5.
+    registry : pgnregistry.PGNRegistry, optional
+        For decoding the plausibility checks.  The default is the shared one.
+    """
+
+    def __init__(self, pgns=DEFAULT_PGNS, on_change=None, alpha=0.05,
+                 dropout=5.0, hysteresis=0.2, hold=2.0, interval=0.5,
+                 registry=None):
+        self.pgns = frozenset(pgns)
+        self.on_change = on_change
+        self.alpha = alpha
+        self.dropout = dropout
+        self.hysteresis = hysteresis
+        self.hold = hold
+        self.interval = interval
+        registry = pgnregistry.default_registry() if registry is None \
+            else registry
+        self.limits = {}
+        for pgn, (field, low, high) in LIMITS.items():
+            codec = registry.get(pgn) if pgn in self.pgns else None
+            if codec is not None:
+                self.limits[pgn] = (codec, field, low, high)
+        self.channels = {}
+        self.changes = []
+
+    def _plausible(self, pgn, data):
+        limit = self.limits.get(pgn)
+        if limit is None:
+            return True
+        codec, field, low, high = limit
+        value = codec.decode(data).get(field)
+        return value is not None and low <= value <= high
+
+    def _change(self, timestamp, pgn, key, channel, source, reason):
+        selection = Selection(timestamp, pgn, key, source, channel.primary,
+                              reason)
+        channel.primary = source
+        channel.candidate = None
+        self.changes.append(selection)
+        if self.on_change is not None:
+            self.on_change(selection)
+
+    def _evaluate(self, timestamp, pgn, key, channel):
+        channel.evaluated = timestamp
+        periods = [stats.period for stats in channel.sources.values()
+                   if stats.period]
+        if not periods:
+            return
+        fastest = min(periods)
+        scores = {source: stats.score(timestamp, fastest, self.dropout)
+                  for source, stats in channel.sources.items()}
+        best = max(scores, key=scores.get)
+        primary = scores.get(channel.primary, 0.0)
+        if best == channel.primary or not scores[best]:
+            channel.candidate = None
+        elif not primary:
+            self._change(timestamp, pgn, key, channel, best, 'failover')
+        elif scores[best] > primary * (1 + self.hysteresis):
+            if channel.candidate != best:
+                channel.candidate = best
+                channel.since = timestamp
+            elif timestamp - channel.since >= self.hold:
+                self._change(timestamp, pgn, key, channel, best, 'score')
+        else:
+            channel.candidate = None
+
+    def update(self, timestamp, pgn, source, data):
+        """
+        Add a frame.
+
+        Returns
+        -------
+        bool
+            True if the frame is from the primary source of its channel, or
+            its PGN is not selected.
+
+        """
+        if pgn not in self.pgns:
+            return True
+        field = CHANNEL_FIELDS.get(pgn)
+        key = data[field[0]] & field[1] \
+            if field is not None and len(data) > field[0] else None
+        channel = self.channels.get((pgn, key))
+        if channel is None:
+            channel = self.channels[(pgn, key)] = Channel()
+        stats = channel.sources.get(source)
+        if stats is None:
+            stats = channel.sources[source] = SourceStats()
+        stats.update(timestamp, self._plausible(pgn, data), self.alpha)
+        if channel.primary is None:
+            channel.evaluated = timestamp
+            self._change(timestamp, pgn, key, channel, source, 'first')
+        elif timestamp - channel.evaluated >= self.interval:
+            self._evaluate(timestamp, pgn, key, channel)
+        return source == channel.primary
+
+    def __call__(self, msg):
+        """update for a can.Message."""
+        arbitration_id = msg.arbitration_id
+        pf = (arbitration_id >> 16) & 0xff
+        pgn = (arbitration_id >> 8) & (0x3ff00 if pf < 240 else 0x3ffff)
+        return self.update(msg.timestamp, pgn, arbitration_id & 0xff,
+                           msg.data)
+
+    def primaries(self):
+        """(pgn, channel) to the primary source."""
+        return {key: channel.primary
+                for key, channel in self.channels.items()}
+
+
+def selection_log_path(log_path):
+    """Sidecar of source selections for a log file, foo.sources.jsonl."""
+    base = str(log_path)
+    for suffix in ('.zip', '.n2k'):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+    return f'{base}.sources.jsonl'
+
+
+class SelectionLog:
+    """
+    Append each Selection to a JSON lines file.
+
+    Parameters
+    ----------
+    path : str
+    append : bool, optional
+        Keep the selections already in the file.  By default a file left by
+        an earlier capture is removed, as its log is started again.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        if not append and os.path.exists(path):
+            os.remove(path)
+
+    def __call__(self, selection):
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(selection._asdict()) + '\n')
+
+
+def read_selections(log_path):
+    """The Selections recorded for a log file, [] if there are none."""
+    try:
+        with open(selection_log_path(log_path), 'r') as file:
+            return [Selection(**json.loads(line)) for line in file if line]
+    except OSError:
+        return []
+
+
+def select_frames(frames, selector=None):
+    """
+    Keep only the frames of primary sources.
+
+    Parameters
+    ----------
+    frames : iterable
+        (timestamp, priority, pgn, source, destination, data) as from
+        n2klog.read_frames.
+    selector : SourceSelector, optional
+
+    Yields
+    ------
+    tuple
+        The frames from primary sources and of PGNs not selected.
+
+    """
+    if selector is None:
+        selector = SourceSelector()
+    for frame in frames:
+        if selector.update(frame[0], frame[2], frame[3], frame[5]):
+            yield frame
+
+
+def select_pgns(pgns, selector=None):
+    """
+    Filter decoded logs to one source per channel.
+
+    Parameters
+    ----------
+    pgns : dict
+        PGN to n2klog.PGNFrames, as from n2klog.decode_log.
+    selector : SourceSelector, optional
+
+    Returns
+    -------
+    dict
+        PGN to n2klog.PGNFrames holding only frames from primary sources.
+        Selector.changes records the choices.
+
+    """
+    if selector is None:
+        selector = SourceSelector()
+    selected = {}
+    for pgn, frames in pgns.items():
+        if pgn not in selector.pgns:
+            selected[pgn] = frames
+            continue
+        kept = n2klog.PGNFrames(pgn)
+        for i in range(len(frames)):
+            data = frames.frame_data(i)
+            if selector.update(frames.timestamp[i], pgn, frames.source[i],
+                               data):
+                kept.append(frames.timestamp[i], frames.priority[i],
+                            frames.source[i], frames.destination[i], data)
+        selected[pgn] = kept
+    return selected
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 09:42:18 2026
+
+@author: wmorland
+
+One process to run everything the logger needs on the boat.
+
+Before this crontab started power-monitor and the logger, mover and senders
+were separate scripts, each importing everything again and opening its own
+CAN socket, and power-monitor had no way to tell the logger to stop before
+halting the Pi.  The supervisor runs them as asyncio tasks in one process:
+
+* capture       nmea.capture_can_messages in a worker thread
+* power         poll the UPS for loss of external power
+* mover         move logs to USB on SIGUSR1, as move-logs does
+* gps           bridge NMEA 0183 from the Bluetooth GPS onto the bus
+
+Capture feeds a livestate.LiveState published in shared memory, see
+shmstate, so logger-state and other processes can read the latest values.
+
+Tasks share one CAN bus handle and an EventBus.  Any task can ask for
+shutdown, so can SIGTERM and SIGINT.  Loss of external power stops capture
+cleanly, closing the log file, and only then are the logs moved to USB and
+the Pi halted.
+"""
+
+import os
+import signal
+import asyncio
+import logging
+import threading
+import subprocess
+from functools import partial
+
+POWER_LOST = 'power lost'
+
+
+class EventBus:
+    """
+    In process events between supervisor tasks.
+
+    shutdown is set once by the first request_shutdown, reason says why.
+    Other events are published by topic to every subscriber's queue.
+    """
+
+    def __init__(self):
+        self.shutdown = asyncio.Event()
+        self.reason = None
+        self.subscribers = {}
+
+    def request_shutdown(self, reason):
+        """Ask every task to stop."""
+        if not self.shutdown.is_set():
+            logging.getLogger('supervisor').info(f'Shutdown: {reason}')
+            self.reason = reason
+            self.shutdown.set()
+
+    def subscribe(self, topic):
+        """Return a queue that receives every payload published to topic."""
+        queue = asyncio.Queue()
+        self.subscribers.setdefault(topic, []).append(queue)
+        return queue
+
+    def publish(self, topic, payload=None):
+        """Send payload to every subscriber of topic."""
+        for queue in self.subscribers.get(topic, ()):
+            queue.put_nowait(payload)
+
+
+class Supervisor:
+    """
+    Run tasks until one of them, or a signal, asks for shutdown.
+
+    Tasks are coroutine functions called with the supervisor.  They should
+    return when supervisor.events.shutdown is set, any still running are
+    cancelled after grace seconds.
+
+    Parameters
+    ----------
+    bus : can.BusABC, optional
+        The CAN bus shared by all tasks.
+    grace : float, optional
+        Seconds to wait for tasks to finish after shutdown.  The default is 10.
+    """
+
+    def __init__(self, bus=None, grace=10.0):
+        self.bus = bus
+        self.grace = grace
+        self.events = None
+        self.telemetry = None
+        self.live_state = None
+        self.listeners = []
+        self.tasks = []
+
+    def add(self, name, task):
+        """Add a coroutine function to run as a named task."""
+        self.tasks.append((name, task))
+
+    async def wait_shutdown(self, timeout):
+        """Wait up to timeout seconds, return True if shutdown was asked."""
+        try:
+            await asyncio.wait_for(self.events.shutdown.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _guard(self, name, task):
+        logger = logging.getLogger('supervisor')
+        try:
+            await task(self)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f'Task {name}: FAIL')
+            self.events.request_shutdown(f'{name} failed')
+
+    async def run(self, handle_signals=True):
+        """
+        Run every task.
+
+        Returns
+        -------
+        str
+            The reason for shutdown.
+
+        """
+        logger = logging.getLogger('supervisor')
+        self.events = EventBus()
+        if not self.tasks:
+            return None
+        loop = asyncio.get_running_loop()
+        if handle_signals:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(signum, self.events.request_shutdown,
+                                        signal.Signals(signum).name)
+            loop.add_signal_handler(signal.SIGUSR1, self.events.publish,
+                                    'move-logs')
+        running = [asyncio.ensure_future(self._guard(name, task))
+                   for name, task in self.tasks]
+        logger.info(f'Running {", ".join(name for name, _ in self.tasks)}')
+
+        finished = asyncio.ensure_future(asyncio.wait(running))
+        shutdown = asyncio.ensure_future(self.events.shutdown.wait())
+        await asyncio.wait([finished, shutdown],
+                           return_when=asyncio.FIRST_COMPLETED)
+        self.events.request_shutdown('all tasks finished')
+        shutdown.cancel()
+        _, pending = await asyncio.wait(running, timeout=self.grace)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+        finished.cancel()
+
+        if handle_signals:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1):
+                loop.remove_signal_handler(signum)
+        return self.events.reason
+
+
+def capture_task(capture=None, **kwargs):
+    """
+    Task running the capture loop on the shared bus in a worker thread.
+
+    Every message received is also given to supervisor.listeners, which
+    other tasks can add to.
+
+    Parameters
+    ----------
+    capture : callable, optional
+        The default is nmea.capture_can_messages.  Called with the bus, a
+        threading.Event to stop it, listeners and kwargs.
+    """
+    async def capture_can(supervisor):
+        nonlocal capture
+        if capture is None:
+            import nmea
+            capture = nmea.capture_can_messages
+        stop = threading.Event()
+        loop = asyncio.get_running_loop()
+        worker = loop.run_in_executor(
+            None, lambda: capture(supervisor.bus, stop=stop,
+                                  listeners=supervisor.listeners, **kwargs))
+        shutdown = asyncio.ensure_future(supervisor.events.shutdown.wait())
+        await asyncio.wait([worker, shutdown],
+                           return_when=asyncio.FIRST_COMPLETED)
+        stop.set()
+        shutdown.cancel()
+        await worker
+        supervisor.events.request_shutdown('capture stopped')
+    return capture_can
+
+
+def publish_live_state(supervisor, name=None, **kwargs):
+    """
+    Host a livestate.LiveState fed by capture and publish it.
+
+    The LiveState and a shmstate.SharedStatePublisher are added to
+    supervisor.listeners.  Close the publisher once capture has stopped to
+    remove the shared memory block.  Set its rotating_logger to publish the
+    rollover count of the capture log.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the shared memory block.  The default is
+        shmstate.DEFAULT_NAME.
+    **kwargs
+        Passed to livestate.LiveState.
+
+    Returns
+    -------
+    shmstate.SharedStatePublisher
+
+    """
+    import shmstate
+    state, publisher = shmstate.new_publisher(
+        shmstate.DEFAULT_NAME if name is None else name, **kwargs)
+    supervisor.live_state = state
+    supervisor.listeners.extend((state, publisher))
+    return publisher
+
+
+def power_task(ups=None, interval=5.0, telemetry_interval=30.0):
+    """
+    Task watching the UPS for loss of external power.
+
+    Battery voltage and charge are sampled by ups_telemetry.UPSTelemetry
+    every telemetry_interval seconds, only the external power pin is checked
+    every interval seconds.  The telemetry is left in supervisor.telemetry.
+
+    Parameters
+    ----------
+    ups : ups_lite.UPS, optional
+        Created when the task starts if not given.
+    interval : float, optional
+        Seconds between checks.  The default is 5.
+    telemetry_interval : float, optional
+        Seconds between battery readings.  The default is 30.
+    """
+    async def power(supervisor):
+        nonlocal ups
+        import ups_telemetry
+        logger = logging.getLogger('supervisor')
+        loop = asyncio.get_running_loop()
+        if ups is None:
+            import ups_lite
+            ups = await loop.run_in_executor(None, ups_lite.UPS)
+        telemetry = ups_telemetry.UPSTelemetry(ups, telemetry_interval)
+        supervisor.telemetry = telemetry
+        await loop.run_in_executor(None, telemetry.start)
+        logger.info(f'UPS Voltage: {telemetry.latest.voltage:1.2f}')
+        logger.info(f'UPS Capacity: {int(telemetry.latest.capacity):03d}%')
+        try:
+            while not await supervisor.wait_shutdown(interval):
+                if not await loop.run_in_executor(None, ups.external_power):
+                    logger.info('External power disconnected.')
+                    latest = await loop.run_in_executor(None,
+                                                        telemetry.sample)
+                    logger.info(f'UPS Voltage: {latest.voltage:1.2f}')
+                    logger.info(f'UPS Capacity: {int(latest.capacity):03d}%')
+                    supervisor.events.publish('power', False)
+                    supervisor.events.request_shutdown(POWER_LOST)
+                    return
+        finally:
+            telemetry.stop()
+    return power
+
+
+def mover_task(directory=None, file_extension='.n2k'):
+    """
+    Task moving logs to USB each time a move-logs event is published.
+
+    The supervisor publishes move-logs on SIGUSR1.
+    """
+    async def mover(supervisor):
+        import rkrutils
+        requests = supervisor.events.subscribe('move-logs')
+        loop = asyncio.get_running_loop()
+        while True:
+            request = asyncio.ensure_future(requests.get())
+            shutdown = asyncio.ensure_future(supervisor.events.shutdown.wait())
+            await asyncio.wait([request, shutdown],
+                               return_when=asyncio.FIRST_COMPLETED)
+            if shutdown.done():
+                request.cancel()
+                return
+            shutdown.cancel()
+            log_directory = (os.getenv('NMEALOGS') if directory is None
+                             else directory)
+            await loop.run_in_executor(None, rkrutils.send_to_usb,
+                                       log_directory, file_extension)
+    return mover
+
+
+def gps_task(port='/dev/rfcomm0', baudrate=9600, name=None):
+    """
+    Task bridging NMEA 0183 from a serial GPS onto the shared bus.
+
+    See gpsbridge.GPSBridge.  The serial reader runs in a worker thread.  An
+    address is claimed first and the claimer is added to the supervisor
+    listeners so it can defend the address.
+
+    Parameters
+    ----------
+    name : int, optional
+        Our NAME.  The default is made from the Pi serial number.
+    """
+    async def gps(supervisor):
+        import serial
+        import nmea
+        import replay
+        import gpsbridge
+        import addressclaim
+        sender = replay.bus_sender(supervisor.bus)
+        claimer = addressclaim.AddressClaimer(
+            addressclaim.make_name(nmea.pi_serial_number())
+            if name is None else name, sender)
+        claimer.start()
+        supervisor.listeners.append(claimer)
+        bridge = gpsbridge.GPSBridge(sender, claimer.address,
+                                     claimer=claimer)
+        stop = threading.Event()
+        loop = asyncio.get_running_loop()
+        with serial.Serial(port=port, baudrate=baudrate,
+                           timeout=0.01) as ser:
+            worker = loop.run_in_executor(None, gpsbridge.run_serial, ser,
+                                          bridge, stop)
+            shutdown = asyncio.ensure_future(
+                supervisor.events.shutdown.wait())
+            await asyncio.wait([worker, shutdown],
+                               return_when=asyncio.FIRST_COMPLETED)
+            stop.set()
+            shutdown.cancel()
+            await worker
+    return gps
+
+
+def after_power_loss(telemetry=None):
+    """Move the logs to USB and halt the Pi, as power-monitor did."""
+    import rkrutils
+    logger = logging.getLogger('supervisor')
+    if telemetry is not None:
+        budget = telemetry.time_to_empty()
+        if budget is not None:
+            logger.info(f'Battery time to empty: {budget:1.0f}s')
+    nmea_log_directory = os.getenv('NMEALOGS')
+    logger.info(f'Move NMEA 2000 logs from {nmea_log_directory} to USB drive')
+    rkrutils.send_to_usb(nmea_log_directory, '.n2k')
+    logger.info('Starting shutdown process.')
+    try:
+        subprocess.run('halt', check=True)
+    except subprocess.CalledProcessError as process_error:
+        rc = process_error.returncode
+        logger.error(f'Shutdown failed. return code = {rc}')
+        return rc
+    logger.info('Shutdown process started successfully.')
+    return 0
+
+
+def main(capture=True, power=True, gps_port=None, channels=None,
+         split_channels=False):
+    """
+    Run the supervisor until shutdown.
+
+    Parameters
+    ----------
+    channels : sequence of str, optional
+        CAN interfaces to capture, merged in time order, see
+        nmea.start_can_buses.  The default is can0.
+    split_channels : bool, optional
+        Log each channel to its own files.
+
+    Returns
+    -------
+    int
+        Exit status.
+
+    """
+    logger = logging.getLogger('supervisor')
+    logger.info('*** supervisor ***')
+    supervisor = Supervisor()
+    publisher = None
+    # Capture and the GPS bridge share the bus, open it for either
+    if capture or gps_port:
+        import nmea
+        supervisor.bus = nmea.start_can_buses(channels or
+                                              (nmea.CAN_CHANNEL,))
+        if supervisor.bus is None:
+            logger.error('CAN bus: FAIL')
+            return 1
+    if capture:
+        log_directory = os.getenv('NMEALOGS')
+        if log_directory:
+            os.chdir(log_directory)
+        publisher = publish_live_state(supervisor)
+        supervisor.add('capture', capture_task(
+            split_channels=split_channels,
+            on_logger=partial(setattr, publisher, 'rotating_logger')))
+    if power:
+        supervisor.add('power', power_task())
+    supervisor.add('mover', mover_task())
+    if gps_port:
+        supervisor.add('gps', gps_task(gps_port))
+
+    try:
+        reason = asyncio.run(supervisor.run())
+    finally:
+        if publisher is not None:
+            publisher.close()
+        if not capture and supervisor.bus is not None:
+            # Capture shuts the bus down itself, the GPS bridge does not
+            supervisor.bus.shutdown()
+    logger.info('*** supervisor ***')
+    if reason == POWER_LOST:
+        return after_power_loss(supervisor.telemetry)
+    return 0
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 11:16:08 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+import tempfile
+import addressclaim
+import n2klog
+
+OURS = addressclaim.make_name(0x1234)
+LOWER = addressclaim.make_name(0x0001)     # higher priority than ours
+HIGHER = addressclaim.make_name(0x1fffff)  # lower priority than ours
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def claim_id(source):
+    return n2klog.arbitration_id(6, addressclaim.ADDRESS_CLAIM, source)
+
+
+class TestAddressClaimer(unittest.TestCase):
+    """Test cases for AddressClaimer."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'address.json')
+        self.clock = FakeClock()
+        self.sent = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def claimer(self, name=OURS):
+        return addressclaim.AddressClaimer(
+            name, lambda t, i, d: self.sent.append((i, d)), path=self.path,
+            clock=self.clock)
+
+    def test_claim_and_persist(self):
+        """An uncontested claim succeeds after 250ms and is reused."""
+        claimer = self.claimer()
+        claimer.start()
+        self.assertEqual(self.sent, [(claim_id(128),
+                                      OURS.to_bytes(8, 'little'))],
+                         msg='Expect a claim of the preferred address.')
+        self.assertIsNone(claimer.poll(), msg='Not ours for 250ms.')
+        self.clock.now += 0.25
+        self.assertEqual(claimer.poll(), 128, msg='Expect 128 claimed.')
+
+        claimer.on_message(claim_id(128), LOWER.to_bytes(8, 'little'))
+        self.assertEqual(claimer.address, 129, msg='Lost 128, try 129.')
+        self.clock.now += 0.25
+        self.assertEqual(claimer.poll(), 129, msg='Expect 129 claimed.')
+
+        again = self.claimer()
+        again.start()
+        self.assertEqual(again.address, 129,
+                         msg='The saved address is claimed first.')
+
+    def test_defend(self):
+        """A claim from a lower priority NAME is answered with ours."""
+        claimer = self.claimer()
+        claimer.start()
+        self.sent.clear()
+        claimer.on_message(claim_id(128), HIGHER.to_bytes(8, 'little'))
+        self.assertEqual(self.sent, [(claim_id(128),
+                                      OURS.to_bytes(8, 'little'))],
+                         msg='Expect our claim repeated.')
+        self.assertEqual(claimer.address, 128, msg='We keep the address.')
+
+    def test_request(self):
+        """A request for address claimed is answered."""
+        claimer = self.claimer()
+        claimer.start()
+        self.clock.now += 0.25
+        claimer.poll()
+        self.sent.clear()
+        request = n2klog.arbitration_id(6, addressclaim.REQUEST, 20, 255)
+        claimer.on_message(request, (60928).to_bytes(3, 'little'))
+        self.assertEqual(self.sent, [(claim_id(128),
+                                      OURS.to_bytes(8, 'little'))],
+                         msg='Expect our claim sent.')
+
+    def test_cannot_claim(self):
+        """Without arbitrary addressing a lost address cannot be replaced."""
+        name = addressclaim.make_name(0x1234, arbitrary=False)
+        claimer = self.claimer(name)
+        claimer.start()
+        lower = addressclaim.make_name(0x0001, arbitrary=False)
+        claimer.on_message(claim_id(128), lower.to_bytes(8, 'little'))
+        self.assertEqual(claimer.state, addressclaim.CANNOT_CLAIM,
+                         msg='Expect cannot claim.')
+        self.assertEqual(self.sent[-1][0], claim_id(addressclaim.NULL),
+                         msg='Cannot claim comes from the NULL address.')
+        self.clock.now += 1
+        self.assertIsNone(claimer.poll(), msg='No address.')
+
+
+class TestName(unittest.TestCase):
+    """Test cases for make_name and parse_name."""
+
+    def test_round_trip(self):
+        """parse_name gives back the fields make_name was given."""
+        fields = {'identity': 0x1234, 'manufacturer': 135,
+                  'device_instance': 2, 'function': 140, 'device_class': 85,
+                  'system_instance': 1, 'industry_group': 4,
+                  'arbitrary': True}
+        self.assertEqual(addressclaim.parse_name(
+            addressclaim.make_name(**fields)), fields,
+            msg='Expect the same fields.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Nov  3 11:02:37 2026
+
+@author: wmorland
+"""
+
+import os
+import socket
+import tempfile
+import unittest
+import canif
+
+VCAN = os.getenv('N2KVCAN', 'vcan0')
+
+
+def can_link(state=0, bitrate=250000, tec=0, rec=0, bus_off=0, restarts=0,
+             rx_over_errors=0, up=True):
+    """RTM_NEWLINK payload for a CAN interface, as the kernel sends it."""
+    stats = [0] * len(canif.STATISTICS)
+    stats[canif.STATISTICS.index('rx_packets')] = 1000
+    stats[canif.STATISTICS.index('rx_over_errors')] = rx_over_errors
+    data = (canif.attribute(canif.IFLA_CAN_BITTIMING,
+                            canif.BITTIMING.pack(bitrate, 875, 250, 6, 7, 2,
+                                                 1, 1))
+            + canif.attribute(canif.IFLA_CAN_STATE, canif.U32.pack(state))
+            + canif.attribute(canif.IFLA_CAN_RESTART_MS, canif.U32.pack(100))
+            + canif.attribute(canif.IFLA_CAN_BERR_COUNTER,
+                              canif.BERR_COUNTER.pack(tec, rec)))
+    info = (canif.attribute(canif.IFLA_INFO_KIND, b'can\0')
+            + canif.attribute(canif.IFLA_INFO_DATA | 0x8000, data)
+            + canif.attribute(canif.IFLA_INFO_XSTATS, canif.DEVICE_STATS.pack(
+                0, 0, 0, bus_off, 0, restarts)))
+    flags = canif.IFF_UP | canif.IFF_RUNNING if up else 0
+    return (canif.IFINFOMSG.pack(socket.AF_UNSPEC, 280, 3, flags, 0)
+            + canif.attribute(canif.IFLA_IFNAME, b'can0\0')
+            + canif.attribute(canif.IFLA_STATS64, canif.STATS64.pack(*stats))
+            + canif.attribute(canif.IFLA_LINKINFO | 0x8000, info))
+
+
+class FakeInterface:
+    """CANInterface answering from a list of link payloads."""
+
+    def __init__(self, links, restart_fails=False):
+        self.name = 'can0'
+        self.links = list(links)
+        self.restart_fails = restart_fails
+        self.calls = []
+
+    def health(self):
+        if not self.links:
+            raise OSError(19, 'No such device')
+        link = self.links.pop(0) if len(self.links) > 1 else self.links[0]
+        return canif.Health(0.0, **canif.parse_link(link))
+
+    def restart(self):
+        self.calls.append('restart')
+        if self.restart_fails:
+            raise OSError(16, 'Device or resource busy')
+
+    def set_up(self, up=True):
+        self.calls.append('up' if up else 'down')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestParseLink(unittest.TestCase):
+    """Test cases for parse_link."""
+
+    def test_can(self):
+        """Bitrate, state, error counters and statistics are decoded."""
+        fields = canif.parse_link(can_link(state=2, tec=130, rec=5,
+                                           bus_off=1, restarts=1,
+                                           rx_over_errors=3))
+        self.assertEqual(fields['name'], 'can0', msg='Interface name.')
+        self.assertEqual(fields['kind'], 'can', msg='Link kind.')
+        self.assertEqual(fields['bitrate'], 250000, msg='Bitrate.')
+        self.assertEqual(fields['state'], 'ERROR-PASSIVE',
+                         msg='Controller state.')
+        self.assertEqual((fields['tec'], fields['rec']), (130, 5),
+                         msg='Error counters.')
+        self.assertEqual((fields['bus_off'], fields['restarts']), (1, 1),
+                         msg='CAN device statistics.')
+        self.assertEqual((fields['rx_packets'], fields['rx_over_errors']),
+                         (1000, 3), msg='Interface statistics.')
+        self.assertTrue(fields['up'] and fields['running'],
+                        msg='Link flags.')
+
+    def test_not_can(self):
+        """A link with no CAN data leaves the CAN fields None."""
+        fields = canif.parse_link(canif.IFINFOMSG.pack(0, 772, 1, 0x9, 0))
+        self.assertIsNone(fields['state'], msg='No state.')
+        self.assertIsNone(fields['bitrate'], msg='No bitrate.')
+        self.assertTrue(fields['up'], msg='Up from the flags.')
+        self.assertFalse(fields['running'], msg='Not running.')
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_NETLINK')
+                     and os.path.exists('/sys/class/net/lo'),
+                     'needs Linux netlink')
+class TestNetlink(unittest.TestCase):
+    """Test cases for CANInterface against the kernel."""
+
+    def test_loopback(self):
+        """The loopback link is up, with statistics."""
+        interface = canif.CANInterface('lo')
+        health = interface.health()
+        interface.close()
+        self.assertEqual(health.name, 'lo', msg='Name from the kernel.')
+        self.assertTrue(health.up and health.running,
+                        msg='Loopback is running.')
+        self.assertIsNotNone(health.rx_packets, msg='Statistics read.')
+        self.assertIsNone(health.state, msg='No CAN state.')
+
+    def test_no_device(self):
+        """A missing interface raises OSError."""
+        interface = canif.CANInterface('nosuchcan9')
+        with self.assertRaises(OSError, msg='ENODEV from the kernel.'):
+            interface.health()
+        interface.close()
+
+
+@unittest.skipUnless(os.path.exists(f'/sys/class/net/{VCAN}'),
+                     f'needs {VCAN}, ip link add dev {VCAN} type vcan')
+class TestVCAN(unittest.TestCase):
+    """Test cases for CANInterface on a virtual CAN interface."""
+
+    def setUp(self):
+        self.interface = canif.CANInterface(VCAN)
+
+    def tearDown(self):
+        self.interface.close()
+
+    def test_health(self):
+        """A vcan link has no controller state."""
+        health = self.interface.health()
+        self.assertEqual(health.kind, 'vcan', msg='Link kind.')
+        self.assertIsNone(health.state, msg='No controller.')
+
+    @unittest.skipUnless(hasattr(os, 'geteuid') and os.geteuid() == 0,
+                         'needs CAP_NET_ADMIN')
+    def test_down_up(self):
+        """The link is taken down and up."""
+        self.interface.set_up(False)
+        self.assertFalse(self.interface.health().up, msg='Link down.')
+        self.interface.set_up(True)
+        self.assertTrue(self.interface.is_running(), msg='Link running.')
+
+
+class TestSysfs(unittest.TestCase):
+    """Test cases for reading sysfs when there is no netlink."""
+
+    def test_read(self):
+        """Flags, operational state and statistics are read."""
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, 'can0', 'statistics'))
+            for name, value in (('flags', '0x40081'), ('operstate', 'up'),
+                                ('statistics/rx_packets', '42'),
+                                ('statistics/rx_over_errors', '2')):
+                with open(os.path.join(directory, 'can0', name), 'w') as file:
+                    file.write(value + '\n')
+            interface = canif.CANInterface('can0', sysfs=directory)
+            interface.netlink = False
+            health = interface.health()
+        self.assertTrue(health.up and health.running, msg='Link running.')
+        self.assertEqual(health.rx_packets, 42, msg='Statistics read.')
+        self.assertEqual(canif.overruns(health), 2, msg='Overruns read.')
+        self.assertIsNone(health.rx_errors, msg='Missing files are None.')
+
+
+class TestHealthMonitor(unittest.TestCase):
+    """Test cases for HealthMonitor."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_states_logged(self):
+        """Changes of state and overruns are logged."""
+        interface = FakeInterface([can_link(), can_link(state=2),
+                                   can_link(state=2, rx_over_errors=4)])
+        monitor = canif.HealthMonitor(interface, clock=self.clock)
+        monitor.poll()
+        with self.assertLogs('canif', level='WARNING') as logs:
+            self.clock.now = 1.0
+            monitor.poll()
+            self.clock.now = 2.0
+            monitor.poll()
+        self.assertEqual(logs.output,
+                         ['WARNING:canif:can0 state ERROR-ACTIVE to '
+                          'ERROR-PASSIVE',
+                          'WARNING:canif:can0 rx overruns: 4'],
+                         msg='State change and overruns.')
+
+    def test_interval(self):
+        """The interface is only read once per interval."""
+        interface = FakeInterface([can_link(), can_link(state=3)])
+        monitor = canif.HealthMonitor(interface, interval=1.0,
+                                      clock=self.clock)
+        monitor.poll()
+        self.clock.now = 0.5
+        self.assertEqual(monitor.poll().state, 'ERROR-ACTIVE',
+                         msg='Not due, the latest health is kept.')
+
+    def test_bus_off_recovery(self):
+        """Bus-off for restart_after seconds restarts the controller."""
+        interface = FakeInterface([can_link(state=3)])
+        monitor = canif.HealthMonitor(interface, restart_after=2.0,
+                                      clock=self.clock)
+        for now in (0.0, 1.0):
+            self.clock.now = now
+            monitor.poll()
+        self.assertEqual(interface.calls, [],
+                         msg='Give the kernel time to restart first.')
+        self.clock.now = 2.0
+        monitor.poll()
+        self.assertEqual(interface.calls, ['restart'], msg='Restarted.')
+        self.assertEqual(monitor.recoveries, 1, msg='Recovery counted.')
+        self.clock.now = 3.0
+        monitor.poll()
+        self.assertEqual(interface.calls, ['restart'],
+                         msg='Wait again before the next restart.')
+
+    def test_down_up(self):
+        """If restart fails the link is taken down and up."""
+        interface = FakeInterface([can_link(state=3)], restart_fails=True)
+        monitor = canif.HealthMonitor(interface, restart_after=0.0,
+                                      clock=self.clock)
+        monitor.poll()
+        self.clock.now = 1.0
+        with self.assertLogs('canif', level='WARNING'):
+            monitor.poll()
+        self.assertEqual(interface.calls, ['restart', 'down', 'up'],
+                         msg='Down and up after the restart failed.')
+
+    def test_no_interface(self):
+        """A missing interface is logged once and polls return None."""
+        interface = FakeInterface([])
+        monitor = canif.HealthMonitor(interface, clock=self.clock)
+        with self.assertLogs('canif', level='WARNING') as logs:
+            self.assertIsNone(monitor.poll(), msg='No health.')
+            self.clock.now = 1.0
+            monitor.poll()
+        self.assertEqual(len(logs.output), 1, msg='Logged once.')
+        self.assertIsNone(monitor.snapshot(), msg='No snapshot.')
+
+    def test_monitor_bus(self):
+        """Only SocketCAN buses are monitored."""
+
+        class Bus:
+            channel_info = "socketcan channel 'can1'"
+            channel = 'can1'
+
+        monitor = canif.monitor_bus(Bus())
+        self.assertEqual(monitor.interface.name, 'can1', msg='The channel.')
+        self.assertIsNone(canif.monitor_bus(object()),
+                          msg='No monitor for other buses.')
+
+    def test_monitor_merged_bus(self):
+        """Every SocketCAN interface of a merged bus is monitored."""
+
+        class Bus:
+            def __init__(self, channel):
+                self.channel = channel
+                self.channel_info = f"socketcan channel '{channel}'"
+
+        class Merged:
+            buses = {'can0': Bus('can0'), 'can1': Bus('can1'),
+                     'virtual': object()}
+
+        group = canif.monitor_bus(Merged())
+        self.assertEqual(list(group.monitors), ['can0', 'can1'],
+                         msg='A monitor per SocketCAN interface.')
+
+
+if __name__ == '__main__':
+    unittest.main()
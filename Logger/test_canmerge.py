@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Nov  4 11:40:19 2026
+
+@author: wmorland
+"""
+
+import os
+import time
+import tempfile
+import unittest
+from types import SimpleNamespace
+import canmerge
+
+LOG = """timestamp,priority,pgn,source,destination,dlc,data
+2020-10-04 21:48:20.100000,2,127245,1,255,8,ff,ff,ff,ff,ff,ff,ff,ff
+2020-10-04 21:48:20.200000,3,127488,0,255,8,00,10,27,ff,ff,ff,ff,ff
+2020-10-04 21:48:20.300000,2,127245,1,255,8,ff,ff,ff,ff,ff,ff,ff,ff
+"""
+
+
+class FakeBus:
+    """Bus giving out a list of messages, then nothing."""
+
+    def __init__(self, messages=()):
+        self.messages = list(messages)
+        self.sent = []
+
+    def recv(self, timeout=None):
+        if self.messages:
+            return self.messages.pop(0)
+        time.sleep(min(timeout or 0.01, 0.01))
+        return None
+
+    def send(self, msg, timeout=None):
+        self.sent.append(msg)
+
+
+def message(timestamp, arbitration_id=0x09f11201):
+    return SimpleNamespace(timestamp=timestamp, arbitration_id=arbitration_id,
+                           channel=None)
+
+
+class TestMergedBus(unittest.TestCase):
+    """Test cases for MergedBus."""
+
+    def tearDown(self):
+        self.bus.stop()
+
+    def test_order(self):
+        """Frames waiting on every stream come out in timestamp order."""
+        self.bus = canmerge.MergedBus({'can0': FakeBus(), 'can1': FakeBus()},
+                                      poll=0.01)
+        self.bus.queues[0].extend(message(t) for t in (1.0, 3.0, 5.0))
+        self.bus.queues[1].extend(message(t) for t in (2.0, 4.0, 6.0))
+        merged = [self.bus.recv(1).timestamp for _ in range(6)]
+        self.assertEqual(merged, [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+                         msg='Merged in timestamp order.')
+        self.assertIsNone(self.bus.recv(0.05), msg='Nothing left.')
+        self.assertEqual(self.bus.late, 0, msg='Nothing late.')
+
+    def test_idle_stream(self):
+        """An idle stream only holds the others back for latency."""
+        self.bus = canmerge.MergedBus({'can0': FakeBus(), 'can1': FakeBus()},
+                                      latency=0.05, poll=0.01)
+        self.bus.queues[0].extend(message(t) for t in (1.0, 2.0))
+        self.assertEqual([self.bus.recv(1).timestamp for _ in range(2)],
+                         [1.0, 2.0], msg='Old frames are not held back.')
+        self.bus.queues[1].append(message(1.5))
+        self.assertEqual(self.bus.recv(1).timestamp, 1.5,
+                         msg='A frame arriving late still comes out.')
+        self.assertEqual(self.bus.late, 1, msg='Late frame counted.')
+
+    def test_readers(self):
+        """Reader threads tag each frame with its channel."""
+        now = time.time()
+        self.bus = canmerge.MergedBus(
+            {'can0': FakeBus([message(now + 0.01), message(now + 0.03)]),
+             'can1': FakeBus([message(now + 0.02)])},
+            latency=0.2, poll=0.01)
+        merged = [self.bus.recv(2) for _ in range(3)]
+        self.assertEqual([msg.channel for msg in merged],
+                         ['can0', 'can1', 'can0'],
+                         msg='Channels in timestamp order.')
+
+    def test_bounded(self):
+        """A reader waits when its queue is full."""
+        now = time.time()
+        self.bus = canmerge.MergedBus(
+            {'can0': FakeBus([message(now + i * 0.001) for i in range(5)])},
+            maxsize=2, poll=0.01)
+        self.bus.start()
+        time.sleep(0.1)
+        self.assertEqual(len(self.bus.queues[0]), 2, msg='Queue bounded.')
+        self.assertGreaterEqual(self.bus.waits, 1, msg='Reader waited.')
+        self.assertEqual(len([self.bus.recv(1) for _ in range(5)]), 5,
+                         msg='Every frame comes out.')
+
+    def test_send(self):
+        """Messages are sent on the bus of their channel."""
+        can0, can1 = FakeBus(), FakeBus()
+        self.bus = canmerge.MergedBus({'can0': can0, 'can1': can1})
+        self.bus.send(SimpleNamespace(channel='can1'))
+        self.bus.send(SimpleNamespace(channel=None))
+        self.assertEqual((len(can0.sent), len(can1.sent)), (1, 1),
+                         msg='One message on each bus.')
+
+
+class TestChannels(unittest.TestCase):
+    """Test cases for the channel sidecar."""
+
+    def test_round_trip(self):
+        """Frames are read back with their channels."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'foo.n2k')
+            with open(path, 'w') as file:
+                file.write(LOG)
+            tags = canmerge.ChannelTags()
+            for channel in ('can0', 'can1', 'can0'):
+                tags.add(channel)
+            tags.write(canmerge.channel_path(path))
+            tagged = list(canmerge.read_tagged_frames(path))
+        self.assertEqual([channel for channel, _ in tagged],
+                         ['can0', 'can1', 'can0'], msg='Channel per frame.')
+        self.assertEqual(tagged[1][1][2], 127488, msg='Frames read.')
+
+    def test_no_sidecar(self):
+        """Without a sidecar every frame has the default channel."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'foo.n2k')
+            with open(path, 'w') as file:
+                file.write(LOG)
+            self.assertIsNone(canmerge.read_channels(path),
+                              msg='No sidecar.')
+            channels = {channel for channel, _ in
+                        canmerge.read_tagged_frames(path, 'can0')}
+        self.assertEqual(channels, {'can0'}, msg='Default channel.')
+
+    def test_channel_log_path(self):
+        """Each channel's log is named after it."""
+        self.assertEqual(canmerge.channel_log_path('logs/foo.n2k', 'can1'),
+                         'logs/foo.can1.n2k', msg='foo.can1.n2k')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:41:12 2026
+
+@author: wmorland
+"""
+
+import os
+import glob
+import tempfile
+import unittest
+import can
+import n2klog
+import n2kindex
+import isotp
+import sourceselect
+import cannew
+
+
+def messages(count, start=1601844500.0):
+    """Rudder frames, 10 a second."""
+    return [can.Message(timestamp=start + i / 10, arbitration_id=0x09f10d0f,
+                        data=[0xff, 0xff, 0xff, 0x7f, 0xe1, 0xfe, 0xff, 0xff],
+                        is_extended_id=True)
+            for i in range(count)]
+
+
+class TestN2KWriter(unittest.TestCase):
+    """Test cases for N2KWriter."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.directory.name, 'foo.n2k')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_index(self):
+        """A sidecar index is written when the writer stops."""
+        writer = cannew.N2KWriter(self.log, index=True)
+        for msg in messages(50):
+            writer.on_message_received(msg)
+        writer.stop()
+        self.assertTrue(os.path.exists(n2kindex.index_path(self.log)),
+                        msg='Expect foo.n2k.idx.')
+        index = n2kindex.load_index(self.log, build=False)
+        self.assertEqual(index.size, os.path.getsize(self.log),
+                         msg='Expect the index to cover the whole log.')
+        self.assertEqual(index.pgns[127245][2], 50,
+                         msg='Expect every frame counted.')
+
+    def test_no_index(self):
+        """No sidecar unless asked for."""
+        writer = cannew.N2KWriter(self.log)
+        writer.on_message_received(messages(1)[0])
+        writer.stop()
+        self.assertFalse(os.path.exists(n2kindex.index_path(self.log)),
+                         msg='Expect no foo.n2k.idx.')
+
+
+class TestSizedRotatingLogger(unittest.TestCase):
+    """Test cases for SizedRotatingLogger."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.directory.name, 'foo.n2k')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def rotated(self):
+        return sorted(glob.glob(os.path.join(self.directory.name,
+                                             'foo_*.n2k')))
+
+    def test_index_rotated(self):
+        """Each rotated log keeps its own index."""
+        logger = cannew.SizedRotatingLogger(self.log, max_bytes=2000,
+                                            index=True)
+        for msg in messages(100):
+            logger.on_message_received(msg)
+        logger.stop()
+        rotated = self.rotated()
+        self.assertGreater(len(rotated), 1, msg='Expect rollovers.')
+        for path in rotated + [self.log]:
+            index = n2kindex.load_index(path, build=False)
+            self.assertIsNotNone(index, msg=f'Expect an index for {path}.')
+            self.assertEqual(index.size, os.path.getsize(path),
+                             msg='Expect the index to match its log.')
+
+    def test_transport_rotated(self):
+        """Reassembled messages stay with the log they arrived in."""
+        logger = cannew.SizedRotatingLogger(self.log, max_bytes=2000)
+        transport = isotp.TransportLog(isotp.transport_log_path(self.log))
+        transport(isotp.Message(1601844500.0, 6, 126996, 9, 255,
+                                bytes(134)))
+        for msg in messages(100):
+            logger.on_message_received(msg)
+        logger.stop()
+        first = self.rotated()[0]
+        frames = list(n2klog.read_frames(isotp.transport_log_path(first)))
+        self.assertEqual([frame[2] for frame in frames], [126996],
+                         msg='Expect the message with the first log.')
+        self.assertFalse(os.path.exists(isotp.transport_log_path(self.log)),
+                         msg='Expect nothing left with the new log.')
+
+    def test_selections_rotated(self):
+        """Each log has the source selections made up to its end."""
+        record = sourceselect.SelectionLog(
+            sourceselect.selection_log_path(self.log))
+        first = sourceselect.Selection(1601844500.0, 128259, None, 11, None,
+                                       'first')
+        record(first)
+        logger = cannew.SizedRotatingLogger(self.log, max_bytes=2000)
+        for msg in messages(30):
+            logger.on_message_received(msg)
+        logger.do_rollover()
+        failover = first._replace(timestamp=1601844503.0, source=12,
+                                  previous=11, reason='dropout')
+        record(failover)
+        for msg in messages(30, start=1601844503.0):
+            logger.on_message_received(msg)
+        logger.stop()
+        rotated = self.rotated()
+        self.assertEqual(sourceselect.read_selections(rotated[0]), [first],
+                         msg='Expect the selection with the rotated log.')
+        self.assertEqual(sourceselect.read_selections(self.log),
+                         [first, failover],
+                         msg='Expect the primary in effect and the change.')
+        sourceselect.SelectionLog(sourceselect.selection_log_path(self.log))
+        self.assertEqual(sourceselect.read_selections(self.log), [],
+                         msg='Expect a new capture to start afresh.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Nov  5 14:26:51 2026
+
+@author: wmorland
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+import n2klog
+import framebatch
+
+LOG = """timestamp,priority,pgn,source,destination,dlc,data
+2020-10-04 21:48:20.100000,2,127245,1,255,8,FF,FF,FF,FF,FF,FF,FF,FF
+2020-10-04 21:48:20.200000,3,127488,0,255,8,00,10,27,FF,FF,FF,FF,FF
+2020-10-04 21:48:21.300000,2,127245,1,255,8,FF,FF,FF,FF,FF,FF,FF,FF
+2020-10-04 21:48:21.400000,6,59904,3,12,3,14,F0,01
+2020-10-04 21:48:22.500000,3,127488,0,255,8,00,20,27,FF,FF,FF,FF,FF
+"""
+
+
+def message(timestamp, arbitration_id=0x09f11201, data=b'\x01' * 8,
+            is_error_frame=False):
+    return SimpleNamespace(timestamp=timestamp, arbitration_id=arbitration_id,
+                           data=data, is_error_frame=is_error_frame)
+
+
+class FakeBus:
+    """Bus giving out a list of messages, then nothing."""
+
+    def __init__(self, messages=()):
+        self.messages = list(messages)
+        self.timeouts = []
+
+    def recv(self, timeout=None):
+        self.timeouts.append(timeout)
+        if self.messages:
+            return self.messages.pop(0)
+        return None
+
+
+class TestFrameBatch(unittest.TestCase):
+    """Test cases for FrameBatch."""
+
+    def test_headers(self):
+        """Priority, PGN, source and destination decoded on append."""
+        batch = framebatch.FrameBatch(4)
+        batch.append(1.0, n2klog.arbitration_id(2, 127245, 1), b'\0' * 8)
+        batch.append(2.0, n2klog.arbitration_id(6, 59904, 3, 12), b'\0' * 3)
+        self.assertEqual(list(batch.frames()),
+                         [(1.0, 2, 127245, 1, 255, b'\0' * 8),
+                          (2.0, 6, 59904, 3, 12, b'\0' * 3)],
+                         msg='PDU2 broadcast and PDU1 addressed.')
+
+    def test_padding(self):
+        """Short frames are padded with 0xff, as in PGNFrames."""
+        batch = framebatch.FrameBatch(2)
+        batch.append(1.0, 0x09f11201, b'\0' * 8)
+        batch.clear()
+        batch.append(1.0, 0x09f11201, b'\x14\xf0')
+        self.assertEqual(bytes(batch.data[:8]), b'\x14\xf0' + b'\xff' * 6,
+                         msg='Earlier frame overwritten with padding.')
+        self.assertEqual(batch.frame_data(0), b'\x14\xf0',
+                         msg='Only the dlc bytes given back.')
+
+    def test_full(self):
+        """A full batch raises IndexError."""
+        batch = framebatch.FrameBatch(1)
+        batch.append(1.0, 0x09f11201, b'')
+        self.assertTrue(batch.full, msg='Full.')
+        with self.assertRaises(IndexError, msg='No room.'):
+            batch.append(2.0, 0x09f11201, b'')
+
+    def test_select(self):
+        """Frames of other PGNs are dropped and the rest compacted."""
+        batch = framebatch.FrameBatch(4)
+        for i, pgn in enumerate((127245, 127488, 127245, 127488)):
+            batch.append(float(i), n2klog.arbitration_id(2, pgn, 1),
+                         bytes([i]) * 8)
+        self.assertEqual(batch.select({127488}), 2, msg='Two dropped.')
+        self.assertEqual([(frame[0], frame[5][0])
+                          for frame in batch.frames()],
+                         [(1.0, 1), (3.0, 3)], msg='Kept in order.')
+
+    def test_lines(self):
+        """Lines are in the plain format, as NMEA2000_Frame writes them."""
+        batch = framebatch.FrameBatch(4)
+        stamps = (1601844500.1, 1601844500.9999996, 1601844501.25)
+        for timestamp in stamps:
+            batch.append(timestamp, n2klog.arbitration_id(3, 127488, 0),
+                         b'\x00\x10\x27\xff\xff\xff\xff\xab')
+        for line, timestamp in zip(batch.lines(), stamps):
+            expected = (datetime.fromtimestamp(timestamp).strftime(
+                '%Y-%m-%d %H:%M:%S.%f') + ',3,127488,0,255,8,'
+                '00,10,27,FF,FF,FF,FF,AB\n')
+            self.assertEqual(line, expected, msg='Same line as the writer.')
+
+    def test_frame(self):
+        """A Frame has the can.Message fields listeners read."""
+        batch = framebatch.FrameBatch(2, channel='can1')
+        batch.append(1.5, 0x09f11201, b'\x14\xf0')
+        frame = batch.frame(0)
+        self.assertEqual((frame.timestamp, frame.arbitration_id, frame.data,
+                          frame.channel),
+                         (1.5, 0x09f11201, b'\x14\xf0', 'can1'),
+                         msg='Timestamp, id, data and channel.')
+
+    def test_items(self):
+        """Items are (timestamp, arbitration_id, data) for replay."""
+        batch = framebatch.FrameBatch(2)
+        batch.append_frame(1.0, 6, 59904, 3, 12, b'\x14\xf0\x01')
+        self.assertEqual(list(batch.items()),
+                         [(1.0, n2klog.arbitration_id(6, 59904, 3, 12),
+                           b'\x14\xf0\x01')], msg='Replay tuples.')
+
+    def test_columns(self):
+        """numpy views share the batch buffers."""
+        try:
+            import numpy        # noqa: F401
+        except ModuleNotFoundError:
+            self.skipTest('needs numpy')
+        batch = framebatch.FrameBatch(4)
+        batch.append(1.0, 0x09f11201, b'\x01' * 8)
+        batch.append(2.0, 0x09f11201, b'\x02' * 8)
+        columns = batch.columns()
+        self.assertEqual(columns['data'].shape, (2, 8), msg='(N, 8) bytes.')
+        self.assertEqual(list(columns['pgn']), [127250, 127250],
+                         msg='PGN column.')
+        batch.timestamp[0] = 5.0
+        self.assertEqual(columns['timestamp'][0], 5.0, msg='Zero copy.')
+
+
+class TestReceive(unittest.TestCase):
+    """Test cases for receive."""
+
+    def test_receive(self):
+        """Queued frames are taken without waiting, error frames skipped."""
+        bus = FakeBus([message(1.0), message(2.0, is_error_frame=True),
+                       message(3.0)])
+        batch = framebatch.FrameBatch(4)
+        self.assertEqual(framebatch.receive(bus, batch, 1.0), 2,
+                         msg='Two frames.')
+        self.assertEqual(bus.timeouts, [1.0, 0, 0, 0],
+                         msg='Only the first recv waits.')
+        self.assertEqual(batch.errors, 1, msg='One error frame counted.')
+
+    def test_full(self):
+        """Receiving stops when the batch is full."""
+        bus = FakeBus([message(float(i)) for i in range(3)])
+        batch = framebatch.FrameBatch(2)
+        framebatch.receive(bus, batch)
+        self.assertEqual(len(bus.messages), 1, msg='One left on the bus.')
+
+
+class TestReadBatches(unittest.TestCase):
+    """Test cases for read_batches and decode_batches."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'foo.n2k')
+        with open(self.path, 'w') as file:
+            file.write(LOG)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read(self):
+        """Batches give the same frames as n2klog.read_frames."""
+        frames = []
+        sizes = []
+        for batch in framebatch.read_batches(self.path, capacity=2):
+            sizes.append(len(batch))
+            frames.extend(batch.frames())
+        self.assertEqual(sizes, [2, 2, 1], msg='Batches of two.')
+        self.assertEqual(frames, list(n2klog.read_frames(self.path)),
+                         msg='Same frames.')
+
+    def test_decode(self):
+        """decode_batches gives the same columns as n2klog.decode_log."""
+        expected = n2klog.decode_log(self.path)
+        pgns = framebatch.decode_batches(
+            framebatch.read_batches(self.path, capacity=2))
+        self.assertEqual(sorted(pgns), sorted(expected), msg='Same PGNs.')
+        for pgn, frames in expected.items():
+            for name in ('timestamp', 'priority', 'source', 'destination',
+                         'dlc', 'data'):
+                self.assertEqual(getattr(pgns[pgn], name),
+                                 getattr(frames, name),
+                                 msg=f'{pgn} {name}.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 14:20:36 2026
+
+@author: wmorland
+"""
+
+import struct
+import unittest
+import gpsbridge
+import n2klog
+from test_nmea0183 import with_checksum
+
+RMC = with_checksum('$GPRMC,123519.00,A,4807.038,N,01131.000,W,022.4,084.4,'
+                    '230326,003.1,W')
+GGA = with_checksum('$GPGGA,123519,4807.038,N,01131.000,W,1,08,0.9,545.4,M,'
+                    '46.9,M,,')
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGPSBridge(unittest.TestCase):
+    """Test cases for GPSBridge."""
+
+    def setUp(self):
+        self.sent = []
+        self.clock = FakeClock()
+        self.bridge = gpsbridge.GPSBridge(
+            lambda t, i, d: self.sent.append((i, bytes(d))), source=42,
+            clock=self.clock)
+
+    def pgns(self):
+        return [(i >> 8) & 0x3ffff for i, _ in self.sent]
+
+    def test_rmc_gga(self):
+        """RMC and GGA give 129025, 129026 and a fast packet 129029."""
+        self.bridge(RMC)
+        self.bridge(GGA)
+        self.assertEqual(self.pgns(), [129025, 129026, 129025]
+                         + [129029] * 7, msg='Expect 7 frames of 129029.')
+        latitude, longitude = struct.unpack('<ii', self.sent[0][1])
+        self.assertEqual(latitude, round((48 + 7.038 / 60) * 1e7),
+                         msg='Expect 1e-7 degrees.')
+        self.assertEqual(self.sent[0][0] & 0xff, 42,
+                         msg='Expect our source address.')
+        first = self.sent[3][1]
+        self.assertEqual((first[0], first[1]), (0, 43),
+                         msg='Frame 0 holds the 43 byte length.')
+        payload = first[2:] + b''.join(d[1:] for _, d in self.sent[4:])
+        fields = gpsbridge.GNSS_POSITION.decode(payload[:43])
+        self.assertAlmostEqual(fields['date'] * 86400 + fields['time'],
+                               1774224000 + 12 * 3600 + 35 * 60 + 19,
+                               places=3, msg='Expect the date from RMC and '
+                               'time from GGA.')
+        self.assertEqual(fields['numberOfSvs'], 8,
+                         msg='Expect 8 satellites.')
+
+    def test_rate_limit(self):
+        """Unsent messages are replaced by newer ones."""
+        bridge = gpsbridge.GPSBridge(
+            lambda t, i, d: self.sent.append((i, bytes(d))), source=42,
+            rate=10, clock=self.clock)
+        bridge.queue.tokens = 0
+        for _ in range(5):
+            self.assertGreater(bridge(RMC), 0, msg='Expect to wait.')
+        self.assertEqual(self.sent, [], msg='Nothing sent yet.')
+        self.assertEqual(bridge.queue.replaced, 8,
+                         msg='Four replacements for each PGN.')
+        self.clock.now += 0.2
+        bridge.queue.pump()
+        self.assertEqual(self.pgns(), [129025, 129026],
+                         msg='Only the newest of each is sent.')
+
+    def test_arbitration_id(self):
+        """Identifiers match n2klog."""
+        self.assertEqual(self.bridge.ids[129029],
+                         n2klog.arbitration_id(3, 129029, 42),
+                         msg='Expect priority 3 for 129029.')
+
+
+if __name__ == '__main__':
+    unittest.main()
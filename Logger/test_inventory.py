@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Nov  1 10:37:14 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+import tempfile
+from datetime import datetime
+import addressclaim
+import n2kcodec
+import inventory
+
+WIND_NAME = addressclaim.make_name(0x1234, manufacturer=135, function=140,
+                                   device_class=85)
+PRODUCT = inventory.PRODUCT.pack(2100, 1234, b'WS310'.ljust(32, b'\xff'),
+                                 b'1.2.3'.ljust(32, b'\xff'),
+                                 b'A'.ljust(32, b'\xff'),
+                                 b'SN0042'.ljust(32, b'\xff'), 1, 2)
+
+
+def product_frames():
+    return [bytes(data)
+            for data in n2kcodec.FastPacketSegmenter().segment(PRODUCT)]
+
+
+def claim(inventory_, timestamp, source, name):
+    return inventory_.add_frame(timestamp, 6, inventory.ADDRESS_CLAIM,
+                                source, 255, name.to_bytes(8, 'little'))
+
+
+def product(inventory_, timestamp, source):
+    for data in product_frames():
+        inventory_.add_frame(timestamp, 6, inventory.PRODUCT_INFORMATION,
+                             source, 255, data)
+
+
+class TestDeviceInventory(unittest.TestCase):
+    """Test cases for DeviceInventory."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.directory.name, 'foo.n2k')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_claim_and_product(self):
+        """A device is identified by its NAME and product information."""
+        devices = inventory.DeviceInventory(inventory.inventory_path(self.log))
+        self.assertTrue(claim(devices, 1.0, 16, WIND_NAME), msg='New device.')
+        self.assertFalse(claim(devices, 2.0, 16, WIND_NAME),
+                         msg='The same claim again changes nothing.')
+        product(devices, 3.0, 16)
+        device = inventory.load_inventory(self.log)[16]
+        self.assertEqual((device['manufacturer'], device['function']),
+                         (135, 140), msg='Expect the NAME fields.')
+        self.assertEqual(device['product']['model_id'], 'WS310',
+                         msg='Expect the model.')
+        self.assertEqual(device['product']['serial_code'], 'SN0042',
+                         msg='Expect the serial code.')
+        self.assertEqual(devices.writes, 2, msg='Written on each change.')
+
+    def test_address_change(self):
+        """A device that moves keeps its product information."""
+        devices = inventory.DeviceInventory()
+        claim(devices, 1.0, 16, WIND_NAME)
+        product(devices, 2.0, 16)
+        other = addressclaim.make_name(0x99)
+        claim(devices, 3.0, 16, other)
+        claim(devices, 3.1, 17, WIND_NAME)
+        sources = devices.source_map()
+        self.assertEqual(sources[17]['product']['model_id'], 'WS310',
+                         msg='Product information follows the NAME.')
+        self.assertEqual(sources[16]['name'], f'{other:016x}',
+                         msg='Another device now at 16.')
+        self.assertEqual(sources[17]['addresses'], [[1.0, 16], [3.1, 17]],
+                         msg='Expect the address history.')
+
+    def test_build_inventory(self):
+        """Old logs are scanned for identification PGNs."""
+        lines = ['timestamp,priority,pgn,source,destination,dlc,data\n']
+        frames = [(60928, WIND_NAME.to_bytes(8, 'little'))]
+        frames += [(126996, data) for data in product_frames()]
+        for pgn, data in frames:
+            data = ','.join(f'{b:02x}' for b in data)
+            lines.append(f'2026-11-01 10:00:00.000000,6,{pgn},12,255,8,'
+                         f'{data}\n')
+        with open(self.log, 'w') as file:
+            file.writelines(lines)
+        devices = inventory.build_inventory(self.log)
+        self.assertEqual(devices.source_map()[12]['product']['model_id'],
+                         'WS310', msg='Expect the wind sensor.')
+        self.assertEqual(devices.source_map()[12]['first_seen'],
+                         datetime(2026, 11, 1, 10).timestamp(),
+                         msg='Expect the log time.')
+        self.assertIn(12, inventory.load_inventory(self.log),
+                      msg='Sidecar written.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 28 11:02:37 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+import tempfile
+import isotp
+import n2klog
+
+PRODUCT_INFO = 126996
+
+
+def cm(control, size, packets, pgn=PRODUCT_INFO, extra=0xff):
+    return bytes((control, size & 0xff, size >> 8, packets, extra,
+                  pgn & 0xff, (pgn >> 8) & 0xff, pgn >> 16))
+
+
+def dt_frames(payload):
+    """TP.DT data for a payload, padded with 0xff."""
+    frames = []
+    for i in range(0, len(payload), 7):
+        chunk = payload[i:i + 7]
+        frames.append(bytes((i // 7 + 1,)) + chunk.ljust(7, b'\xff'))
+    return frames
+
+
+def cm_id(source, destination=255):
+    return n2klog.arbitration_id(7, isotp.TP_CM, source, destination)
+
+
+def dt_id(source, destination=255):
+    return n2klog.arbitration_id(7, isotp.TP_DT, source, destination)
+
+
+class TestReassembler(unittest.TestCase):
+    """Test cases for Reassembler."""
+
+    def setUp(self):
+        self.payload = bytes(range(134))        # 20 packets
+        self.messages = []
+        self.reassembler = isotp.Reassembler(self.messages.append)
+
+    def test_bam(self):
+        """A broadcast is reassembled from its data frames."""
+        r = self.reassembler
+        self.assertIsNone(r.add(0.0, cm_id(9), cm(isotp.BAM, 134, 20)),
+                          msg='Announcement is not a message.')
+        frames = dt_frames(self.payload)
+        for i, data in enumerate(frames[:-1]):
+            self.assertIsNone(r.add(0.05 * (i + 1), dt_id(9), data),
+                              msg='Incomplete.')
+        message = r.add(1.0, dt_id(9), frames[-1])
+        self.assertEqual(message, isotp.Message(1.0, 7, PRODUCT_INFO, 9, 255,
+                                                self.payload),
+                         msg='Expect the whole message.')
+        self.assertEqual(self.messages, [message], msg='Callback called.')
+        self.assertEqual(r.sessions, {}, msg='Session closed.')
+        self.assertEqual(len(r.free), 1, msg='Buffer returned for reuse.')
+
+    def test_rts_cts(self):
+        """A connection mode session with a retransmission completes."""
+        r = self.reassembler
+        r.add(0.0, cm_id(9, 3), cm(isotp.RTS, 134, 20, extra=10))
+        r.add(0.01, cm_id(3, 9), cm(isotp.CTS, 10, 1))
+        frames = dt_frames(self.payload)
+        for data in frames[:10] + frames[4:5]:
+            r.add(0.02, dt_id(9, 3), data)
+        # Receiver holds the sender, longer than a BAM timeout
+        r.add(1.0, cm_id(3, 9), cm(isotp.CTS, 10, 11))
+        for data in frames[10:]:
+            message = r.add(2.0, dt_id(9, 3), data)
+        self.assertEqual((message.destination, message.data),
+                         (3, self.payload), msg='Expect the whole message.')
+
+    def test_abort_and_timeout(self):
+        """Aborted and stalled sessions are closed without a message."""
+        r = self.reassembler
+        frames = dt_frames(self.payload)
+        r.add(0.0, cm_id(9, 3), cm(isotp.RTS, 134, 20))
+        r.add(0.1, dt_id(9, 3), frames[0])
+        r.add(0.2, cm_id(3, 9), cm(isotp.ABORT, 0, 0))
+        self.assertEqual(r.aborted, 1, msg='Aborted by the receiver.')
+        r.add(0.3, cm_id(9), cm(isotp.BAM, 134, 20))
+        r.add(0.4, dt_id(9), frames[0])
+        r.expire(1.2)
+        self.assertEqual(r.timed_out, 1, msg='BAM times out after 750ms.')
+        r.add(1.3, dt_id(9), frames[1])
+        self.assertEqual((r.dropped, self.messages), (1, []),
+                         msg='Data without a session is dropped.')
+        r.add(1.4, cm_id(9), cm(isotp.BAM, 134, 7))
+        self.assertEqual((r.dropped, r.sessions), (2, {}),
+                         msg='Size and packets must agree.')
+
+    def test_transport_log(self):
+        """Messages written to the sidecar read back with n2klog."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = isotp.transport_log_path(os.path.join(directory, 'foo.n2k'))
+            self.assertEqual(os.path.basename(path), 'foo.tp.csv',
+                             msg='Sidecar name, not a .n2k log.')
+            log = isotp.TransportLog(path)
+            self.assertFalse(os.path.exists(path), msg='Created lazily.')
+            log(isotp.Message(1.0, 7, PRODUCT_INFO, 9, 255, self.payload))
+            log.close()
+            frames = list(n2klog.read_frames(path))
+            self.assertEqual(frames[0][1:], (7, PRODUCT_INFO, 9, 255,
+                                             self.payload),
+                             msg='Expect the message read back.')
+            log = isotp.TransportLog(path)
+            log(isotp.Message(2.0, 7, PRODUCT_INFO, 9, 255, self.payload))
+            log.close()
+            self.assertEqual(len(list(n2klog.read_frames(path))), 2,
+                             msg='Expect an earlier run kept.')
+
+
+if __name__ == '__main__':
+    unittest.main()
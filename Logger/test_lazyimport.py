@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 14:30:12 2026
+
+@author: wmorland
+"""
+
+import os
+import sys
+import unittest
+import tempfile
+import lazyimport
+
+
+class TestLazyImport(unittest.TestCase):
+    """Test cases for lazy_import."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.directory.name, 'slowmodule.py'),
+                  'w') as file:
+            file.write('import builtins\n'
+                       'builtins.slowmodule_ran = True\n'
+                       'VALUE = 42\n')
+        sys.path.insert(0, self.directory.name)
+
+    def tearDown(self):
+        sys.path.remove(self.directory.name)
+        sys.modules.pop('slowmodule', None)
+        import builtins
+        if hasattr(builtins, 'slowmodule_ran'):
+            del builtins.slowmodule_ran
+        self.directory.cleanup()
+
+    def test_deferred(self):
+        """The module only runs on first attribute access."""
+        import builtins
+        module = lazyimport.lazy_import('slowmodule')
+        self.assertFalse(hasattr(builtins, 'slowmodule_ran'),
+                         msg='Module should not have run yet.')
+        self.assertEqual(module.VALUE, 42, msg='Expect the module value.')
+        self.assertTrue(builtins.slowmodule_ran, msg='Module has now run.')
+        self.assertIs(sys.modules['slowmodule'], module,
+                      msg='Later imports get the same module.')
+
+    def test_already_imported(self):
+        """An imported module is returned as is."""
+        self.assertIs(lazyimport.lazy_import('os'), os,
+                      msg='Expect the module from sys.modules.')
+
+    def test_missing(self):
+        """A missing module only raises when it is used."""
+        for name in ('no_such_module_here', 'no_such_package.module'):
+            module = lazyimport.lazy_import(name)
+            with self.assertRaises(ModuleNotFoundError,
+                                   msg=f'Expect {name} to raise on use.'):
+                module.VALUE
+            self.assertNotIn(name, sys.modules,
+                             msg='A missing module is not registered.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 10:12:40 2026
+
+@author: wmorland
+"""
+
+import unittest
+from array import array
+from types import SimpleNamespace
+import livestate
+
+
+def message(timestamp, arbitration_id, data):
+    """Stand in for can.Message with just the fields LiveState uses."""
+    return SimpleNamespace(timestamp=timestamp, arbitration_id=arbitration_id,
+                           data=bytearray(data))
+
+
+RUDDER_ID = 0b010_01_11110001_00001101_00001111   # 127245 from source 15
+WIND_ID = 0b010_01_11111101_00000010_00010000     # 130306 from source 16
+
+
+class TestRingBuffer(unittest.TestCase):
+    """Test cases for RingBuffer."""
+
+    def test_wrap(self):
+        """Oldest samples are overwritten."""
+        ring = livestate.RingBuffer(4)
+        for i in range(10):
+            ring.push(float(i), i * 10.0)
+        self.assertEqual(len(ring), 4, msg='Expect buffer to be full.')
+        self.assertEqual(ring.latest(), (9.0, 90.0),
+                         msg='Expect the newest sample.')
+        times = array('d', bytes(8 * 4))
+        values = array('d', bytes(8 * 4))
+        n = ring.window(7.0, times, values)
+        self.assertEqual(list(values[:n]), [70.0, 80.0, 90.0],
+                         msg='Expect samples since 7s oldest first.')
+        self.assertEqual(ring.mean(0.0), 75.0,
+                         msg='Mean covers only the samples held.')
+
+    def test_empty(self):
+        """Empty buffer."""
+        ring = livestate.RingBuffer(4)
+        self.assertIsNone(ring.latest(), msg='Expect None when empty.')
+        self.assertIsNone(ring.mean(0.0), msg='Expect None when empty.')
+
+    def test_small_output(self):
+        """Only as many samples as fit are copied."""
+        ring = livestate.RingBuffer(8)
+        for i in range(8):
+            ring.push(float(i), float(i))
+        times = array('d', bytes(8 * 2))
+        values = array('d', bytes(8 * 2))
+        self.assertEqual(ring.window(0.0, times, values), 2,
+                         msg='Expect two samples copied.')
+        self.assertEqual(list(values), [6.0, 7.0],
+                         msg='Expect the newest two samples.')
+
+
+class TestLiveState(unittest.TestCase):
+    """Test cases for LiveState."""
+
+    def test_rudder(self):
+        """Rudder position is decoded."""
+        state = livestate.LiveState(seconds=10)
+        state(message(1.0, RUDDER_ID,
+                      [0xff, 0xff, 0xff, 0x7f, 0xe1, 0xfe, 0xff, 0xff]))
+        time, value = state.latest('rudder_position')
+        self.assertAlmostEqual(value, -287 * 0.0001,
+                               msg='Expect position from bytes 4 and 5.')
+        self.assertEqual(list(state.snapshot()), ['rudder_position'],
+                         msg='Only channels with data are in the snapshot.')
+
+    def test_wind_reference(self):
+        """Apparent and true wind go to different channels."""
+        state = livestate.LiveState(seconds=10)
+        state(message(1.0, WIND_ID, [0, 0xe8, 0x03, 0x10, 0x27, 0xfa, 0, 0]))
+        self.assertAlmostEqual(state.latest('apparent_wind_speed')[1], 10.0,
+                               msg='Expect 10 m/s apparent wind.')
+        self.assertIsNone(state.latest('true_wind_speed'),
+                          msg='Expect no true wind.')
+
+    def test_no_data(self):
+        """Fields with no data are skipped."""
+        state = livestate.LiveState(seconds=10)
+        state(message(1.0, RUDDER_ID, [0xff] * 4 + [0xff, 0x7f, 0xff, 0xff]))
+        self.assertIsNone(state.latest('rudder_position'),
+                          msg='0x7fff should not be stored.')
+
+    def test_source(self):
+        """Only the chosen source is accepted."""
+        state = livestate.LiveState(seconds=10,
+                                    sources={'rudder_position': 1})
+        state(message(1.0, RUDDER_ID, [0xff] * 4 + [0xe1, 0xfe, 0xff, 0xff]))
+        self.assertIsNone(state.latest('rudder_position'),
+                          msg='Source 15 should be ignored.')
+
+
+if __name__ == '__main__':
+    unittest.main()
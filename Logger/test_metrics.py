@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 10:41:37 2026
+
+@author: wmorland
+"""
+
+import os
+import time
+import unittest
+import tempfile
+from types import SimpleNamespace
+import framebatch
+import metrics
+
+RUDDER_ID = 0b010_01_11110001_00001101_00001111   # 127245 from source 15
+
+
+def message(arbitration_id=RUDDER_ID, is_error_frame=False):
+    return SimpleNamespace(arbitration_id=arbitration_id,
+                           is_error_frame=is_error_frame,
+                           timestamp=time.time())
+
+
+class TestCaptureMetrics(unittest.TestCase):
+    """Test cases for CaptureMetrics."""
+
+    def test_counts(self):
+        """Frames are counted per PGN and source."""
+        capture = metrics.CaptureMetrics()
+        for _ in range(3):
+            self.assertEqual(capture.record(message()), 127245,
+                             msg='Expect the PGN back.')
+        self.assertIsNone(capture.record(message(is_error_frame=True)),
+                          msg='Error frames have no PGN.')
+        self.assertEqual(capture.frames, 3, msg='Expect three frames.')
+        self.assertEqual(capture.error_frames, 1, msg='Expect one error.')
+        self.assertEqual(capture.per_source(), {'127245/15': 3},
+                         msg='Expect counts by PGN and source.')
+
+    def test_batch(self):
+        """A batch is counted as its frames one by one would be."""
+        capture = metrics.CaptureMetrics()
+        batch = framebatch.FrameBatch(4)
+        for arbitration_id in (RUDDER_ID, RUDDER_ID + 1, RUDDER_ID):
+            batch.append(time.time(), arbitration_id, b'\0' * 8)
+        batch.errors = 1
+        capture.record_batch(batch)
+        self.assertEqual(capture.frames, 3, msg='Expect three frames.')
+        self.assertEqual(capture.error_frames, 1, msg='Expect one error.')
+        self.assertEqual(capture.per_source(),
+                         {'127245/15': 2, '127245/16': 1},
+                         msg='Expect counts by PGN and source.')
+
+    def test_overflow(self):
+        """PGNs beyond the table size are counted together."""
+        capture = metrics.CaptureMetrics()
+        for pgn in range(metrics.MAX_PGNS + 5):
+            capture.record(message((0x1f000 + pgn) << 8 | 7))
+        counts = capture.per_source()
+        self.assertEqual(counts['other/7'], 6,
+                         msg='Expect the extra PGNs counted as other.')
+        self.assertEqual(sum(counts.values()), metrics.MAX_PGNS + 5,
+                         msg='Every frame is counted once.')
+
+    def test_percentile(self):
+        """Latency percentiles come from the histogram."""
+        capture = metrics.CaptureMetrics()
+        self.assertIsNone(capture.percentile(0.5), msg='No samples yet.')
+        for _ in range(99):
+            capture.record_write(50e-6, message())
+        capture.record_write(0.1, message())
+        self.assertEqual(capture.percentile(0.5), 64,
+                         msg='50us falls in the 64us bucket.')
+        self.assertEqual(capture.percentile(1.0), 131072,
+                         msg='100ms falls in the 131072us bucket.')
+
+    def test_status_line(self):
+        """Status line is logged when forced."""
+        capture = metrics.CaptureMetrics()
+        capture.record(message())
+        with self.assertLogs('metrics', level='INFO') as logs:
+            capture.tick(force=True)
+        self.assertIn('frames=1 ', logs.output[0],
+                      msg='Expect the frame count in the status line.')
+
+
+class TestMetricsServer(unittest.TestCase):
+    """Test cases for MetricsServer and query."""
+
+    def test_query(self):
+        """Metrics can be read from the Unix socket."""
+        capture = metrics.CaptureMetrics()
+        capture.record(message())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'capture.sock')
+            server = metrics.MetricsServer(capture, path)
+            try:
+                snapshot = metrics.query(path)
+            finally:
+                server.close()
+        self.assertEqual(snapshot['frames'], 1, msg='Expect one frame.')
+        self.assertEqual(snapshot['per_source'], {'127245/15': 1},
+                         msg='Expect counts by PGN and source.')
+
+
+if __name__ == '__main__':
+    unittest.main()
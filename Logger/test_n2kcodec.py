@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 30 11:48:26 2026
+
+@author: wmorland
+"""
+
+import unittest
+import n2kcodec
+import traffic
+
+RUDDER = {
+    'PGN': 127245, 'Id': 'rudder', 'Type': 'Single', 'RepeatingFields': 0,
+    'Fields': [
+        {'Order': 1, 'Id': 'instance', 'BitLength': 8, 'BitOffset': 0,
+         'Signed': False},
+        {'Order': 2, 'Id': 'directionOrder', 'BitLength': 2, 'BitOffset': 8,
+         'Signed': False, 'EnumValues': [{'name': 'No Order', 'value': '0'},
+                                         {'name': 'Move to port',
+                                          'value': '2'}]},
+        {'Order': 4, 'Id': 'angleOrder', 'BitLength': 16, 'BitOffset': 16,
+         'Resolution': '0.0001', 'Signed': True},
+        {'Order': 5, 'Id': 'position', 'BitLength': 16, 'BitOffset': 32,
+         'Resolution': '0.0001', 'Signed': True}]}
+
+
+class TestPGNCodec(unittest.TestCase):
+    """Test cases for compile_plan and PGNCodec."""
+
+    def test_plan(self):
+        """Bit fields share a chunk, gaps become reserved fields."""
+        pgn, _, fast, chunks, repeat, count = n2kcodec.compile_plan(RUDDER)
+        self.assertEqual((pgn, fast, repeat, count),
+                         (127245, False, (), None), msg='Single frame.')
+        self.assertEqual([size for size, _ in chunks], [1, 1, 2, 2],
+                         msg='Expect byte aligned chunks.')
+        self.assertEqual([f[0] for f in chunks[1][1]],
+                         ['directionOrder', 'reserved'],
+                         msg='The 6 bit gap is reserved.')
+
+    def test_encode(self):
+        """Values are scaled, missing values all ones, padded to 8 bytes."""
+        codec = n2kcodec.PGNCodec(n2kcodec.compile_plan(RUDDER))
+        payload = codec.encode(instance=0, directionOrder='Move to port',
+                               position=-0.05)
+        self.assertEqual(payload, bytes.fromhex('00feff7f0cfeffff'),
+                         msg='Expect the encoded rudder.')
+        self.assertEqual(codec.decode(payload),
+                         {'instance': 0, 'directionOrder': 'Move to port',
+                          'angleOrder': None, 'position': -0.05},
+                         msg='Expect the values back.')
+        self.assertEqual(codec.encode(position=4.0)[4:6], b'\xff\x7f',
+                         msg='Out of range values are clamped.')
+
+    def test_definitions(self):
+        """Codecs from pgns.json match the synthetic traffic."""
+        rudder = n2kcodec.codec(127245)
+        self.assertIs(rudder, n2kcodec.codec(127245), msg='Compiled once.')
+        self.assertEqual(rudder.encode(instance=0, position=0.0),
+                         traffic._rudder(0.0), msg='Expect the same bytes.')
+        wind = n2kcodec.codec(130306)
+        self.assertEqual(wind.encode(sid=0, windSpeed=8.0, windAngle=0.7,
+                                     reference='Apparent'),
+                         traffic._wind(0.0), msg='Expect the same bytes.')
+
+    def test_repeating(self):
+        """GNSS reference stations repeat after the count field."""
+        gnss = n2kcodec.codec(129029)
+        station = {'referenceStationType': 'GPS', 'referenceStationId': 7,
+                   'ageOfDgnssCorrections': 1.5}
+        payload = gnss.encode(sid=1, repeat=[station])
+        self.assertEqual(len(payload), 47, msg='43 bytes and one station.')
+        values = gnss.decode(payload)
+        self.assertEqual((values['referenceStations'], values['repeat']),
+                         (1, [station]), msg='Expect the station back.')
+
+
+class TestFastPacketSegmenter(unittest.TestCase):
+    """Test cases for FastPacketSegmenter."""
+
+    def test_segment(self):
+        """A 43 byte payload needs seven frames in the reused buffer."""
+        segmenter = n2kcodec.FastPacketSegmenter()
+        segmenter.sequence = 5
+        payload = bytes(range(43))
+        frames = [bytes(f) for f in segmenter.segment(payload)]
+        self.assertEqual(len(frames), 7, msg='Expect seven frames.')
+        self.assertEqual(frames[0][:2], bytes([0xa0, 43]),
+                         msg='Expect sequence 5, frame 0 and length 43.')
+        self.assertEqual(frames[6][0], 0xa6, msg='Expect frame counter 6.')
+        self.assertTrue(all(len(f) == 8 for f in frames),
+                        msg='Every frame has 8 bytes.')
+        self.assertEqual(b''.join(f[2:] if i == 0 else f[1:]
+                                  for i, f in enumerate(frames)),
+                         payload + b'\xff' * 5,
+                         msg='Payload is preserved and padded.')
+        for size, count in ((6, 1), (7, 2), (13, 2), (223, 32)):
+            views = segmenter.segment(bytes(size))
+            self.assertEqual(len(views), count,
+                             msg=f'Expect {count} frames for {size} bytes.')
+        self.assertEqual(views[0][0] >> 5, 1, msg='Sequence wraps at 8.')
+        self.assertIs(views[0].obj, segmenter.buffer,
+                      msg='Frames are views of the buffer.')
+        with self.assertRaises(ValueError, msg='Too long.'):
+            segmenter.segment(bytes(224))
+
+
+class TestFastPacketAssembler(unittest.TestCase):
+    """Test cases for FastPacketAssembler."""
+
+    def test_add(self):
+        """Payloads come back whole, a missing frame drops the payload."""
+        assembler = n2kcodec.FastPacketAssembler()
+        payload = bytes(range(43))
+        frames = [bytes(f)
+                  for f in n2kcodec.FastPacketSegmenter().segment(payload)]
+        for data in frames[:-1]:
+            self.assertIsNone(assembler.add(9, data), msg='Incomplete.')
+        self.assertEqual(assembler.add(9, frames[-1]), payload,
+                         msg='Expect the payload.')
+        for data in frames[:2] + frames[3:]:
+            self.assertIsNone(assembler.add(9, data), msg='Frame missing.')
+        self.assertEqual(assembler.dropped, 1, msg='Expect one dropped.')
+
+
+if __name__ == '__main__':
+    unittest.main()
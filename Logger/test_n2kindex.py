@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:20:08 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+import tempfile
+from datetime import datetime, timedelta
+import n2klog
+import n2kindex
+
+START = datetime(2021, 3, 2, 20, 16, 0)
+
+
+def write_log(path, seconds=60):
+    """Rudder at 10Hz, position at 1Hz."""
+    with open(path, 'w') as file:
+        file.write('timestamp,priority,pgn,source,destination,dlc,data\n')
+        for tenth in range(seconds * 10):
+            time = START + timedelta(seconds=tenth / 10)
+            file.write(f'{time:%Y-%m-%d %H:%M:%S.%f},2,127245,15,255,8,'
+                       'ff,ff,ff,7f,e1,fe,ff,ff\n')
+            if tenth % 10 == 0:
+                file.write(f'{time:%Y-%m-%d %H:%M:%S.%f},2,129025,9,255,8,'
+                           '2f,26,ff,19,cb,0e,a0,d0\n')
+
+
+class TestIndex(unittest.TestCase):
+    """Test cases for build_index and read_window."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.directory.name, 'foo.n2k')
+        write_log(self.log)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_window(self):
+        """Frames in a window are the same as a full read."""
+        n2kindex.build_index(self.log, every_frames=50)
+        start = (START + timedelta(seconds=20)).timestamp()
+        end = (START + timedelta(seconds=25)).timestamp()
+        expected = [f for f in n2klog.read_frames(self.log)
+                    if start <= f[0] <= end]
+        window = list(n2kindex.read_window(self.log, start, end))
+        self.assertEqual(window, expected,
+                         msg='Expect the same frames as a full read.')
+        index = n2kindex.load_index(self.log)
+        first, stop = index.byte_range(start, end)
+        self.assertLess(stop - first, index.size / 5,
+                        msg='Expect only a small part of the file to be read.')
+
+    def test_pgn(self):
+        """Only the PGNs asked for are returned."""
+        frames = list(n2kindex.read_window(self.log, pgns=[129025]))
+        self.assertEqual(len(frames), 60, msg='Expect 60 position frames.')
+        self.assertTrue(all(f[2] == 129025 for f in frames),
+                        msg='Expect only position frames.')
+        self.assertEqual(list(n2kindex.read_window(self.log, pgns=[130306])),
+                         [], msg='Expect nothing for a PGN not in the log.')
+
+    def test_round_trip(self):
+        """Index read back from the sidecar is the same."""
+        built = n2kindex.build_index(self.log)
+        read = n2kindex.Index.read(n2kindex.index_path(self.log))
+        self.assertEqual(read.size, built.size, msg='Expect the same size.')
+        self.assertEqual(list(read.offsets), list(built.offsets),
+                         msg='Expect the same checkpoints.')
+        self.assertEqual(read.pgns[129025][2], 60,
+                         msg='Expect the same PGN counts.')
+
+    def test_out_of_date(self):
+        """Index is rebuilt when the log file has grown."""
+        n2kindex.build_index(self.log)
+        write_log(self.log, seconds=90)
+        with self.assertLogs(level='INFO'):
+            index = n2kindex.load_index(self.log)
+        self.assertEqual(index.pgns[129025][2], 90,
+                         msg='Expect the index to cover the whole file.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:02:17 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+import zipfile
+import tempfile
+import n2klog
+
+LOG = ('timestamp,priority,pgn,source,destination,dlc,data\n'
+       '2020-10-04 21:48:20.582346,3,129029,9,255,8,80,2b,b3,6d,48,a0,e2,a8\n'
+       '2020-10-04 21:48:20.582912,3,129029,9,255,8,81,2e,80,7e,e4,8c,5e,63\n'
+       '2020-10-04 21:48:20.600000,2,127245,15,255,8,ff,ff,ff,7f,e1,fe,ff,ff\n'
+       'garbage\n'
+       '2020-10-04 21:48:20.700000,6,59904,1,255,3,00,ee,00\n')
+
+
+class TestParseLine(unittest.TestCase):
+    """Test cases for parse_line."""
+
+    def test_header(self):
+        """Header line is ignored."""
+        self.assertIsNone(n2klog.parse_line(LOG.splitlines()[0]),
+                          msg='Header line should not parse as a frame.')
+
+    def test_frame(self):
+        """A frame in plain format."""
+        frame = n2klog.parse_line(LOG.splitlines()[3])
+        self.assertEqual(frame[1:], (2, 127245, 15, 255,
+                                     bytes.fromhex('ffffff7fe1feffff')),
+                         msg='Expect priority, pgn, source, destination and '
+                         'data.')
+
+    def test_short_frame(self):
+        """A frame with fewer than 8 data bytes."""
+        frame = n2klog.parse_line(LOG.splitlines()[5])
+        self.assertEqual(frame[5], b'\x00\xee\x00',
+                         msg='Expect only dlc data bytes.')
+
+
+class TestFrameBits(unittest.TestCase):
+    """Test cases for frame_bits."""
+
+    def test_stuffing(self):
+        """Bits with none, typical and worst case bit stuffing."""
+        self.assertEqual(n2klog.frame_bits(8, 0), 131,
+                         msg='67 bits plus 8 per data byte.')
+        self.assertEqual(n2klog.frame_bits(8, 1), 160,
+                         msg='One stuff bit in four over 118 bits.')
+        self.assertEqual(n2klog.frame_bits(0), 73.5,
+                         msg='Half the worst case by default.')
+
+
+class TestDecodeLog(unittest.TestCase):
+    """Test cases for decode_log."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'foo.n2k')
+        with open(self.path, 'w') as file:
+            file.write(LOG)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_plain(self):
+        """Frames are grouped by PGN."""
+        pgns = n2klog.decode_log(self.path)
+        self.assertEqual(sorted(pgns), [59904, 127245, 129029],
+                         msg='Expect one entry for each PGN in the log.')
+        self.assertEqual(len(pgns[129029]), 2,
+                         msg='Expect two frames for 129029.')
+        self.assertEqual(pgns[59904].frame_data(0), b'\x00\xee\x00',
+                         msg='Short frames keep their length.')
+        self.assertEqual(list(pgns[127245].source), [15],
+                         msg='Expect source 15 for the rudder.')
+
+    def test_zip(self):
+        """Log file zipped by zip_logs."""
+        zip_path = f'{self.path}.zip'
+        with zipfile.ZipFile(zip_path, 'w') as log_zip:
+            log_zip.write(self.path)
+        pgns = n2klog.decode_log(zip_path)
+        self.assertEqual(len(pgns[129029]), 2,
+                         msg='Zipped log should decode the same as plain.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,60 +6,65 @@ Created on Sat Feb  6 16:36:01 2021
 @author: wmorland
 """
 
+import os
+import sys
+import tempfile
+import subprocess
+import threading
 import unittest
 from unittest.mock import patch
 from unittest.mock import call
-import subprocess
+from unittest.mock import MagicMock
+import can
+import n2klog
 import nmea
 
 
 class TestStartCanBus(unittest.TestCase):
     """Test cases for start_can_bus."""
 
-    @patch('subprocess.run', return_value=0,
-           side_effect=subprocess.CalledProcessError(256, 'ip'))
-    def test_run_fail(self, ip_call):
-        """start_can_bus() ip link set fails"""
+    @patch('canif.CANInterface')
+    def test_configure_fail(self, interface):
+        """start_can_bus() setting the bitrate fails"""
+        interface.return_value.is_running.return_value = False
+        interface.return_value.configure.side_effect = PermissionError(
+            1, 'Operation not permitted')
         with self.assertLogs(level='ERROR') as logs:
             bus = nmea.start_can_bus()
-        ip_call.assert_called_with('sudo ip link set can0 type can '
-                                   'bitrate 100000', check=True)
+        interface.return_value.configure.assert_called_with(
+            bitrate=100000, restart_ms=nmea.RESTART_MS)
         self.assertEqual(logs.output,
-                         ['ERROR:nmea:ip link set can0: FAIL',
-                          'ERROR:nmea:return code = 256'],
-                         msg='expect ERROR logged when ip link set fails.')
+                         ['ERROR:nmea:set can0 bitrate: FAIL',
+                          'ERROR:nmea:error = [Errno 1] Operation not '
+                          'permitted'],
+                         msg='expect ERROR logged when setting the bitrate '
+                             'fails.')
         self.assertIsNone(bus, msg='start_can_bus should return None if '
-                          'call to ip link set fails.')
-
-    @patch('subprocess.run')
-    def test_run2_fail(self, ip_call):
-        """start_can_bus() ifconfig fails"""
+                          'setting the bitrate fails.')
 
-        def subprocess_call_behaviour(*args, **kwargs):
-            if args[0] == 'sudo ip link set can0 type can bitrate 100000':
-                return 0
-            raise subprocess.CalledProcessError(256, 'ip')
-
-        ip_call.side_effect = subprocess_call_behaviour
+    @patch('canif.CANInterface')
+    def test_up_fail(self, interface):
+        """start_can_bus() setting the link up fails"""
+        interface.return_value.is_running.return_value = False
+        interface.return_value.set_up.side_effect = OSError(19,
+                                                            'No such device')
         with self.assertLogs(level='ERROR') as logs:
             bus = nmea.start_can_bus()
         self.assertEqual(logs.output,
-                         ['ERROR:nmea:ifconfig can0 up: FAIL',
-                          'ERROR:nmea:return code = 256'],
-                         msg='expect ERROR logged when ip link set fails.')
+                         ['ERROR:nmea:set can0 up: FAIL',
+                          'ERROR:nmea:error = [Errno 19] No such device'],
+                         msg='expect ERROR logged when set up fails.')
         self.assertIsNone(bus, msg='start_can_bus should return None if '
-                          'call to ifconfig fails.')
+                          'setting the link up fails.')
 
-    @patch('subprocess.run', return_value=0)
+    @patch('canif.CANInterface')
     @patch('can.interface.Bus')
-    def test_sucessful_start(self, can_bus, ip_call):
+    def test_sucessful_start(self, can_bus, interface):
         """start_can_bus() sucess."""
+        interface.return_value.is_running.return_value = False
         bus = nmea.start_can_bus()
-        expected_ip_calls = [call('sudo ip link set can0 type can bitrate '
-                                  '100000', check=True),
-                             call('sudo ifconfig can0 up', check=True)]
-        self.assertEqual(ip_call.call_args_list, expected_ip_calls,
-                         msg='Expected two successful subprocess calls.')
+        self.assertEqual(interface.return_value.set_up.call_args_list,
+                         [call(True)], msg='Expected the link set up.')
         self.assertEqual(can_bus.call_args_list,
                          [call(channel='can0', bustype='socketcan_ctypes')],
                          msg='Expected one successful call to create'
@@ -68,31 +73,39 @@ class TestStartCanBus(unittest.TestCase):
                              msg='start_can_bus should return a Bus object'
                                  'when called successfully')
 
+    @patch('canif.CANInterface')
+    @patch('can.interface.Bus')
+    def test_already_running(self, can_bus, interface):
+        """start_can_bus() leaves a running link alone."""
+        interface.return_value.is_running.return_value = True
+        bus = nmea.start_can_bus()
+        interface.return_value.configure.assert_not_called()
+        self.assertIsNotNone(bus, msg='start_can_bus should return a Bus.')
+
 
 class TestStopCanBus(unittest.TestCase):
     """Test cases for stop_can_bus."""
 
-    @patch('subprocess.run', return_value=0,
-           side_effect=subprocess.CalledProcessError(256, 'ip'))
-    def test_run_fail(self, ip_call):
-        """stop_can_bus() ifconfig fails"""
+    @patch('canif.CANInterface')
+    def test_run_fail(self, interface):
+        """stop_can_bus() setting the link down fails"""
+        interface.return_value.set_up.side_effect = OSError(19,
+                                                            'No such device')
         with self.assertLogs(level='ERROR') as logs:
             rc = nmea.stop_can_bus()
-            rc = nmea.stop_can_bus()
-        ip_call.assert_called_with('sudo ifconfig can0 down', check=True)
-        print(logs.output)
-#        self.assertEqual(logs.output,
-#                         ['ERROR:nmea:ifconfig can0 up: FAIL',
-#                          'ERROR:nmea:return code = 256'],
-#                         msg='expect ERROR logged when ip link set fails.')
-        self.assertIsNone(rc, msg='stop_can_bus should return None if call to'
-                          'ifconfig fails.')
-
-    @patch('subprocess.run', return_value=0)
-    def test_successful_stop(self, ip_call):
+        interface.return_value.set_up.assert_called_with(False)
+        self.assertEqual(logs.output,
+                         ['ERROR:nmea:set can0 down: FAIL',
+                          'ERROR:nmea:error = [Errno 19] No such device'],
+                         msg='expect ERROR logged when set down fails.')
+        self.assertIsNone(rc, msg='stop_can_bus should return None if '
+                          'setting the link down fails.')
+
+    @patch('canif.CANInterface')
+    def test_successful_stop(self, interface):
         """stop_can_bus() success"""
         rc = nmea.stop_can_bus()
-        ip_call.assert_called_with('sudo ifconfig can0 down', check=True)
+        interface.return_value.set_up.assert_called_with(False)
         self.assertIsNone(rc, msg='stop_can_bus should return None on '
                           'success.')
 
@@ -104,6 +117,24 @@ class TestSetFilters(unittest.TestCase):
         """Dummy test."""
         self.assertTrue(True, msg='Should always pass.')
 
+    def test_capture_pgns(self):
+        """The inventory and transport protocol PGNs get through."""
+        bus = MagicMock()
+        nmea.set_filters(bus)
+        filters = bus.set_filters.call_args[0][0]
+
+        def passes(arbitration_id):
+            return any(arbitration_id & f['can_mask']
+                       == f['can_id'] & f['can_mask'] for f in filters)
+
+        for pgn, destination in ((60928, 255), (60928, 12), (126996, 255),
+                                 (60416, 255), (60160, 7), (127245, 255)):
+            self.assertTrue(passes(n2klog.arbitration_id(6, pgn, 3,
+                                                         destination)),
+                            msg=f'Expect {pgn} to {destination} through.')
+        self.assertFalse(passes(n2klog.arbitration_id(6, 59904, 3)),
+                         msg='Expect ISO requests filtered out.')
+
 
 class TestGetGpsTime(unittest.TestCase):
     """Test cases for get_gps_time."""
@@ -113,5 +144,144 @@ class TestGetGpsTime(unittest.TestCase):
         self.assertTrue(True, msg='Should always pass.')
 
 
+class TestIsGpsTimeMessage(unittest.TestCase):
+    """Test cases for is_gps_time_message."""
+
+    def test_first_frame(self):
+        """The first frame of GNSS Position Data is a GPS time message."""
+        msg = can.Message(arbitration_id=0x0df80503,
+                          data=[0xa0, 0x2b, 0x01, 0x00, 0x00, 0x00, 0x00,
+                                0x00], is_extended_id=True)
+        self.assertTrue(nmea.is_gps_time_message(msg),
+                        msg='Expect frame counter 0 of PGN 129029.')
+
+    def test_not_gps_time(self):
+        """Later frames and other PGNs are not GPS time messages."""
+        later = can.Message(arbitration_id=0x0df80503,
+                            data=[0xa1, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
+                                  0x00], is_extended_id=True)
+        self.assertFalse(nmea.is_gps_time_message(later),
+                         msg='Expect frame counter 1 to be rejected.')
+        other = can.Message(arbitration_id=0x09f10d0f,
+                            data=[0x00] * 8, is_extended_id=True)
+        self.assertFalse(nmea.is_gps_time_message(other),
+                         msg='Expect PGN 127245 to be rejected.')
+
+
+class TestImports(unittest.TestCase):
+    """Test cases for the modules loaded by importing nmea."""
+
+    def test_lazy(self):
+        """The modules only capture uses are not run on import."""
+        names = ('canif', 'canmerge', 'addressclaim', 'isotp', 'inventory',
+                 'sourceselect')
+        code = ('import sys, types, nmea\n'
+                f'for name in {names!r}:\n'
+                '    if type(sys.modules[name]) is types.ModuleType:\n'
+                '        print(name)\n')
+        result = subprocess.run([sys.executable, '-c', code],
+                                cwd=os.path.dirname(nmea.__file__),
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout, '', msg='Expect none loaded.')
+
+
+class TestNMEA2000Frame(unittest.TestCase):
+    """Test cases for NMEA2000_Frame."""
+
+    def test_can_message(self):
+        """can_message rebuilds the original message."""
+        for arbitration_id in (0x09f10d0f, 0x18ea0c01):
+            msg = can.Message(timestamp=1601848100.5,
+                              arbitration_id=arbitration_id,
+                              data=[0xff, 0xff, 0xff, 0x7f, 0xe1, 0xfe, 0xff,
+                                    0xff], is_extended_id=True)
+            new = nmea.NMEA2000_Frame(msg).can_message()
+            self.assertEqual(new.arbitration_id, arbitration_id,
+                             msg='Expect the same arbitration id.')
+            self.assertAlmostEqual(new.timestamp, msg.timestamp, places=5,
+                                   msg='Expect the same timestamp.')
+            self.assertEqual(new.data, msg.data, msg='Expect the same data.')
+
+
+class StoppingBus:
+    """Bus giving out a list of messages, then setting stop."""
+
+    def __init__(self, messages, stop, channel='can0'):
+        self.messages = list(messages)
+        self.stop = stop
+        self.channel = channel
+        self.closed = False
+
+    def recv(self, timeout=None):
+        if self.messages:
+            return self.messages.pop(0)
+        self.stop.set()
+        return None
+
+    def shutdown(self):
+        self.closed = True
+
+
+class TestCaptureCanMessages(unittest.TestCase):
+    """Test cases for capture_can_messages."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_batches(self):
+        """Wanted PGNs are logged and given to listeners, the rest dropped."""
+        rudder = [can.Message(timestamp=1601844500.0 + i / 10,
+                              arbitration_id=0x09f10d0f,
+                              data=[0xff, 0xff, 0xff, 0x7f, 0xe1, 0xfe,
+                                    0xff, i], is_extended_id=True)
+                  for i in range(5)]
+        engine = can.Message(timestamp=1601844500.05,
+                             arbitration_id=0x0df20000,
+                             data=[0x00, 0x10, 0x27, 0xff, 0xff, 0xff, 0xff,
+                                   0xff], is_extended_id=True)
+        error = can.Message(timestamp=1601844500.15, is_error_frame=True)
+        stop = threading.Event()
+        bus = StoppingBus(rudder[:1] + [engine] + rudder[1:2] + [error]
+                          + rudder[2:], stop)
+        frames = []
+        loggers = []
+        with patch('nmea.stop_can_bus'), self.assertLogs(level='INFO'):
+            nmea.capture_can_messages(
+                bus, listeners=[frames.append], wanted_pgns={127245},
+                metrics_socket=os.path.join(self.directory.name,
+                                            'capture.sock'), stop=stop,
+                on_logger=loggers.append)
+        self.assertEqual([os.path.basename(logger.base_filename)
+                          for logger in loggers],
+                         ['foo.n2k'], msg='Expect the log handed over.')
+        self.assertEqual([(frame.arbitration_id, frame.data[7])
+                          for frame in frames],
+                         [(0x09f10d0f, i) for i in range(5)],
+                         msg='Expect the rudder frames in order.')
+        with open('foo.n2k') as file:
+            lines = file.readlines()
+        self.assertEqual(len(lines), 6, msg='Expect a header and 5 frames.')
+        self.assertTrue(all(',127245,' in line for line in lines[1:]),
+                        msg='Expect only rudder frames logged.')
+
+    def test_stop_interface(self):
+        """The interface captured is taken down, not can0."""
+        stop = threading.Event()
+        bus = StoppingBus([], stop, channel='vcan0')
+        with patch('nmea.stop_can_bus') as stop_can_bus, \
+                self.assertLogs(level='INFO'):
+            nmea.capture_can_messages(
+                bus, metrics_socket=os.path.join(self.directory.name,
+                                                 'capture.sock'), stop=stop)
+        stop_can_bus.assert_called_once_with('vcan0')
+        self.assertTrue(bus.closed, msg='Expect the bus shut down.')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 11:45:02 2026
+
+@author: wmorland
+"""
+
+import math
+import unittest
+from datetime import datetime, timezone
+import nmea0183
+
+RMC = '$GPRMC,123519.00,A,4807.038,N,01131.000,W,022.4,084.4,230326,003.1,W*6A'
+GGA = ('$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,'
+       '*47')
+VTG = '$GPVTG,054.7,T,034.4,M,005.5,N,010.2,K*48'
+
+
+def with_checksum(body):
+    """Add a valid checksum to a sentence without one."""
+    total = 0
+    for char in body[1:].encode('ascii'):
+        total ^= char
+    return f'{body}*{total:02X}'
+
+
+class TestParse(unittest.TestCase):
+    """Test cases for nmea0183.parse."""
+
+    def test_rmc(self):
+        """RMC gives position, speed and course in SI units and the date."""
+        fix = nmea0183.parse(with_checksum(RMC[:RMC.rfind('*')]) + '\r\n')
+        self.assertTrue(fix.valid, msg='Expect an active fix.')
+        self.assertAlmostEqual(fix.latitude, 48 + 7.038 / 60, places=6,
+                               msg='Expect degrees north.')
+        self.assertAlmostEqual(fix.longitude, -(11 + 31 / 60), places=6,
+                               msg='West is negative.')
+        self.assertAlmostEqual(fix.sog, 22.4 * 1852 / 3600, places=6,
+                               msg='Expect m/s.')
+        self.assertAlmostEqual(fix.cog, math.radians(84.4), places=6,
+                               msg='Expect radians.')
+        self.assertEqual(fix.time, 12 * 3600 + 35 * 60 + 19,
+                         msg='Expect seconds since midnight.')
+        self.assertEqual(fix.date, datetime(2026, 3, 23,
+                                            tzinfo=timezone.utc).timestamp(),
+                         msg='Expect midnight UTC of the date.')
+
+    def test_gga(self):
+        """GGA gives the fix quality, satellites and altitude."""
+        fix = nmea0183.parse(GGA)
+        self.assertEqual((fix.quality, fix.satellites), (1, 8),
+                         msg='Expect GPS fix from 8 satellites.')
+        self.assertEqual((fix.hdop, fix.altitude, fix.geoid),
+                         (0.9, 545.4, 46.9), msg='Expect metres.')
+
+    def test_vtg(self):
+        """VTG speed comes from km/h."""
+        fix = nmea0183.parse(VTG)
+        self.assertAlmostEqual(fix.sog, 10.2 / 3.6, places=6,
+                               msg='Expect m/s.')
+
+    def test_rejected(self):
+        """Bad checksums, other sentences and junk give None."""
+        for sentence in (GGA.replace('*47', '*48'), GGA[:40],
+                         '$GPGSV,3,1,11,03,03,111,00*74', '', 'junk'):
+            self.assertIsNone(nmea0183.parse(sentence),
+                              msg=f'Expect {sentence!r} rejected.')
+
+
+if __name__ == '__main__':
+    unittest.main()
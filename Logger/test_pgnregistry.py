@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 31 10:44:09 2026
+
+@author: wmorland
+"""
+
+import os
+import json
+import unittest
+import tempfile
+import n2kcodec
+import pgnregistry
+
+
+class TestPGNRegistry(unittest.TestCase):
+    """Test cases for PGNRegistry."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = os.path.join(self.directory.name, 'cache')
+        self.path = os.path.join(self.directory.name, 'pgns.json')
+        with open(n2kcodec.DEFINITIONS, 'r') as file:
+            self.definitions = json.load(file)
+        self.write()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self):
+        with open(self.path, 'w') as file:
+            json.dump(self.definitions, file)
+
+    def registry(self):
+        return pgnregistry.PGNRegistry(self.path, self.cache)
+
+    def test_cache(self):
+        """Compiled once, then loaded from the cache."""
+        first = self.registry()
+        self.assertIn(129025, first, msg='Expect position rapid update.')
+        self.assertFalse(first.from_cache, msg='Compiled the first time.')
+        second = self.registry()
+        self.assertEqual(len(second), len(self.definitions['PGNs']),
+                         msg='Expect every PGN.')
+        self.assertTrue(second.from_cache, msg='Then loaded from the cache.')
+        self.assertEqual(second.codec(129025).encode(latitude=1.0,
+                                                     longitude=2.0),
+                         first.codec(129025).encode(latitude=1.0,
+                                                    longitude=2.0),
+                         msg='The cached plan encodes the same.')
+
+    def test_lazy(self):
+        """Codecs are only made for the PGNs asked for."""
+        registry = self.registry()
+        registry.codec(127245)
+        self.assertIs(registry.codec(127245), registry.codec(127245),
+                      msg='Made once.')
+        self.assertEqual(list(registry.codecs), [127245],
+                         msg='Only the rudder codec made.')
+        self.assertIsNone(registry.get(59904), msg='Not defined.')
+
+    def test_changed_source(self):
+        """A changed database is compiled again and the old cache removed."""
+        self.registry().load()
+        del self.definitions['PGNs'][0]
+        self.write()
+        registry = self.registry()
+        self.assertNotIn(127245, registry, msg='Rudder removed.')
+        self.assertFalse(registry.from_cache, msg='Compiled again.')
+        self.assertEqual(len(os.listdir(self.cache)), 1,
+                         msg='Only the current cache kept.')
+
+    def test_corrupt_cache(self):
+        """A damaged cache file is rebuilt."""
+        self.registry().load()
+        name, = os.listdir(self.cache)
+        with open(os.path.join(self.cache, name), 'wb') as file:
+            file.write(b'\x00junk')
+        registry = self.registry()
+        self.assertIn(129029, registry, msg='Expect GNSS position data.')
+        self.assertFalse(registry.from_cache, msg='Compiled again.')
+
+
+if __name__ == '__main__':
+    unittest.main()
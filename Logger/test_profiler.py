@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 10:12:51 2026
+
+@author: wmorland
+"""
+
+import os
+import sys
+import gzip
+import time
+import unittest
+import threading
+import tempfile
+from unittest.mock import patch
+import profiler
+
+
+def busy_loop(seconds):
+    end = time.process_time() + seconds
+    total = 0
+    while time.process_time() < end:
+        total += sum(range(100))
+    return total
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test cases for SamplingProfiler."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_snapshot(self):
+        """Samples of a busy function end up in a folded stack snapshot."""
+        sampler = profiler.SamplingProfiler(self.directory.name,
+                                            interval=0.005)
+        sampler.start()
+        try:
+            busy_loop(0.3)
+        finally:
+            sampler.stop()
+        self.assertGreater(sampler.samples, 10, msg='Expect samples.')
+        names = os.listdir(self.directory.name)
+        self.assertEqual(len(names), 1, msg='Expect one snapshot.')
+        with gzip.open(os.path.join(self.directory.name, names[0]),
+                       'rt') as file:
+            text = file.read()
+        self.assertIn('test_profiler.py:busy_loop', text,
+                      msg='Expect the busy function in the stacks.')
+        top = profiler.top_functions(self.directory.name)
+        self.assertTrue(any('busy_loop' in row[0] for row in top[:3]),
+                        msg='Expect busy_loop near the top.')
+
+    def test_worker_thread(self):
+        """A profiler started in a worker thread samples that thread."""
+        sampler = profiler.SamplingProfiler(self.directory.name,
+                                            interval=0.005)
+
+        def work():
+            sampler.start()
+            try:
+                busy_loop(0.3)
+            finally:
+                sampler.stop()
+
+        worker = threading.Thread(target=work)
+        worker.start()
+        worker.join()
+        self.assertGreater(sampler.samples, 10, msg='Expect samples.')
+        top = profiler.top_functions(self.directory.name)
+        self.assertTrue(any('busy_loop' in row[0] for row in top[:3]),
+                        msg='Expect busy_loop near the top.')
+
+    def test_snapshot_while_sampling(self):
+        """No sample is lost when a snapshot is taken while counting."""
+        sampler = profiler.SamplingProfiler(self.directory.name,
+                                            max_bytes=1 << 30)
+        frame = sys._getframe()
+        done = threading.Event()
+
+        def count():
+            for _ in range(20000):
+                sampler._count(frame)
+            done.set()
+
+        worker = threading.Thread(target=count)
+        worker.start()
+        while not done.is_set():
+            sampler.snapshot()
+        worker.join()
+        sampler.snapshot()
+        total = 0
+        for name in os.listdir(self.directory.name):
+            with gzip.open(os.path.join(self.directory.name, name),
+                           'rt') as file:
+                total += sum(int(line.rpartition(' ')[2]) for line in file)
+        self.assertEqual(total, 20000, msg='Expect every sample written.')
+
+    def test_prune(self):
+        """The oldest snapshots are removed to stay under max_bytes."""
+        sampler = profiler.SamplingProfiler(self.directory.name,
+                                            max_bytes=2500)
+        for i in range(5):
+            path = os.path.join(self.directory.name,
+                                f'profile_{i}{profiler.SUFFIX}')
+            with open(path, 'wb') as file:
+                file.write(b'x' * 1000)
+            os.utime(path, (1000 + i, 1000 + i))
+        sampler.prune()
+        self.assertEqual(sorted(os.listdir(self.directory.name)),
+                         [f'profile_{i}{profiler.SUFFIX}' for i in (3, 4)],
+                         msg='Expect the two newest kept.')
+
+    def test_environment(self):
+        """Profiling is opt in."""
+        with patch.dict(os.environ):
+            os.environ.pop('RKRPROFILE', None)
+            self.assertIsNone(profiler.from_environment(),
+                              msg='Off by default.')
+            os.environ['RKRPROFILE'] = '1'
+            self.assertIsInstance(profiler.from_environment(),
+                                  profiler.SamplingProfiler,
+                                  msg='On when RKRPROFILE is set.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 17:30:05 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+import tempfile
+import n2klog
+import replay
+
+LOG = ('timestamp,priority,pgn,source,destination,dlc,data\n'
+       '2020-10-04 21:48:20.000000,2,127245,15,255,8,ff,ff,ff,7f,e1,fe,ff,ff\n'
+       '2020-10-04 21:48:20.001000,2,127245,15,255,8,ff,ff,ff,7f,e1,fe,ff,ff\n'
+       '2020-10-04 21:48:20.500000,6,59904,1,12,3,00,ee,00\n'
+       '2020-10-04 21:48:21.000000,2,127245,15,255,8,ff,ff,ff,7f,e1,fe,ff,ff\n')
+
+
+class FakeClock:
+    """Monotonic clock that only moves when slept."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestArbitrationId(unittest.TestCase):
+    """Test cases for n2klog.arbitration_id."""
+
+    def test_pdu2(self):
+        """Broadcast PGN matches the rudder frame sent by can-send."""
+        self.assertEqual(n2klog.arbitration_id(2, 127245, 15),
+                         0b010_01_11110001_00001101_00001111,
+                         msg='Expect the can-send rudder arbitration id.')
+
+    def test_pdu1(self):
+        """Addressed PGN carries the destination."""
+        self.assertEqual(n2klog.arbitration_id(6, 59904, 1, 12),
+                         0x18ea0c01, msg='Expect ISO request to 12 from 1.')
+
+
+class TestReplay(unittest.TestCase):
+    """Test cases for replay."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.directory.name, 'foo.n2k')
+        with open(self.log, 'w') as file:
+            file.write(LOG)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_real_time(self):
+        """Frames close together share one sleep."""
+        fake = FakeClock()
+        sent = []
+        stats = replay.replay(replay.read_messages(self.log),
+                              lambda *frame: sent.append(frame),
+                              clock=fake.clock, sleep=fake.sleep)
+        self.assertEqual(stats.frames, 4, msg='Expect four frames sent.')
+        self.assertEqual(len(fake.sleeps), 2,
+                         msg='Expect no sleep for the frame 1ms later.')
+        self.assertAlmostEqual(fake.now, 1.0,
+                               msg='Expect replay to take one second.')
+        self.assertEqual(sent[2][1], 0x18ea0c01,
+                         msg='Expect arbitration id rebuilt from the log.')
+
+    def test_speed(self):
+        """Ten times real time."""
+        fake = FakeClock()
+        replay.replay(replay.read_messages(self.log), lambda *frame: None,
+                      speed=10, clock=fake.clock, sleep=fake.sleep)
+        self.assertAlmostEqual(fake.now, 0.1,
+                               msg='Expect replay to take 0.1 second.')
+
+    def test_fast(self):
+        """As fast as possible never sleeps."""
+        fake = FakeClock()
+        stats = replay.replay(replay.read_messages(self.log),
+                              lambda *frame: None, speed=0,
+                              clock=fake.clock, sleep=fake.sleep)
+        self.assertEqual(fake.sleeps, [], msg='Expect no sleeps.')
+        self.assertEqual(stats.frames, 4, msg='Expect four frames sent.')
+
+
+if __name__ == '__main__':
+    unittest.main()
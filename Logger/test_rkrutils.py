@@ -6,7 +6,9 @@ Created on Wed Feb 17 20:14:14 2021
 @author: wmorland
 """
 
+import os
 import unittest
+import tempfile
 from unittest.mock import patch
 import zipfile
 import rkrutils
@@ -92,6 +94,29 @@ class TestSendToUSB(unittest.TestCase):
                           '/media/usb'],
                          msg='expect WARNING logged when drive not mounted')
 
+    def test_sidecars(self):
+        """The sidecars of each log go to USB with it."""
+        with tempfile.TemporaryDirectory() as pi, \
+                tempfile.TemporaryDirectory() as usb:
+            log = 'foo_2026-10-20T101500_#000.n2k'
+            names = [log, 'foo.n2k', 'notes.txt']
+            names += [os.path.basename(path)
+                      for path in rkrutils.sidecar_paths(log)]
+            for name in names:
+                with open(os.path.join(pi, name), 'w') as file:
+                    file.write(name)
+            with patch('os.getenv', return_value=usb), \
+                    patch('os.path.ismount', return_value=True), \
+                    self.assertLogs(level='INFO'):
+                rkrutils.send_to_usb(pi)
+            self.assertEqual(os.listdir(pi), ['notes.txt'],
+                             msg='Expect only the other file left.')
+            moved = [name for name in names if name != 'notes.txt']
+            self.assertEqual(sorted(os.listdir(usb)), sorted(moved),
+                             msg='Expect the logs and every sidecar moved.')
+            self.assertIn('foo_2026-10-20T101500_#000.devices.json',
+                          os.listdir(usb), msg='Expect the device table.')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 14:35:51 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+from types import SimpleNamespace
+import livestate
+import shmstate
+
+RUDDER_ID = 0b010_01_11110001_00001101_00001111
+
+
+class TestSharedState(unittest.TestCase):
+    """Test cases for SharedStatePublisher and SharedStateReader."""
+
+    def setUp(self):
+        self.name = f'rkr-test-{os.getpid()}'
+        self.state = livestate.LiveState(seconds=10)
+        self.publisher = shmstate.SharedStatePublisher(self.state, self.name,
+                                                       interval=1.0)
+
+    def tearDown(self):
+        self.publisher.close()
+
+    def test_publish(self):
+        """Latest values and counters are visible to a reader."""
+        for i in range(3):
+            msg = SimpleNamespace(timestamp=100.0 + i * 0.1,
+                                  arbitration_id=RUDDER_ID,
+                                  data=bytearray([0xff] * 4
+                                                 + [0xe1, 0xfe, 0xff, 0xff]))
+            self.state(msg)
+            self.publisher(msg)
+        self.publisher.publish()
+        state = shmstate.read_state(self.name)
+        self.assertEqual(state['frames'], 3, msg='Expect three frames.')
+        self.assertEqual(state['pid'], os.getpid(), msg='Expect logger pid.')
+        self.assertEqual(list(state['channels']), ['rudder_position'],
+                         msg='Only channels with data are returned.')
+        self.assertAlmostEqual(state['channels']['rudder_position'][1],
+                               -0.0287, msg='Expect the rudder position.')
+
+    def test_rollovers(self):
+        """The rollover count of the rotating logger is published."""
+        name = f'rkr-rollovers-{os.getpid()}'
+        rotating_logger = SimpleNamespace(rollover_count=2)
+        state, publisher = shmstate.new_publisher(
+            name, rotating_logger=rotating_logger, seconds=10)
+        try:
+            self.assertEqual(shmstate.read_state(name)['rollovers'], 2,
+                             msg='Expect the rollover count.')
+            rotating_logger.rollover_count = 3
+            publisher.publish()
+            self.assertEqual(shmstate.read_state(name)['rollovers'], 3,
+                             msg='Expect the updated rollover count.')
+        finally:
+            publisher.close()
+
+    def test_write_in_progress(self):
+        """Reader gives up while the sequence stays odd."""
+        shmstate.SEQUENCE.pack_into(self.publisher.buf,
+                                    shmstate.SEQUENCE_OFFSET, 7)
+        reader = shmstate.SharedStateReader(self.name)
+        try:
+            self.assertIsNone(reader.read(retries=3),
+                              msg='Expect None while a write is in progress.')
+        finally:
+            reader.close()
+
+    def test_not_running(self):
+        """No block when the logger is not running."""
+        self.assertIsNone(shmstate.read_state('rkr-test-missing'),
+                          msg='Expect None when there is no block.')
+
+
+if __name__ == '__main__':
+    unittest.main()
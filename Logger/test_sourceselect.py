@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Nov  2 11:05:18 2026
+
+@author: wmorland
+"""
+
+import os
+import unittest
+import tempfile
+import n2klog
+import pgnregistry
+import sourceselect
+import traffic
+
+SPEED = 128259
+
+
+class TestSourceSelector(unittest.TestCase):
+    """Test cases for SourceSelector."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.registry = pgnregistry.PGNRegistry(directory=cls.directory.name)
+
+    def speed(self, value):
+        return self.registry.codec(SPEED).encode(sid=0,
+                                                 speedWaterReferenced=value)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def selector(self, **kwargs):
+        return sourceselect.SourceSelector(registry=self.registry, **kwargs)
+
+    def run_sources(self, selector, start, end, sources):
+        """Feed frames, sources maps source to (period, value)."""
+        passed = {}
+        for source, (period, value) in sources.items():
+            for i in range(int((end - start) / period)):
+                t = start + i * period
+                passed.setdefault(source, []).append((t, value))
+        frames = sorted((t, source, value)
+                        for source, items in passed.items()
+                        for t, value in items)
+        kept = {}
+        for t, source, value in frames:
+            if selector.update(t, SPEED, source, self.speed(value)):
+                kept[source] = kept.get(source, 0) + 1
+        return kept
+
+    def test_faster_source_wins(self):
+        """A source at twice the rate takes over after the hold time."""
+        selector = self.selector()
+        kept = self.run_sources(selector, 0.0, 10.0,
+                                {11: (0.4, 3.0), 12: (0.2, 3.0)})
+        self.assertEqual(selector.primaries(), {(SPEED, None): 12},
+                         msg='Expect the faster source.')
+        self.assertEqual([c.reason for c in selector.changes],
+                         ['first', 'score'], msg='One change on score.')
+        self.assertGreater(kept[12], kept[11],
+                           msg='Mostly frames from 12 kept.')
+
+    def test_failover(self):
+        """When the primary stops the other source takes over."""
+        selector = self.selector()
+        self.run_sources(selector, 0.0, 5.0, {11: (0.2, 3.0), 12: (0.2, 3.1)})
+        self.assertEqual(selector.primaries()[(SPEED, None)], 11,
+                         msg='Similar sources, no flapping.')
+        self.run_sources(selector, 5.0, 10.0, {12: (0.2, 3.1)})
+        self.assertEqual(selector.changes[-1][3:], (12, 11, 'failover'),
+                         msg='Expect failover to 12.')
+
+    def test_implausible(self):
+        """A source sending impossible speeds loses to a sensible one."""
+        selector = self.selector()
+        self.run_sources(selector, 0.0, 20.0,
+                         {11: (0.2, 99.0), 12: (0.2, 3.0)})
+        self.assertEqual(selector.primaries()[(SPEED, None)], 12,
+                         msg='Expect the plausible source.')
+
+    def test_channels(self):
+        """Rudder instances are separate channels, other PGNs pass."""
+        selector = self.selector()
+        port = bytes([0]) + traffic._rudder(0.0)[1:]
+        starboard = bytes([1]) + traffic._rudder(0.0)[1:]
+        self.assertTrue(selector.update(0.0, 127245, 1, port), msg='First.')
+        self.assertTrue(selector.update(0.0, 127245, 15, starboard),
+                        msg='First of another instance.')
+        self.assertFalse(selector.update(0.1, 127245, 15, port),
+                         msg='Second source of instance 0.')
+        self.assertTrue(selector.update(0.1, 129025, 9, b'\x00' * 8),
+                        msg='Not selected.')
+
+    def test_select_pgns(self):
+        """Decoded logs keep the frames of the primary and the selections."""
+        pgns = {SPEED: n2klog.PGNFrames(SPEED),
+                129025: n2klog.PGNFrames(129025)}
+        for i in range(50):
+            for source in (11, 12):
+                pgns[SPEED].append(i * 0.2, 2, source, 255,
+                                   self.speed(3.0))
+        pgns[129025].append(0.0, 2, 9, 255, bytes(8))
+        selector = self.selector()
+        selected = sourceselect.select_pgns(pgns, selector)
+        self.assertEqual(set(selected[SPEED].source), {11},
+                         msg='Only source 11 kept.')
+        self.assertIs(selected[129025], pgns[129025], msg='Passed through.')
+        with tempfile.TemporaryDirectory() as directory:
+            log = os.path.join(directory, 'foo.n2k')
+            record = sourceselect.SelectionLog(
+                sourceselect.selection_log_path(log))
+            for selection in selector.changes:
+                record(selection)
+            self.assertEqual(sourceselect.read_selections(log),
+                             selector.changes, msg='Expect them read back.')
+
+
+if __name__ == '__main__':
+    unittest.main()
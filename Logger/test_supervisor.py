@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 11:32:40 2026
+
+@author: wmorland
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+import supervisor
+
+RUDDER_ID = 0b010_01_11110001_00001101_00001111
+
+
+class FakeUPS:
+    """UPS whose external power goes after a number of checks."""
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    def voltage(self):
+        return 4.1
+
+    def capacity(self):
+        return 90.0
+
+    def external_power(self):
+        self.checks -= 1
+        return self.checks > 0
+
+
+def fake_capture(stopped):
+    """Capture loop that runs until stop is set, like capture_can_messages."""
+    def capture(bus, stop, listeners=()):
+        while not stop.is_set():
+            time.sleep(0.005)
+        stopped.append(bus)
+    return capture
+
+
+class TestSupervisor(unittest.TestCase):
+    """Test cases for Supervisor and its tasks."""
+
+    def test_power_loss(self):
+        """Power loss stops capture cleanly before returning."""
+        stopped = []
+        sup = supervisor.Supervisor(bus='bus')
+        sup.add('capture', supervisor.capture_task(fake_capture(stopped)))
+        sup.add('power', supervisor.power_task(FakeUPS(3), interval=0.01))
+        with self.assertLogs('supervisor', level='INFO'):
+            reason = asyncio.run(sup.run(handle_signals=False))
+        self.assertEqual(reason, supervisor.POWER_LOST,
+                         msg='Expect shutdown for power loss.')
+        self.assertEqual(stopped, ['bus'],
+                         msg='Capture got the shared bus and stopped.')
+
+    def test_task_failure(self):
+        """A task that fails shuts the others down."""
+        async def broken(sup):
+            raise RuntimeError('broken')
+
+        async def waiting(sup):
+            await sup.events.shutdown.wait()
+
+        sup = supervisor.Supervisor()
+        sup.add('broken', broken)
+        sup.add('waiting', waiting)
+        with self.assertLogs('supervisor', level='ERROR'):
+            reason = asyncio.run(sup.run(handle_signals=False))
+        self.assertEqual(reason, 'broken failed',
+                         msg='Expect the failed task as the reason.')
+
+    def test_events(self):
+        """Published events reach subscribers."""
+        received = []
+
+        async def listener(sup):
+            queue = sup.events.subscribe('move-logs')
+            received.append(await queue.get())
+            sup.events.request_shutdown('done')
+
+        async def sender(sup):
+            await asyncio.sleep(0)
+            sup.events.publish('move-logs', 'now')
+
+        sup = supervisor.Supervisor()
+        sup.add('listener', listener)
+        sup.add('sender', sender)
+        with self.assertLogs('supervisor', level='INFO'):
+            reason = asyncio.run(sup.run(handle_signals=False))
+        self.assertEqual(received, ['now'], msg='Expect the payload.')
+        self.assertEqual(reason, 'done', msg='Expect the listener reason.')
+
+
+class TestLiveState(unittest.TestCase):
+    """Test cases for the live state published by the supervisor."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_capture_publishes(self):
+        """Capture on a virtual bus is readable as logger-state reads it."""
+        import can
+        import shmstate
+        name = f'rkr-test-{os.getpid()}'
+        channel = f'rkr-test-{os.getpid()}'
+        bus = can.interface.Bus(channel=channel, bustype='virtual')
+        sender = can.interface.Bus(channel=channel, bustype='virtual')
+        states = []
+
+        async def reader(sup):
+            loop = asyncio.get_running_loop()
+            for _ in range(200):
+                await loop.run_in_executor(None, sender.send, can.Message(
+                    arbitration_id=RUDDER_ID, is_extended_id=True,
+                    data=[0xff] * 4 + [0xe1, 0xfe, 0xff, 0xff]))
+                state = shmstate.read_state(name)
+                if state is not None and state['channels']:
+                    states.append(state)
+                    break
+                if await sup.wait_shutdown(0.01):
+                    break
+            sup.events.request_shutdown('done')
+
+        sup = supervisor.Supervisor(bus=bus)
+        publisher = supervisor.publish_live_state(sup, name, seconds=10)
+        sup.add('capture', supervisor.capture_task(
+            metrics_socket=os.path.join(self.directory.name, 'capture.sock')))
+        sup.add('reader', reader)
+        try:
+            with patch('nmea.stop_can_bus'), self.assertLogs(level='INFO'):
+                asyncio.run(sup.run(handle_signals=False))
+        finally:
+            publisher.close()
+            sender.shutdown()
+            bus.shutdown()
+        self.assertEqual(len(states), 1, msg='Expect the state published.')
+        self.assertAlmostEqual(states[0]['channels']['rudder_position'][1],
+                               -0.0287, places=6,
+                               msg='Expect the rudder angle.')
+        self.assertEqual(states[0]['pid'], os.getpid(),
+                         msg='Expect this process as the logger.')
+        self.assertIsNone(shmstate.read_state(name),
+                          msg='Expect the block removed on shutdown.')
+
+
+class TestMain(unittest.TestCase):
+    """Test cases for main."""
+
+    def test_gps_without_capture(self):
+        """The bus is opened for the GPS bridge when capture is off."""
+        import can
+        bus = can.interface.Bus(channel=f'rkr-test-{os.getpid()}',
+                                bustype='virtual')
+        buses = []
+
+        def fake_gps(port):
+            async def gps(sup):
+                buses.append(sup.bus)
+                sup.events.request_shutdown('done')
+            return gps
+
+        with patch('nmea.start_can_buses', return_value=bus) as start, \
+                patch('supervisor.gps_task', fake_gps), \
+                self.assertLogs(level='INFO'):
+            status = supervisor.main(capture=False, power=False,
+                                     gps_port='/dev/rfcomm0')
+        self.assertEqual(status, 0, msg='Expect a clean exit.')
+        start.assert_called_once_with(('can0',))
+        self.assertEqual(buses, [bus], msg='Expect the GPS task given a bus.')
+        with self.assertRaises(can.CanOperationError,
+                               msg='Expect the bus shut down.'):
+            bus.send(can.Message(arbitration_id=RUDDER_ID))
+
+
+if __name__ == '__main__':
+    unittest.main()
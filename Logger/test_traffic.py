@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 11:04:12 2026
+
+@author: wmorland
+"""
+
+import unittest
+from collections import Counter
+import livestate
+import n2klog
+import traffic
+
+
+class TestTrafficGenerator(unittest.TestCase):
+    """Test cases for TrafficGenerator."""
+
+    def test_profile_rates(self):
+        """PGNs arrive at their documented rates."""
+        frames = list(traffic.TrafficGenerator().frames(10.0))
+        pgns = Counter(livestate.pgn_from_id(f[1]) for f in frames)
+        self.assertAlmostEqual(pgns[130306], 300, delta=10,
+                               msg='Wind from three sources at 10Hz.')
+        self.assertAlmostEqual(pgns[129029], 70, delta=7,
+                               msg='Seven frame fast packet at 1Hz.')
+        times = [f[0] for f in frames]
+        self.assertEqual(times, sorted(times), msg='Frames are in order.')
+        self.assertTrue(all(len(f[2]) == 8 for f in frames),
+                        msg='Every frame has 8 bytes.')
+
+    def test_load(self):
+        """Filler traffic brings the bus up to the target load."""
+        generator = traffic.TrafficGenerator(load=1.0)
+        self.assertAlmostEqual(generator.load(), 1.0, places=2,
+                               msg='Expect 100% load.')
+        frames = list(generator.frames(1.0))
+        bits = sum(n2klog.frame_bits(len(f[2])) for f in frames)
+        self.assertAlmostEqual(bits / n2klog.BITRATE, 1.0, delta=0.05,
+                               msg='Generated frames fill the bus.')
+
+    def test_burst(self):
+        """Bursts are back to back."""
+        generator = traffic.TrafficGenerator(burst_size=20, jitter=0)
+        frames = [f for f in generator.frames(2.0)
+                  if livestate.pgn_from_id(f[1]) == 65280]
+        self.assertEqual(len(frames), 40, msg='Two bursts of 20 frames.')
+        self.assertEqual(frames[0][0], frames[19][0],
+                         msg='Burst frames share a timestamp.')
+
+
+if __name__ == '__main__':
+    unittest.main()
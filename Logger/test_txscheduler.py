@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 29 10:31:52 2026
+
+@author: wmorland
+"""
+
+import time
+import unittest
+import txscheduler
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBus:
+    """Bus without a broadcast manager."""
+
+    channel_info = 'virtual channel'
+
+    def send_periodic(self, msg, period):
+        raise OSError('no BCM')
+
+
+class TestTxScheduler(unittest.TestCase):
+    """Test cases for the timer thread fallback of TxScheduler."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sent = []
+        self.scheduler = txscheduler.TxScheduler(
+            FakeBus(), send=lambda t, i, d: self.sent.append((i, d)),
+            clock=self.clock)
+
+    def test_no_bcm(self):
+        """Only SocketCAN buses use the BCM."""
+        self.assertFalse(txscheduler.has_bcm(FakeBus()), msg='Virtual bus.')
+        self.assertFalse(self.scheduler.bcm, msg='Timer thread expected.')
+
+    def test_periods(self):
+        """Messages are sent at their own periods and updates take effect."""
+        s = self.scheduler
+        s.add('rudder', 1, b'\x01', 0.1)
+        s.add('wind', 2, b'\x02', 0.25)
+        for step in range(10):
+            self.clock.now = step * 0.1 + 1e-9
+            s.run_pending()
+        ids = [i for i, _ in self.sent]
+        self.assertEqual(ids.count(1), 10, msg='Rudder at 10Hz.')
+        self.assertEqual(ids.count(2), 4, msg='Wind at 4Hz.')
+        s.update('rudder', b'\x03')
+        self.clock.now = 1.0 + 1e-9
+        self.assertAlmostEqual(s.run_pending(), 0.1, places=6,
+                               msg='Next due is the rudder.')
+        self.assertIn((1, b'\x03'), self.sent[-2:], msg='Updated payload.')
+
+    def test_remove_and_late(self):
+        """Removed messages stop, a stalled timer skips rather than bursts."""
+        s = self.scheduler
+        s.add('rudder', 1, b'\x01', 0.1)
+        s.add('wind', 2, b'\x02', 0.1)
+        s.remove('wind')
+        self.clock.now = 1.0
+        s.run_pending()
+        self.assertEqual(self.sent, [(1, b'\x01')], msg='One frame, no burst.')
+        self.assertEqual(s.late, 1, msg='Counted as late.')
+
+    def test_thread(self):
+        """The timer thread sends until stopped."""
+        scheduler = txscheduler.TxScheduler(
+            FakeBus(), send=lambda t, i, d: self.sent.append((i, d)))
+        scheduler.add('rudder', 1, b'\x01', 0.01)
+        scheduler.start()
+        time.sleep(0.1)
+        scheduler.stop()
+        count = len(self.sent)
+        self.assertGreater(count, 3, msg='Expect several frames.')
+        time.sleep(0.05)
+        self.assertEqual(len(self.sent), count, msg='Nothing after stop.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 09:10:38 2026
+
+@author: wmorland
+
+Synthetic NMEA 2000 traffic for performance testing without a boat.
+
+The generator produces the mix of PGNs listed in the Logger README at their
+documented rates and sources, including the fast packet GNSS Position Data
+129029.  Extra filler traffic from PGNs the logger filters out can be added to
+bring the bus up to any load, up to 100% of 250 kbit/s, and bursts of back to
+back frames can be mixed in.  All streams are interleaved by due time.
+
+Frames are (timestamp, arbitration_id, data) tuples, the same as
+replay.read_messages, so replay.replay can pace them onto a bus.
+"""
+
+import math
+import heapq
+import random
+import struct
+import n2klog
+import n2kcodec
+
+
+def _sid(t):
+    return int(t * 10) % 253
+
+
+RUDDER = n2kcodec.codec(127245)
+HEADING = n2kcodec.codec(127250)
+RATE_OF_TURN = n2kcodec.codec(127251)
+HEAVE = n2kcodec.codec(127252)
+ATTITUDE = n2kcodec.codec(127257)
+SPEED = n2kcodec.codec(128259)
+POSITION_RAPID = n2kcodec.codec(129025)
+COG_SOG_RAPID = n2kcodec.codec(129026)
+GNSS_POSITION = n2kcodec.codec(129029)
+WIND = n2kcodec.codec(130306)
+
+
+# Payload builders for the PGNs in the README, called with the time in
+# seconds since the start.  Values wander slowly so that decoders see changes.
+def _rudder(t):
+    return RUDDER.encode(instance=0, position=0.1 * math.sin(t / 5))
+
+
+def _heading(t):
+    return HEADING.encode(sid=_sid(t), heading=(t / 50) % 6.28, reference=1)
+
+
+def _rate_of_turn(t):
+    return RATE_OF_TURN.encode(sid=_sid(t), rate=0.01 * math.sin(t))
+
+
+def _heave(t):
+    return HEAVE.encode(sid=_sid(t), heave=0.2 * math.sin(t))
+
+
+def _attitude(t):
+    return ATTITUDE.encode(sid=_sid(t), pitch=0.05 * math.sin(t / 3),
+                           roll=0.3 * math.sin(t / 7))
+
+
+def _speed(t):
+    return SPEED.encode(sid=_sid(t), speedWaterReferenced=3 + math.sin(t / 20),
+                        speedWaterReferencedType=0, speedDirection=0)
+
+
+def _position(t):
+    return POSITION_RAPID.encode(latitude=44.6 + t * 1e-6,
+                                 longitude=-63.5 + t * 1e-6)
+
+
+def _cog_sog(t):
+    return COG_SOG_RAPID.encode(sid=_sid(t), cogReference=0, cog=1.5, sog=3)
+
+
+def _gnss_position(t):
+    days, seconds = divmod(1601848100 + t, 86400)
+    return GNSS_POSITION.encode(
+        sid=_sid(t), date=int(days), time=seconds, latitude=44.6,
+        longitude=-63.5, altitude=0, gnssType=2, method=1, integrity=0,
+        numberOfSvs=8, hdop=0.9, pdop=1.5, geoidalSeparation=-20.0,
+        referenceStations=0)
+
+
+def _date_time(t):
+    # 129033 is not in pgns.json, so packed by hand
+    days, seconds = divmod(1601848100 + t, 86400)
+    return struct.pack('<HIh', int(days), int(seconds / 0.0001), 0)
+
+
+def _wind(t):
+    return WIND.encode(sid=_sid(t), windSpeed=8 + math.sin(t / 10),
+                       windAngle=0.7, reference='Apparent')
+
+
+def _filler(t):
+    return bytes([_sid(t), 0xff, 0xff, 0xff, 0xff, 0xff, 0xff, 0xff])
+
+
+# pgn, priority, period in seconds, sources, payload builder
+PROFILE = (
+    (127245, 2, 0.1, (1, 15), _rudder),
+    (127250, 2, 0.1, (2,), _heading),
+    (127251, 2, 0.1, (2,), _rate_of_turn),
+    (127252, 3, 0.1, (2,), _heave),
+    (127257, 3, 0.1, (2,), _attitude),
+    (128259, 2, 0.2, (11, 12), _speed),
+    (129025, 2, 0.1, (9,), _position),
+    (129026, 2, 0.5, (9,), _cog_sog),
+    (129029, 3, 1.0, (9,), _gnss_position),
+    (129033, 3, 10.0, (9, 12), _date_time),
+    (130306, 2, 0.1, (12, 16, 17), _wind),
+    )
+
+# PGNs the logger filters out, used to fill the bus up to the target load.
+FILLER = (
+    (130310, 5, (35,)),
+    (128267, 3, (11,)),
+    (129539, 6, (9,)),
+    (65280, 7, (4,)),
+    )
+
+
+class Stream:
+    """One PGN from one source at a fixed period."""
+
+    __slots__ = ('pgn', 'arbitration_id', 'period', 'build', 'spacing',
+                 'segmenter', 'count')
+
+    def __init__(self, pgn, priority, source, period, build, spacing=0.0005,
+                 count=1):
+        self.pgn = pgn
+        self.arbitration_id = n2klog.arbitration_id(priority, pgn, source)
+        self.period = period
+        self.build = build
+        self.spacing = spacing
+        self.segmenter = n2kcodec.FastPacketSegmenter()
+        self.count = count
+
+    def frames(self, t):
+        """Data for each frame of the next message."""
+        frames = []
+        for _ in range(self.count):
+            payload = self.build(t)
+            if len(payload) > 8:
+                # Copied, the segmenter reuses its buffer for the next one
+                frames.extend(bytes(frame) for frame in
+                              self.segmenter.segment(payload))
+            else:
+                frames.append(payload)
+        return frames
+
+    def bits_per_second(self, stuffing=0.5):
+        """Bus bits per second used by this stream."""
+        frames = self.frames(0.0)
+        self.segmenter.sequence = 0
+        return sum(n2klog.frame_bits(len(f), stuffing)
+                   for f in frames) / self.period
+
+
+class TrafficGenerator:
+    """
+    Interleaved synthetic NMEA 2000 traffic.
+
+    Parameters
+    ----------
+    load : float, optional
+        Target bus load as a fraction of bitrate, 0 to 1.0.  Filler traffic is
+        added to reach it.  None for the README profile only.
+    bitrate : int, optional
+        The default is 250000.
+    burst_size : int, optional
+        Frames in each burst of back to back filler.  The default is 0, no
+        bursts.
+    burst_interval : float, optional
+        Seconds between bursts.  The default is 1.0.
+    jitter : float, optional
+        Random variation of each period as a fraction.  The default is 0.05.
+    seed : int, optional
+        Random seed so runs can be repeated.  The default is 0.
+    """
+
+    def __init__(self, load=None, bitrate=n2klog.BITRATE, burst_size=0,
+                 burst_interval=1.0, jitter=0.05, seed=0, profile=PROFILE):
+        self.bitrate = bitrate
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.streams = [Stream(pgn, priority, source, period, build)
+                        for pgn, priority, period, sources, build in profile
+                        for source in sources]
+        if burst_size:
+            pgn, priority, sources = FILLER[-1]
+            self.streams.append(Stream(pgn, priority, sources[0],
+                                       burst_interval, _filler, spacing=0.0,
+                                       count=burst_size))
+        self.profile_load = self.load()
+        if load is not None and load > self.profile_load:
+            spare = (load - self.profile_load) * bitrate
+            rate = spare / n2klog.frame_bits(8) / len(FILLER)
+            for pgn, priority, sources in FILLER:
+                self.streams.append(Stream(pgn, priority, sources[0],
+                                           1 / rate, _filler))
+
+    def load(self):
+        """Expected bus load of the streams as a fraction of bitrate."""
+        return sum(stream.bits_per_second()
+                   for stream in self.streams) / self.bitrate
+
+    def frames(self, duration, start=0.0):
+        """
+        Generate frames in time order.
+
+        Parameters
+        ----------
+        duration : float
+            Seconds of traffic.
+        start : float, optional
+            Timestamp of the first frame.  The default is 0.
+
+        Yields
+        ------
+        tuple
+            (timestamp, arbitration_id, data)
+
+        """
+        # Entries are (due, order, stream, data).  data is None when the
+        # stream's next message is due, otherwise it is a queued frame.
+        heap = []
+        order = 0
+        for stream in self.streams:
+            heapq.heappush(heap, (self.random.uniform(0, stream.period),
+                                  order, stream, None))
+            order += 1
+        while heap:
+            due, _, stream, data = heapq.heappop(heap)
+            if due >= duration:
+                break
+            if data is not None:
+                yield start + due, stream.arbitration_id, data
+                continue
+            frames = stream.frames(due)
+            yield start + due, stream.arbitration_id, frames[0]
+            for k, data in enumerate(frames[1:], start=1):
+                heapq.heappush(heap, (due + k * stream.spacing, order,
+                                      stream, data))
+                order += 1
+            period = stream.period * (1 + self.random.uniform(-self.jitter,
+                                                              self.jitter))
+            heapq.heappush(heap, (due + period, order, stream, None))
+            order += 1
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 29 09:14:27 2026
+
+@author: wmorland
+
+Periodic transmission of CAN frames for simulated instruments.
+
+A Python loop sending each frame and sleeping uses CPU for every frame and
+the sleeps jitter.  On SocketCAN the kernel broadcast manager, BCM, can send a
+frame on a timer with no help from userspace, python-can exposes it as
+bus.send_periodic, and the payload can be changed while it runs with
+modify_data.  So each periodic message is handed to the BCM and a simulated
+instrument only has to wake up when its value changes.
+
+When the BCM is not available, e.g. a virtual bus or another interface,
+python-can would start a thread per message.  Instead every message goes on
+one heap ordered by due time, served by a single timer thread.
+"""
+
+import time
+import heapq
+import logging
+import threading
+
+
+def has_bcm(bus):
+    """True if the bus is a SocketCAN bus that can use the broadcast manager."""
+    return str(getattr(bus, 'channel_info', '')).startswith('socketcan')
+
+
+class Periodic:
+    """A message sent by the timer thread."""
+
+    __slots__ = (
+        'arbitration_id',
+        'data',
+        'period',
+        'generation',
+        'task'
+        )
+
+    def __init__(self, arbitration_id, data, period, generation, task=None):
+        self.arbitration_id = arbitration_id
+        self.data = data
+        self.period = period
+        self.generation = generation
+        self.task = task
+
+
+class TxScheduler:
+    """
+    Send messages periodically with the kernel BCM or one timer thread.
+
+    Parameters
+    ----------
+    bus : can.BusABC
+    bcm : bool, optional
+        Use the broadcast manager.  By default it is used on SocketCAN.
+    send : callable, optional
+        Called as send(timestamp, arbitration_id, data) by the timer thread.
+        The default is replay.bus_sender(bus).
+    clock : callable, optional
+        The default is time.monotonic.
+    """
+
+    def __init__(self, bus, bcm=None, send=None, clock=time.monotonic):
+        self.bus = bus
+        self.bcm = has_bcm(bus) if bcm is None else bcm
+        if send is None:
+            import replay
+            send = replay.bus_sender(bus)
+        self.send = send
+        self.clock = clock
+        self.messages = {}          # name to Periodic
+        self.heap = []              # (due, generation, name)
+        self.generation = 0
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.thread = None
+        self.sent = 0
+        self.late = 0
+
+    @staticmethod
+    def _message(arbitration_id, data):
+        import can
+        return can.Message(arbitration_id=arbitration_id, data=data,
+                           is_extended_id=True)
+
+    def add(self, name, arbitration_id, data, period):
+        """
+        Start sending a message every period seconds.
+
+        A message already added with the same name is replaced.
+        """
+        self.remove(name)
+        task = None
+        if self.bcm:
+            try:
+                task = self.bus.send_periodic(
+                    self._message(arbitration_id, data), period)
+            except Exception as error:
+                # OSError or can.CanError from the BCM socket
+                logging.getLogger('txscheduler').warning(
+                    f'BCM: FAIL {error!r}, using the timer thread')
+                self.bcm = False
+        with self.condition:
+            self.generation += 1
+            self.messages[name] = Periodic(arbitration_id, bytes(data),
+                                           period, self.generation, task)
+            if task is None:
+                heapq.heappush(self.heap,
+                               (self.clock(), self.generation, name))
+                self.condition.notify()
+
+    def update(self, name, data):
+        """Change the payload of a message without changing its timing."""
+        with self.condition:
+            periodic = self.messages[name]
+            periodic.data = bytes(data)
+            task = periodic.task
+        if task is not None:
+            task.modify_data(self._message(periodic.arbitration_id, data))
+
+    def remove(self, name):
+        """Stop sending a message."""
+        with self.condition:
+            periodic = self.messages.pop(name, None)
+        if periodic is not None and periodic.task is not None:
+            periodic.task.stop()
+
+    def run_pending(self):
+        """
+        Send every message that is due.
+
+        Returns
+        -------
+        float or None
+            Seconds until the next message is due, None if there are none.
+
+        """
+        heap = self.heap
+        messages = self.messages
+        now = self.clock()
+        while heap and heap[0][0] <= now:
+            due, generation, name = heapq.heappop(heap)
+            periodic = messages.get(name)
+            if periodic is None or periodic.generation != generation:
+                continue            # removed or replaced
+            self.send(time.time(), periodic.arbitration_id, periodic.data)
+            self.sent += 1
+            due += periodic.period
+            if due <= now:
+                # Fell more than a period behind, skip rather than burst
+                self.late += 1
+                due = now + periodic.period
+            heapq.heappush(heap, (due, generation, name))
+        return heap[0][0] - now if heap else None
+
+    def _run(self):
+        with self.condition:
+            while not self.stopping:
+                self.condition.wait(self.run_pending())
+
+    def start(self):
+        """Start the timer thread for messages the BCM is not sending."""
+        if self.thread is None:
+            self.stopping = False
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop sending everything."""
+        for name in list(self.messages):
+            self.remove(name)
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
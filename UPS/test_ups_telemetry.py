@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 11:02:17 2026
+
+@author: wmorland
+"""
+
+import struct
+import unittest
+from unittest.mock import patch
+import ups_lite
+import ups_telemetry
+
+
+class FakeSMBus:
+    """SMBus holding MAX17040 registers, counting reads."""
+
+    def __init__(self, volts=4.0, percent=80.0):
+        self.volts = volts
+        self.percent = percent
+        self.reads = 0
+
+    def read_word_data(self, address, register):
+        self.reads += 1
+        if register == ups_lite.UPS.VCELL:
+            raw = int(self.volts * 1000 * 16 / 1.25)
+        elif register == ups_lite.UPS.SOC:
+            raw = int(self.percent * 256)
+        else:
+            raw = 0
+        # The MAX17040 sends the high byte first
+        return struct.unpack('<H', struct.pack('>H', raw))[0]
+
+    def write_word_data(self, address, register, value):
+        pass
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_ups(bus):
+    with patch('ups_lite.UPS.__init__', return_value=None):
+        ups = ups_lite.UPS()
+    ups.bus = bus
+    return ups
+
+
+class TestUPSTelemetry(unittest.TestCase):
+    """Test cases for UPSTelemetry."""
+
+    def setUp(self):
+        self.bus = FakeSMBus()
+        self.ups = make_ups(self.bus)
+        self.clock = FakeClock()
+
+    @patch('ups_lite.UPS.external_power', return_value=True)
+    def test_cache(self, power_mock):
+        """Values are read once per sample and cached."""
+        telemetry = ups_telemetry.UPSTelemetry(self.ups, clock=self.clock)
+        telemetry.sample()
+        for _ in range(10):
+            latest = telemetry.latest
+        self.assertEqual(self.bus.reads, 2, msg='One read per register.')
+        self.assertAlmostEqual(latest.voltage, 4.0, places=2,
+                               msg='Expect VCELL in volts.')
+        self.assertAlmostEqual(latest.capacity, 80.0, places=2,
+                               msg='Expect SOC in percent.')
+        self.assertIsNone(telemetry.time_to_empty(),
+                          msg='No estimate on external power.')
+
+    @patch('ups_lite.UPS.external_power', return_value=False)
+    def test_time_to_empty(self, power_mock):
+        """Discharge at 1% a minute from 80% leaves 80 minutes."""
+        telemetry = ups_telemetry.UPSTelemetry(self.ups, clock=self.clock)
+        for _ in range(6):
+            telemetry.sample()
+            self.clock.now += 30
+            self.bus.percent -= 0.5
+        self.bus.percent += 0.5
+        self.assertAlmostEqual(telemetry.discharge_rate(), -1 / 60,
+                               places=4, msg='Expect 1% per minute.')
+        self.assertAlmostEqual(telemetry.time_to_empty(),
+                               telemetry.latest.capacity * 60, delta=1,
+                               msg='Expect capacity minutes left.')
+
+    def test_history_bounded(self):
+        """History keeps only the newest samples."""
+        with patch('ups_lite.UPS.external_power', return_value=True):
+            telemetry = ups_telemetry.UPSTelemetry(self.ups, history=4,
+                                                   clock=self.clock)
+            for _ in range(10):
+                telemetry.sample()
+                self.clock.now += 30
+        self.assertEqual(len(telemetry.capacity), 4,
+                         msg='Expect four samples kept.')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,8 +10,11 @@ from time import sleep
 import logging
 import warnings
 import struct
-import smbus
-import RPi.GPIO as GPIO
+import lazyimport
+
+# Only loaded when a UPS is created, so importing this module is cheap.
+smbus = lazyimport.lazy_import('smbus')
+GPIO = lazyimport.lazy_import('RPi.GPIO')
 
 
 class UPS:
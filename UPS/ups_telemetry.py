@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:14:33 2026
+
+@author: wmorland
+
+Cached UPS-Lite telemetry and a battery time to empty estimate.
+
+UPS.voltage and UPS.capacity each do a blocking SMBus word read and every
+caller used to read them again.  UPSTelemetry reads VCELL and SOC once every
+interval seconds in a background thread and everyone else reads the cached
+values.  A history of samples is kept in livestate ring buffers.
+
+While the Pi is running on battery the discharge rate is a least squares fit
+of state of charge against time over the samples since external power was
+lost.  That gives the seconds left on battery, the real budget for flushing
+logs and moving them to USB before the battery runs out.
+"""
+
+import time
+import logging
+import threading
+from collections import namedtuple
+from array import array
+import livestate
+
+Sample = namedtuple('Sample', ['time', 'voltage', 'capacity',
+                               'external_power'])
+
+
+def fit_slope(times, values, n):
+    """Least squares slope of the first n values against times."""
+    if n < 2:
+        return None
+    t0 = times[0]
+    mean_t = sum(times[i] - t0 for i in range(n)) / n
+    mean_v = sum(values[i] for i in range(n)) / n
+    covariance = 0.0
+    variance = 0.0
+    for i in range(n):
+        dt = times[i] - t0 - mean_t
+        covariance += dt * (values[i] - mean_v)
+        variance += dt * dt
+    if not variance:
+        return None
+    return covariance / variance
+
+
+class UPSTelemetry:
+    """
+    Sample a UPS in the background and cache the latest values.
+
+    Parameters
+    ----------
+    ups : ups_lite.UPS
+        Anything with voltage, capacity and external_power methods.
+    interval : float, optional
+        Seconds between I2C reads.  The default is 30.
+    history : int, optional
+        Samples kept.  The default is 360, three hours at 30 seconds.
+    clock : callable, optional
+        The default is time.time.
+    """
+
+    def __init__(self, ups, interval=30.0, history=360, clock=time.time):
+        self.ups = ups
+        self.interval = interval
+        self.clock = clock
+        self.voltage = livestate.RingBuffer(history)
+        self.capacity = livestate.RingBuffer(history)
+        self.latest = None
+        self.on_battery_since = None
+        self.reads = 0
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        # Scratch arrays for the discharge fit, allocated once.
+        self._times = array('d', bytes(8 * history))
+        self._values = array('d', bytes(8 * history))
+
+    def sample(self):
+        """Read the UPS now and update the cache and history."""
+        now = self.clock()
+        voltage = self.ups.voltage()
+        capacity = self.ups.capacity()
+        external_power = self.ups.external_power()
+        with self.lock:
+            self.reads += 1
+            self.voltage.push(now, voltage)
+            self.capacity.push(now, capacity)
+            if external_power:
+                self.on_battery_since = None
+            elif self.on_battery_since is None:
+                self.on_battery_since = now
+            self.latest = Sample(now, voltage, capacity, external_power)
+        return self.latest
+
+    def start(self):
+        """Take a first sample and start sampling in the background."""
+        self.sample()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop background sampling."""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                self.sample()
+            except OSError as error:
+                logging.getLogger('ups_telemetry').warning(
+                    f'UPS read: FAIL {error}')
+
+    def discharge_rate(self):
+        """
+        State of charge change in % per second while on battery.
+
+        Returns
+        -------
+        float or None
+            Negative while discharging.  None when on external power or with
+            fewer than two samples on battery.
+
+        """
+        with self.lock:
+            if self.on_battery_since is None:
+                return None
+            n = self.capacity.window(self.on_battery_since, self._times,
+                                     self._values)
+            return fit_slope(self._times, self._values, n)
+
+    def time_to_empty(self, reserve=0.0):
+        """
+        Seconds until the state of charge falls to reserve percent.
+
+        Returns
+        -------
+        float or None
+            None when on external power or not discharging.
+
+        """
+        rate = self.discharge_rate()
+        if rate is None or rate >= 0 or self.latest is None:
+            return None
+        return max(self.latest.capacity - reserve, 0.0) / -rate
+
+    def status(self):
+        """Latest values and time to empty as a dict."""
+        latest = self.latest
+        if latest is None:
+            return None
+        return {'time': latest.time, 'voltage': latest.voltage,
+                'capacity': latest.capacity,
+                'external_power': latest.external_power,
+                'time_to_empty': self.time_to_empty()}